@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Audit Log Sink
+Batched, asynchronous writer for audit_log (db/sql/014_security.sql)
+
+Request handlers never touch SQLite: the HTTP middleware calls record(),
+which only appends to a bounded in-memory queue. A background task drains
+the queue and group-commits up to batch_size events per transaction, at
+least every flush_ms.
+
+Backpressure, in order:
+    queue above sample_above of capacity  - keep 1 in sample_every
+                                            successful (< 400) events;
+                                            errors are always kept
+    queue full                            - drop the event
+Both are counted in stats().
+
+Rollover: rows older than hot_days are moved out of audit_log into
+monthly tables audit_log_YYYYMM (primary key only), so the hot table and
+its three indexes stay small. Pruning drops whole monthly tables once the
+month is older than retention_days, which is O(1) where a DELETE would
+rewrite the indexes.
+"""
+
+import asyncio
+import logging
+import re
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIT_COLUMNS = (
+    'event_id', 'timestamp', 'user_id', 'method', 'path',
+    'status_code', 'duration_ms', 'client_ip', 'user_agent'
+)
+ARCHIVE_PREFIX = 'audit_log_'
+_ARCHIVE_NAME = re.compile(r'^audit_log_(\d{6})$')
+
+
+def anonymize_ip(ip: Optional[str]) -> Optional[str]:
+    """Zero the last IPv4 octet (or the last 80 bits of an IPv6 address)"""
+    if not ip:
+        return None
+    if '.' in ip:
+        return '.'.join(ip.split('.')[:3] + ['0'])
+    if ':' in ip:
+        return ':'.join(ip.split(':')[:3]) + '::'
+    return ip
+
+
+def audit_event(
+    method: str,
+    path: str,
+    status_code: int,
+    duration_ms: float,
+    user_id: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    user_agent: Optional[str] = None
+) -> tuple:
+    """One audit_log row, in AUDIT_COLUMNS order"""
+    return (
+        str(uuid.uuid4()),
+        datetime.utcnow().isoformat(),
+        user_id,
+        method,
+        path,
+        status_code,
+        round(duration_ms, 3),
+        anonymize_ip(client_ip),
+        (user_agent or '')[:100] or None,
+    )
+
+
+def rollover(conn: sqlite3.Connection, hot_days: int, now: Optional[datetime] = None) -> int:
+    """
+    Move audit_log rows older than hot_days into monthly archive tables; caller commits
+
+    Returns:
+        Rows moved
+    """
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=hot_days)).isoformat()
+    months = [r[0] for r in conn.execute(
+        "SELECT DISTINCT substr(timestamp, 1, 7) FROM audit_log WHERE timestamp < ?", (cutoff,)
+    )]
+    columns = ', '.join(AUDIT_COLUMNS)
+    moved = 0
+    for month in months:
+        table = f"{ARCHIVE_PREFIX}{month.replace('-', '')}"
+        if not _ARCHIVE_NAME.match(table):
+            continue
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                event_id TEXT PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                user_id TEXT,
+                method TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                duration_ms REAL,
+                client_ip TEXT,
+                user_agent TEXT
+            )
+        """)
+        # ISO timestamps sort as text, so the month prefix bounds the range
+        bounds = (f"{month}-00", f"{month}-99", cutoff)
+        before = conn.total_changes
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {table} ({columns})
+            SELECT {columns} FROM audit_log
+            WHERE timestamp > ? AND timestamp < ? AND timestamp < ?
+        """, bounds)
+        moved += conn.total_changes - before
+        conn.execute(
+            "DELETE FROM audit_log WHERE timestamp > ? AND timestamp < ? AND timestamp < ?", bounds
+        )
+    return moved
+
+
+def prune(
+    conn: sqlite3.Connection,
+    retention_days: int,
+    now: Optional[datetime] = None
+) -> List[str]:
+    """
+    Drop archive tables whose whole month is older than retention_days; caller commits
+
+    Returns:
+        Names of dropped tables
+    """
+    cutoff_month = ((now or datetime.utcnow()) - timedelta(days=retention_days)).strftime('%Y%m')
+    dropped = []
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'audit_log_%' "
+        "ORDER BY name"
+    ).fetchall()
+    for (name,) in tables:
+        match = _ARCHIVE_NAME.match(name)
+        if match and match.group(1) < cutoff_month:
+            conn.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+    return dropped
+
+
+class AuditSink:
+    """
+    Bounded queue + background group-commit writer for audit_log
+
+    Usage:
+        sink = AuditSink(DB_PATH)
+        sink.record(audit_event('GET', '/healthz', 200, 1.2))   # never blocks
+        ...
+        await sink.close()                                      # final flush
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./ae.db",
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_ms: float = 250.0,
+        sample_above: float = 0.8,
+        sample_every: int = 10,
+        hot_days: int = 7,
+        retention_days: int = 365,
+        maintenance_interval: float = 3600.0
+    ):
+        self.db_path = db_path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.sample_above = sample_above
+        self.sample_every = max(sample_every, 1)
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.maintenance_interval = maintenance_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._sample_seq = 0
+        self._last_maintenance: Optional[float] = None
+        self.counters = {
+            'enqueued': 0, 'written': 0, 'sampled_out': 0, 'dropped': 0,
+            'batches': 0, 'write_errors': 0, 'rolled_over': 0, 'pruned_tables': 0,
+        }
+
+    def record(self, event: tuple) -> bool:
+        """
+        Queue an audit event without waiting; starts the writer on first use
+
+        Returns:
+            True if queued, False if sampled out or dropped
+        """
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            self._start()
+
+        depth = self._queue.qsize()
+        if depth >= self.max_queue:
+            self.counters['dropped'] += 1
+            return False
+        if depth >= self.max_queue * self.sample_above and event[5] < 400:
+            self._sample_seq += 1
+            if self._sample_seq % self.sample_every:
+                self.counters['sampled_out'] += 1
+                return False
+
+        self._queue.put_nowait(event)
+        self.counters['enqueued'] += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, 'queued': self._queue.qsize() if self._queue else 0}
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A queue is bound to the loop that first waits on it; carry over
+            # anything left unwritten from a previous loop
+            pending = []
+            while self._queue is not None and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            for event in pending:
+                self._queue.put_nowait(event)
+            self._loop = loop
+        self._task = loop.create_task(self._drain())
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await asyncio.to_thread(self._write, batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only ever used from one to_thread() call at a time
+        if self._conn is None:
+            # mode=rw: never create an empty ae.db just to audit into it
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=rw", uri=True, timeout=30, check_same_thread=False
+            )
+        return self._conn
+
+    def _write(self, batch: List[tuple]):
+        """One transaction per batch, then maintenance if it is due"""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO audit_log ({', '.join(AUDIT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(AUDIT_COLUMNS))})",
+                    batch
+                )
+            self.counters['written'] += len(batch)
+            self.counters['batches'] += 1
+        except sqlite3.Error as e:
+            self.counters['write_errors'] += 1
+            logger.error(f"Audit log write failed, {len(batch)} events lost: {e}")
+            return
+
+        now = time.monotonic()
+        last = self._last_maintenance
+        if last is None or now - last >= self.maintenance_interval:
+            self._last_maintenance = now
+            self.maintain()
+
+    def maintain(self) -> Dict[str, Any]:
+        """Roll old rows into monthly tables and drop expired months"""
+        try:
+            conn = self._connection()
+            with conn:
+                moved = rollover(conn, self.hot_days)
+                dropped = prune(conn, self.retention_days)
+        except sqlite3.Error as e:
+            logger.error(f"Audit log maintenance failed: {e}")
+            return {'rolled_over': 0, 'dropped': []}
+        self.counters['rolled_over'] += moved
+        self.counters['pruned_tables'] += len(dropped)
+        if moved or dropped:
+            logger.info(f"Audit log maintenance: {moved} rows archived, dropped {dropped}")
+        return {'rolled_over': moved, 'dropped': dropped}
+
+    async def flush(self):
+        """Wait until everything queued so far is written"""
+        if self._queue is not None and self._task is not None and not self._task.done():
+            await self._queue.join()
+
+    async def close(self):
+        """Flush, stop the writer and close the connection"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Request Authentication
+Bearer-token identity for the HTTP API (no extra dependencies)
+
+User tokens are "<user_id>.<hex HMAC-SHA256(AE_AUTH_SECRET, user_id)>",
+minted with `python -m app.auth --user <user_id>` and sent by the frontend
+as `Authorization: Bearer <token>`. An upstream auth layer may instead
+set request.state.user_id, which is trusted as-is. Identity is never
+taken from a plain request header such as X-User-ID.
+
+Admin endpoints require `Authorization: Bearer <AE_ADMIN_TOKEN>`. With
+AE_ADMIN_TOKEN (or AE_AUTH_SECRET for users) unset, those requests are
+refused rather than let through.
+"""
+
+import hashlib
+import hmac
+import os
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+
+def _secret(name: str) -> Optional[str]:
+    return os.environ.get(name) or None
+
+
+def _bearer(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    return token.strip() or None
+
+
+def user_token(user_id: str, secret: Optional[str] = None) -> str:
+    """Signed bearer token for user_id"""
+    secret = secret or _secret('AE_AUTH_SECRET')
+    if not secret:
+        raise RuntimeError("AE_AUTH_SECRET is not set")
+    digest = hmac.new(secret.encode(), user_id.encode(), hashlib.sha256).hexdigest()
+    return f"{user_id}.{digest}"
+
+
+def verify_user_token(token: str, secret: Optional[str] = None) -> Optional[str]:
+    """user_id carried by a valid token, else None"""
+    secret = secret or _secret('AE_AUTH_SECRET')
+    user_id, _, _ = token.rpartition('.')
+    if not secret or not user_id:
+        return None
+    return user_id if hmac.compare_digest(user_token(user_id, secret), token) else None
+
+
+def current_user(request: Request) -> str:
+    """FastAPI dependency: authenticated user_id (401 otherwise)"""
+    user_id = getattr(request.state, 'user_id', None)
+    if not user_id:
+        token = _bearer(request)
+        user_id = verify_user_token(token) if token else None
+        if not user_id:
+            raise HTTPException(401, "valid bearer token required")
+        request.state.user_id = user_id  # picked up by the audit middleware
+    return user_id
+
+
+def require_admin(request: Request) -> None:
+    """FastAPI dependency: 401 without a bearer token, 403 unless it is AE_ADMIN_TOKEN"""
+    token = _bearer(request)
+    if not token:
+        raise HTTPException(401, "admin bearer token required")
+    admin = _secret('AE_ADMIN_TOKEN')
+    if not admin or not hmac.compare_digest(admin.encode(), token.encode()):
+        raise HTTPException(403, "admin access denied")
+
+
+def main():
+    """Print a user bearer token signed with AE_AUTH_SECRET"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mint a user bearer token')
+    parser.add_argument('--user', required=True, help='user_id the token identifies')
+    args = parser.parse_args()
+    print(user_token(args.user))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - L5 BN Package Export
+Streams rules, nodes and edges from ae.db into a schemas/bn_package.schema.json file
+
+One ordered cursor walks rules joined to their evidence, findings and
+mechanisms. Each rule's rows are folded into a rule_graph element,
+validated with a validator compiled once (app/schemas.py) and written
+out immediately, so memory stays at one rule plus the writer buffer
+however large the topic. Nodes and edges are deduplicated, and priors
+collected, in temp tables while the rules stream, then streamed back out
+of SQLite. The package is written under a temporary name and renamed into
+place only once complete, so a failed export never leaves a partial file
+at the package path.
+
+Derived fields:
+    factors / outcomes  normalised antecedents / consequents of the
+                        rule's findings (app/contradictions.normalize_construct)
+    effect_direction    '+' / '-' if every finding agrees, 'mixed' if not,
+                        'unknown' if none state one
+    status              ladder over confidence, triangulation and
+                        contradictions (STATUS_LADDER); 'explanatory'
+                        when an established rule has mechanism links
+    nodes               one per construct and mechanism
+    edges               CAUSAL factor -> outcome per rule, and
+                        factor -> mechanism -> outcome where findings link one
+
+Formats: 'json' (the package object), 'jsonl' (one element per line,
+tagged with "kind"); either may be gzipped. Incremental exports
+(since_last=True) contain only rules whose row or evidence changed at or
+after the start of the previous completed export of the same scope
+(bn_exports, 027); a rule touched in that same second is exported again
+rather than missed.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.contradictions import normalize_construct, normalize_direction
+from app.schemas import get_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_DIR = "./exports"
+
+# (status, min confidence, min triangulation, max contradictions), first match wins
+STATUS_LADDER = (
+    ('established', 0.7, 0.5, 0),
+    ('partial', 0.4, 0.0, None),
+)
+FALLBACK_STATUS = 'prima_facie'
+
+RULE_SCHEMA = 'rule_graph.schema.json'
+NODE_SCHEMA = 'bn_package.schema.json#/properties/nodes/items'
+EDGE_SCHEMA = 'bn_package.schema.json#/properties/edges/items'
+PACKAGE_SCHEMA = 'bn_package.schema.json'
+
+MAX_REPORTED_ERRORS = 20
+
+_RULE_ROWS_SQL = """
+    SELECT r.rule_id, r.rule, r.confidence, r.triangulation_score, r.contradiction_count,
+           r.evidence_count, r.job_id, r.cluster_id, r.created_at, r.updated_at,
+           e.id, e.article_id, e.passage, e.stance, e.evidence_strength,
+           f.id, f.antecedents, f.consequent, f.measure_direction, f.effect_size,
+           m.name
+    FROM rules r
+    LEFT JOIN rule_evidence e ON e.rule_id = r.rule_id
+    LEFT JOIN findings f ON f.id = e.finding_id
+    LEFT JOIN finding_mechanism_links l ON l.finding_id = f.id
+    LEFT JOIN mechanisms m ON m.id = l.mechanism_id
+    {where}
+    ORDER BY r.rule_id, e.id
+"""
+
+
+def _names(antecedents: Optional[str]) -> List[str]:
+    try:
+        items = json.loads(antecedents) if antecedents else []
+    except (TypeError, json.JSONDecodeError):
+        items = [antecedents]
+    if not isinstance(items, list):
+        items = [items]
+    return [n for n in (normalize_construct(str(a)) for a in items if a) if n]
+
+
+def _direction(directions: set) -> str:
+    if len(directions) == 1:
+        return next(iter(directions))
+    return 'mixed' if directions else 'unknown'
+
+
+def rule_status(confidence: Optional[float], triangulation: Optional[float],
+                contradictions: Optional[int], has_mechanism: bool) -> str:
+    for status, min_conf, min_tri, max_contra in STATUS_LADDER:
+        if (confidence or 0) >= min_conf and (triangulation or 0) >= min_tri \
+                and (max_contra is None or (contradictions or 0) <= max_contra):
+            if status == 'established' and has_mechanism:
+                return 'explanatory'
+            return status
+    return FALLBACK_STATUS
+
+
+def build_rule(rows: List[tuple]) -> Tuple[Dict[str, Any], List[Tuple[str, str, str]]]:
+    """
+    Fold one rule's joined rows into a rule_graph element
+
+    Returns:
+        (rule element, [(factor, mechanism, outcome)] links; mechanism may be '')
+    """
+    (rule_id, text, confidence, triangulation, contradictions, evidence_count,
+     job_id, cluster_id, created_at, updated_at) = rows[0][:10]
+
+    factors: Dict[str, None] = {}
+    outcomes: Dict[str, None] = {}
+    directions = set()
+    effects = []
+    evidence: Dict[int, Dict[str, Any]] = {}
+    links: Dict[Tuple[str, str, str], None] = {}
+    seen_findings = set()
+
+    for row in rows:
+        (ev_id, article_id, passage, stance, strength,
+         finding_id, antecedents, consequent, direction, effect, mechanism) = row[10:]
+        if ev_id is not None and ev_id not in evidence:
+            evidence[ev_id] = {
+                'evidence_id': ev_id, 'article_id': article_id, 'finding_id': finding_id,
+                'passage': passage, 'stance': stance, 'strength': strength,
+            }
+        if finding_id is None:
+            continue
+        names = _names(antecedents)
+        outcome = normalize_construct(consequent)
+        if finding_id not in seen_findings:
+            seen_findings.add(finding_id)
+            factors.update(dict.fromkeys(names))
+            if outcome:
+                outcomes[outcome] = None
+            d = normalize_direction(direction)
+            if d in ('increase', 'decrease'):
+                directions.add('+' if d == 'increase' else '-')
+            if effect is not None:
+                effects.append(effect)
+        mech = normalize_construct(mechanism) if mechanism else ''
+        for factor in names:
+            if outcome:
+                links[(factor, mech, outcome)] = None
+
+    has_mechanism = any(m for _, m, _ in links)
+    rule = {
+        'rule_id': str(rule_id),
+        'status': rule_status(confidence, triangulation, contradictions, has_mechanism),
+        'rule_text': text or '',
+        'factors': list(factors),
+        'outcomes': list(outcomes),
+        'effect_direction': _direction(directions),
+        'effect_size': round(sum(effects) / len(effects), 4) if effects else None,
+        'evidence': list(evidence.values()),
+        'provenance': {
+            'job_id': job_id, 'created_at': created_at, 'updated_at': updated_at,
+            'evidence_count': evidence_count,
+            'articles': sorted({e['article_id'] for e in evidence.values()}),
+        },
+        'confidence': confidence,
+        'triangulation_score': triangulation,
+        'contradiction_notes': (
+            f"{contradictions} contradicting findings" if contradictions else None
+        ),
+        'cluster_id': str(cluster_id) if cluster_id is not None else None,
+    }
+    return rule, list(links)
+
+
+class _PackageWriter:
+    """Incremental writer for the JSON object or JSONL form of a package"""
+
+    def __init__(self, fh, fmt: str):
+        self.fh = fh
+        self.fmt = fmt
+        self.section: Optional[str] = None
+        self.first = True
+
+    def header(self, package_id: str):
+        if self.fmt == 'jsonl':
+            self._line({'kind': 'package', 'package_id': package_id})
+        else:
+            self.fh.write(f'{{"package_id": {json.dumps(package_id)}')
+
+    def begin(self, section: str):
+        self.section, self.first = section, True
+        if self.fmt == 'json':
+            self.fh.write(f', "{section}": [')
+
+    def element(self, element: Dict[str, Any]):
+        if self.fmt == 'jsonl':
+            self._line({'kind': self.section[:-1], **element})
+            return
+        text = json.dumps(element, ensure_ascii=False, default=str)
+        self.fh.write(('' if self.first else ', ') + text)
+        self.first = False
+
+    def end(self):
+        if self.fmt == 'json':
+            self.fh.write(']')
+
+    def footer(self, priors: Iterator[Tuple[str, Dict[str, Any]]], provenance: Dict[str, Any]):
+        """priors streams as (rule_id, prior) pairs into one JSON object"""
+        self.fh.write('{"kind": "priors", "priors": {' if self.fmt == 'jsonl' else ', "priors": {')
+        for i, (rule_id, prior) in enumerate(priors):
+            self.fh.write(('' if i == 0 else ', ') + f'{json.dumps(rule_id)}: {json.dumps(prior)}')
+        if self.fmt == 'jsonl':
+            self.fh.write('}}\n')
+            self._line({'kind': 'provenance', 'provenance': provenance})
+        else:
+            self.fh.write(f'}}, "provenance": {json.dumps(provenance, default=str)}}}\n')
+
+    def _line(self, obj: Dict[str, Any]):
+        self.fh.write(json.dumps(obj, ensure_ascii=False, default=str) + '\n')
+
+
+class _HashingWriter(io.RawIOBase):
+    """Binary sink that hashes what it forwards"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.sha.update(b)
+        return self.raw.write(b)
+
+
+def export_package(
+    db_path: str = "./ae.db",
+    out_dir: str = DEFAULT_EXPORT_DIR,
+    cluster_id: Optional[str] = None,
+    since_last: bool = False,
+    fmt: str = 'json',
+    compress: bool = False,
+    package_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Write one BN package
+
+    Args:
+        db_path: Database path
+        out_dir: Directory for the package file
+        cluster_id: Only rules of this cluster (topic); None = all rules
+        since_last: Only rules changed since the last completed export of this scope
+        fmt: 'json' or 'jsonl'
+        compress: gzip the output
+        package_id: Defaults to '<scope>-<timestamp>'
+
+    Returns:
+        Dict with package_id, path, rules, nodes, edges, invalid, errors, since and sha256
+
+    Raises:
+        ValueError: Unknown format
+    """
+    if fmt not in ('json', 'jsonl'):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    registry = get_registry()
+    validate_rule = registry.validator(RULE_SCHEMA)
+    validate_node = registry.validator(NODE_SCHEMA)
+    validate_edge = registry.validator(EDGE_SCHEMA)
+
+    scope = f"cluster:{cluster_id}" if cluster_id is not None else 'all'
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        started_at = conn.execute("SELECT datetime('now')").fetchone()[0]
+        since = None
+        if since_last:
+            row = conn.execute("""
+                SELECT started_at FROM bn_exports
+                WHERE scope = ? AND completed_at IS NOT NULL
+                ORDER BY started_at DESC LIMIT 1
+            """, (scope,)).fetchone()
+            since = row[0] if row else None
+
+        stamp = started_at.replace(' ', 'T').replace(':', '')
+        package_id = package_id or f"{scope.replace(':', '-')}-{stamp}"
+        export_id = str(uuid.uuid4())
+        conn.execute("""
+            INSERT INTO bn_exports (export_id, scope, package_id, since, started_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (export_id, scope, package_id, since, started_at))
+        conn.commit()
+
+        where, params = [], []
+        if cluster_id is not None:
+            where.append("r.cluster_id = ?")
+            params.append(cluster_id)
+        if since is not None:
+            where.append("""(r.updated_at >= ? OR r.rule_id IN (
+                SELECT rule_id FROM rule_evidence WHERE created_at >= ?))""")
+            params += [since, since]
+        sql = _RULE_ROWS_SQL.format(where=f"WHERE {' AND '.join(where)}" if where else '')
+
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS bn_nodes (
+                node_id TEXT PRIMARY KEY, kind TEXT, label TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS bn_edges (
+                source TEXT, target TEXT, link_type TEXT, rule_id TEXT,
+                PRIMARY KEY (source, target, rule_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS bn_priors (
+                rule_id TEXT PRIMARY KEY, confidence REAL, effect_direction TEXT, effect_size REAL
+            )
+        """)
+        conn.execute("DELETE FROM bn_nodes")
+        conn.execute("DELETE FROM bn_edges")
+        conn.execute("DELETE FROM bn_priors")
+
+        suffix = '.json' if fmt == 'json' else '.jsonl'
+        path = Path(out_dir) / f"{package_id}{suffix}{'.gz' if compress else ''}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.partial")
+
+        counts = {'rules': 0, 'nodes': 0, 'edges': 0, 'invalid': 0}
+        errors: List[Dict[str, Any]] = []
+
+        def rejected(kind, ident, found):
+            counts['invalid'] += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'kind': kind, 'id': ident, 'errors': found})
+
+        try:
+            with open(partial, 'wb') as raw:
+                hashing = _HashingWriter(raw)
+                if compress:
+                    binary = gzip.GzipFile(fileobj=hashing, mode='wb', mtime=0)
+                else:
+                    binary = io.BufferedWriter(hashing, 1 << 16)
+                text = io.TextIOWrapper(binary, encoding='utf-8')
+                writer = _PackageWriter(text, fmt)
+                writer.header(package_id)
+
+                writer.begin('rules')
+                cursor = conn.execute(sql, params)
+                for _, group in groupby(cursor, key=lambda r: r[0]):
+                    rule, links = build_rule(list(group))
+                    found = validate_rule(rule)
+                    if found:
+                        rejected('rule', rule['rule_id'], found)
+                        continue
+                    writer.element(rule)
+                    counts['rules'] += 1
+                    _stage_graph(conn, rule, links)
+                writer.end()
+
+                for section, rows, validate in (
+                    ('nodes', _stream_nodes(conn), validate_node),
+                    ('edges', _stream_edges(conn), validate_edge),
+                ):
+                    writer.begin(section)
+                    for element in rows:
+                        found = validate(element)
+                        if found:
+                            key = element.get('node_id') or element.get('source')
+                            rejected(section[:-1], key, found)
+                            continue
+                        writer.element(element)
+                        counts[section] += 1
+                    writer.end()
+
+                version = conn.execute(
+                    "SELECT version FROM schema_version ORDER BY rowid DESC LIMIT 1"
+                ).fetchone()
+                provenance = {
+                    'scope': scope, 'export_id': export_id, 'generated_at': started_at,
+                    'since': since, 'incremental': since is not None,
+                    'schema_version': version[0] if version else None,
+                }
+                writer.footer(_stream_priors(conn), provenance)
+                text.flush()
+                text.detach()
+                binary.flush()
+                if compress:
+                    binary.close()  # writes the gzip trailer; raw stays open
+                digest = hashing.sha.hexdigest()
+
+            skeleton = {'package_id': package_id, 'rules': [], 'nodes': [], 'edges': [],
+                        'priors': {}, 'provenance': provenance}
+            found = registry.validator(PACKAGE_SCHEMA)(skeleton)
+            if found:
+                raise ValueError(f"Package header invalid: {found}")
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+
+        conn.execute("""
+            UPDATE bn_exports
+            SET completed_at = datetime('now'), path = ?, rules = ?, nodes = ?, edges = ?,
+                invalid = ?, sha256 = ?
+            WHERE export_id = ?
+        """, (str(path), counts['rules'], counts['nodes'], counts['edges'], counts['invalid'],
+              digest, export_id))
+        conn.execute("DROP TABLE IF EXISTS temp.bn_nodes")
+        conn.execute("DROP TABLE IF EXISTS temp.bn_edges")
+        conn.execute("DROP TABLE IF EXISTS temp.bn_priors")
+        conn.commit()
+    finally:
+        conn.close()
+
+    logger.info(
+        f"BN export {package_id}: {counts['rules']} rules, {counts['nodes']} nodes, "
+        f"{counts['edges']} edges, {counts['invalid']} invalid -> {path}"
+    )
+    return {'package_id': package_id, 'path': str(path), 'since': since,
+            'errors': errors, 'sha256': digest, **counts}
+
+
+def _stage_graph(conn: sqlite3.Connection, rule: Dict[str, Any], links: List[Tuple[str, str, str]]):
+    """Record a rule's prior, nodes and edges in the temp tables (deduplicated there)"""
+    nodes = [(f"construct:{c}", 'factor', c) for c in rule['factors']]
+    nodes += [(f"construct:{c}", 'outcome', c) for c in rule['outcomes']]
+    edges = []
+    for factor, mechanism, outcome in links:
+        source, target = f"construct:{factor}", f"construct:{outcome}"
+        edges.append((source, target, 'CAUSAL', rule['rule_id']))
+        if mechanism:
+            mech = f"mechanism:{mechanism}"
+            nodes.append((mech, 'mechanism', mechanism))
+            edges.append((source, mech, 'CAUSAL', rule['rule_id']))
+            edges.append((mech, target, 'CAUSAL', rule['rule_id']))
+    # A construct that is a factor in one rule and an outcome in another keeps its first kind
+    conn.execute(
+        "INSERT OR REPLACE INTO bn_priors (rule_id, confidence, effect_direction, effect_size) "
+        "VALUES (?, ?, ?, ?)",
+        (rule['rule_id'], rule['confidence'], rule['effect_direction'], rule['effect_size'])
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO bn_nodes (node_id, kind, label) VALUES (?, ?, ?)", nodes
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO bn_edges (source, target, link_type, rule_id) VALUES (?, ?, ?, ?)",
+        edges
+    )
+
+
+def _stream_nodes(conn: sqlite3.Connection) -> Iterator[Dict[str, Any]]:
+    rows = conn.execute("SELECT node_id, kind, label FROM bn_nodes ORDER BY node_id")
+    for node_id, kind, label in rows:
+        yield {'node_id': node_id, 'kind': kind, 'label': label}
+
+
+def _stream_priors(conn: sqlite3.Connection) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for rule_id, confidence, direction, effect in conn.execute(
+        "SELECT rule_id, confidence, effect_direction, effect_size FROM bn_priors ORDER BY rule_id"
+    ):
+        yield rule_id, {'confidence': confidence, 'effect_direction': direction,
+                        'effect_size': effect}
+
+
+def _stream_edges(conn: sqlite3.Connection) -> Iterator[Dict[str, Any]]:
+    for source, target, link_type, rule_ids in conn.execute("""
+        SELECT source, target, link_type, json_group_array(rule_id)
+        FROM bn_edges GROUP BY source, target, link_type ORDER BY source, target
+    """):
+        yield {'source': source, 'target': target, 'link_type': link_type,
+               'rule_ids': json.loads(rule_ids)}
+
+
+def main():
+    """Export a BN package from the command line"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Article Eater L5 BN package export')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--out', default=DEFAULT_EXPORT_DIR, help='Output directory')
+    parser.add_argument('--cluster', help='Only rules of this cluster_id')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only rules changed since the last export')
+    parser.add_argument('--format', choices=('json', 'jsonl'), default='json')
+    parser.add_argument('--gzip', action='store_true', help='Compress the package')
+
+    args = parser.parse_args()
+    result = export_package(
+        args.db, args.out, args.cluster, args.incremental, args.format, args.gzip
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
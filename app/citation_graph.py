@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Citation Graph Expansion
+Bounded BFS over a local citation store with co-citation / coupling scoring
+
+Neighbours (references + citations) are fetched from Semantic Scholar only
+for papers not already in citation_fetch_log, so repeated expansions over
+a growing corpus mostly read the stored graph. Candidates reached from the
+seeds are ranked by:
+
+    direct      - citation links to or from a seed
+    co_citation - papers that cite both a seed and the candidate
+    coupling    - references shared between a seed and the candidate
+
+and filtered against every corpus_id already in articles before anything
+is looked up or enqueued. Schema: db/sql/021_citation_graph.sql.
+"""
+
+import json
+import logging
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.semantic_scholar import PAPER_FIELDS, S2Client, upsert_papers
+
+logger = logging.getLogger(__name__)
+
+NEIGHBOUR_FIELDS = 'corpusId,references.corpusId,citations.corpusId'
+DIRECT_WEIGHT = 2.0
+
+
+def _ids_json(ids: Iterable[int]) -> str:
+    return json.dumps(sorted(set(ids)))
+
+
+class CitationGraph:
+    """
+    Local citation adjacency store
+
+    Usage:
+        graph = CitationGraph('./ae.db')
+        reached = await graph.expand(s2, seeds=[123, 456], hops=2)
+        scores = graph.score(seeds, reached)
+    """
+
+    def __init__(self, db_path: str = "./ae.db", refresh_days: int = 90):
+        self.db_path = db_path
+        self.refresh_days = refresh_days
+        self.fetched = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def unfetched(self, corpus_ids: Iterable[int]) -> List[int]:
+        """Ids whose neighbours are not stored (or are older than refresh_days)"""
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute("""
+                SELECT j.value FROM json_each(?) j
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM citation_fetch_log f
+                    WHERE f.corpus_id = j.value AND f.fetched_at >= datetime('now', ?)
+                )
+            """, (_ids_json(corpus_ids), f'-{self.refresh_days} days'))]
+        finally:
+            conn.close()
+
+    def store_neighbours(self, papers: Iterable[Optional[Dict[str, Any]]]) -> int:
+        """
+        Record S2 papers' references and citations as edges
+
+        Returns:
+            Number of papers stored
+        """
+        edges = []
+        log = []
+        for paper in papers:
+            if not paper or paper.get('corpusId') is None:
+                continue
+            node = paper['corpusId']
+            refs = [r['corpusId'] for r in paper.get('references') or [] if r.get('corpusId') is not None]
+            cites = [c['corpusId'] for c in paper.get('citations') or [] if c.get('corpusId') is not None]
+            edges.extend((node, ref) for ref in refs)
+            edges.extend((cite, node) for cite in cites)
+            log.append((node, len(refs), len(cites)))
+
+        conn = self._connect()
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO citation_edges (citing_corpus_id, cited_corpus_id) VALUES (?, ?)",
+                edges
+            )
+            conn.executemany("""
+                INSERT OR REPLACE INTO citation_fetch_log (corpus_id, n_references, n_citations, fetched_at)
+                VALUES (?, ?, ?, datetime('now'))
+            """, log)
+            conn.commit()
+        finally:
+            conn.close()
+        return len(log)
+
+    async def ensure_neighbours(self, s2: S2Client, corpus_ids: Iterable[int]) -> int:
+        """Fetch and store neighbours for ids not yet in the local graph"""
+        missing = self.unfetched(corpus_ids)
+        if not missing:
+            return 0
+        papers = await s2.batch_lookup([f'CorpusId:{c}' for c in missing], fields=NEIGHBOUR_FIELDS)
+        stored = self.store_neighbours(papers)
+        self.fetched += stored
+        return stored
+
+    def neighbours(self, corpus_ids: Iterable[int]) -> Dict[int, int]:
+        """Neighbours of corpus_ids (either direction) -> number of links into the set"""
+        ids = _ids_json(corpus_ids)
+        conn = self._connect()
+        try:
+            return dict(conn.execute("""
+                SELECT node, COUNT(*) FROM (
+                    SELECT cited_corpus_id AS node FROM citation_edges
+                    WHERE citing_corpus_id IN (SELECT value FROM json_each(?))
+                    UNION ALL
+                    SELECT citing_corpus_id AS node FROM citation_edges
+                    WHERE cited_corpus_id IN (SELECT value FROM json_each(?))
+                )
+                GROUP BY node
+            """, (ids, ids)).fetchall())
+        finally:
+            conn.close()
+
+    async def expand(
+        self,
+        s2: S2Client,
+        seeds: Iterable[int],
+        hops: int = 2,
+        max_frontier: int = 200
+    ) -> Dict[int, int]:
+        """
+        Bounded multi-hop BFS from seeds
+
+        Each hop keeps at most max_frontier new nodes, preferring those with
+        the most links into the current frontier.
+
+        Returns:
+            Reached corpus_id -> hop distance (seeds excluded)
+        """
+        seeds = set(seeds)
+        depth: Dict[int, int] = {s: 0 for s in seeds}
+        frontier = set(seeds)
+
+        for hop in range(1, hops + 1):
+            if not frontier:
+                break
+            await self.ensure_neighbours(s2, frontier)
+            links = self.neighbours(frontier)
+            fresh = sorted((n for n in links if n not in depth), key=lambda n: (-links[n], n))
+            frontier = set(fresh[:max_frontier])
+            depth.update((n, hop) for n in frontier)
+
+        return {n: d for n, d in depth.items() if n not in seeds}
+
+    def score(self, seeds: Iterable[int], candidates: Iterable[int]) -> Dict[int, Dict[str, float]]:
+        """
+        Relatedness of each candidate to the seed set
+
+        Returns:
+            corpus_id -> {direct, co_citation, coupling, score}
+        """
+        seed_ids, cand_ids = _ids_json(seeds), _ids_json(candidates)
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TEMP TABLE seed_set (id INTEGER PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE cand_set (id INTEGER PRIMARY KEY)")
+            conn.execute("INSERT INTO seed_set SELECT value FROM json_each(?)", (seed_ids,))
+            conn.execute("INSERT INTO cand_set SELECT value FROM json_each(?)", (cand_ids,))
+
+            scores: Dict[int, Dict[str, float]] = {
+                c: {'direct': 0, 'co_citation': 0, 'coupling': 0} for c in json.loads(cand_ids)
+            }
+            queries = {
+                'direct': """
+                    SELECT node, COUNT(*) FROM (
+                        SELECT citing_corpus_id AS node FROM citation_edges
+                        WHERE cited_corpus_id IN seed_set AND citing_corpus_id IN cand_set
+                        UNION ALL
+                        SELECT cited_corpus_id AS node FROM citation_edges
+                        WHERE citing_corpus_id IN seed_set AND cited_corpus_id IN cand_set
+                    )
+                    GROUP BY node
+                """,
+                'co_citation': """
+                    SELECT e2.cited_corpus_id, COUNT(*)
+                    FROM citation_edges e1
+                    JOIN citation_edges e2 ON e2.citing_corpus_id = e1.citing_corpus_id
+                    WHERE e1.cited_corpus_id IN seed_set AND e2.cited_corpus_id IN cand_set
+                    GROUP BY e2.cited_corpus_id
+                """,
+                'coupling': """
+                    SELECT e2.citing_corpus_id, COUNT(*)
+                    FROM citation_edges e1
+                    JOIN citation_edges e2 ON e2.cited_corpus_id = e1.cited_corpus_id
+                    WHERE e1.citing_corpus_id IN seed_set AND e2.citing_corpus_id IN cand_set
+                    GROUP BY e2.citing_corpus_id
+                """,
+            }
+            for name, sql in queries.items():
+                for node, n in conn.execute(sql):
+                    scores[node][name] = n
+        finally:
+            conn.close()
+
+        for s in scores.values():
+            s['score'] = DIRECT_WEIGHT * s['direct'] + s['co_citation'] + s['coupling']
+        return scores
+
+
+def known_corpus_ids(conn: sqlite3.Connection) -> Set[int]:
+    """Every corpus_id already in articles, as a hash set for O(1) novelty checks"""
+    return {int(row[0]) for row in conn.execute(
+        "SELECT corpus_id FROM articles WHERE corpus_id IS NOT NULL"
+    ) if str(row[0]).isdigit()}
+
+
+async def expand_articles(
+    s2: S2Client,
+    db_path: str,
+    seed_articles: List[str],
+    hops: int = 2,
+    max_frontier: int = 200,
+    max_candidates: int = 50,
+    min_score: float = 1.0
+) -> Dict[str, Any]:
+    """
+    L4 expansion: seeds -> novel, ranked, upserted candidate articles
+
+    Args:
+        s2: Semantic Scholar client
+        db_path: Database path
+        seed_articles: article_ids to expand from (seeds without a corpus_id are skipped)
+        hops: BFS depth
+        max_frontier: Nodes kept per hop
+        max_candidates: Novel candidates to add
+        min_score: Minimum relatedness score
+
+    Returns:
+        Dict with article_ids (new candidates, best first), reached, novel and fetched counts
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        seeds = {int(row[0]) for row in conn.execute(
+            "SELECT corpus_id FROM articles "
+            "WHERE article_id IN (SELECT value FROM json_each(?)) AND corpus_id IS NOT NULL",
+            (json.dumps(seed_articles),)
+        ) if str(row[0]).isdigit()}
+        known = known_corpus_ids(conn)
+    finally:
+        conn.close()
+
+    if not seeds:
+        raise ValueError("None of the seed articles has a corpus_id to expand from")
+
+    graph = CitationGraph(db_path)
+    reached = await graph.expand(s2, seeds, hops=hops, max_frontier=max_frontier)
+    novel = [n for n in reached if n not in known]
+    scores = graph.score(seeds, novel)
+    ranked = sorted(
+        (n for n in novel if scores[n]['score'] >= min_score),
+        key=lambda n: (-scores[n]['score'], reached[n], n)
+    )[:max_candidates]
+
+    article_ids: List[str] = []
+    if ranked:
+        papers = await s2.batch_lookup([f'CorpusId:{n}' for n in ranked], fields=PAPER_FIELDS)
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            article_ids = upsert_papers(conn, papers)
+            conn.commit()
+        finally:
+            conn.close()
+
+    logger.info(
+        f"L4 expansion: {len(seeds)} seeds, {len(reached)} reached, {len(novel)} novel, "
+        f"{len(article_ids)} added ({graph.fetched} neighbour lists fetched)"
+    )
+    return {
+        'article_ids': article_ids,
+        'seeds': len(seeds),
+        'reached': len(reached),
+        'novel': len(novel),
+        'neighbour_fetches': graph.fetched,
+    }
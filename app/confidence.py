@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Batch Confidence Recompute
+Refreshes rules.confidence / triangulation_score / contradiction_count
+
+contradiction_count = contradicting rule_evidence rows plus confirmed
+contradiction pairs (app/contradictions.py) involving the rule's findings.
+
+Applies the calculate_meta_confidence() formula from meta_review to every
+rule's linked findings at once:
+
+    triangulation   = min(distinct operational measures / 4, 1) * 0.4
+    effect_strength = min(mean non-zero effect size / 0.8, 1) * 0.3   (0.5 if none)
+    sample_size     = min(total N / 200, 1) * 0.2
+    consistency     = 0.1 if every measure_direction agrees else 0
+
+The finding columns are loaded once into NumPy arrays, grouped by rule
+with np.unique/np.bincount, and only rules whose stored values changed
+are written back with one executemany(). Confidence is clamped to [0, 1]
+(negative effect sizes could otherwise push it below the CHECK range).
+NumPy is optional; without it the same formula runs in plain Python loops.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRIANGULATION_WEIGHT = 0.4
+EFFECT_WEIGHT = 0.3
+SAMPLE_WEIGHT = 0.2
+CONSISTENCY_WEIGHT = 0.1
+MEASURES_FOR_FULL_TRIANGULATION = 4.0
+EFFECT_SIZE_FOR_FULL_STRENGTH = 0.8
+SAMPLE_SIZE_FOR_FULL_STRENGTH = 200.0
+DEFAULT_EFFECT_SIZE = 0.5
+
+_EPSILON = 1e-9
+
+# Columns: rule_id, operational_measure, effect_size, sample_size, measure_direction
+Row = Tuple[str, Optional[str], Optional[float], Optional[int], Optional[str]]
+
+
+def load_rule_findings(conn: sqlite3.Connection, rule_ids: Optional[Iterable[str]] = None) -> List[Row]:
+    """Distinct (rule, finding) pairs with the finding columns the formula needs"""
+    sql = """
+        SELECT DISTINCT re.rule_id, f.id, f.operational_measure, f.effect_size,
+               f.sample_size, f.measure_direction
+        FROM rule_evidence re
+        JOIN findings f ON f.id = re.finding_id
+    """
+    params: tuple = ()
+    if rule_ids is not None:
+        sql += " WHERE re.rule_id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(rule_ids)),)
+    return [(r[0], r[2], r[3], r[4], r[5]) for r in conn.execute(sql, params)]
+
+
+def _scores(unique_measures, avg_effect, total_n, consistent):
+    triangulation = min(unique_measures / MEASURES_FOR_FULL_TRIANGULATION, 1.0)
+    confidence = (
+        triangulation * TRIANGULATION_WEIGHT
+        + min(avg_effect / EFFECT_SIZE_FOR_FULL_STRENGTH, 1.0) * EFFECT_WEIGHT
+        + min(total_n / SAMPLE_SIZE_FOR_FULL_STRENGTH, 1.0) * SAMPLE_WEIGHT
+        + (CONSISTENCY_WEIGHT if consistent else 0.0)
+    )
+    return min(max(confidence, 0.0), 1.0), triangulation
+
+
+def compute_scores_python(rows: List[Row]) -> Dict[str, Tuple[float, float]]:
+    """rule_id -> (confidence, triangulation_score), one group at a time"""
+    groups: Dict[str, List[Row]] = {}
+    for row in rows:
+        groups.setdefault(row[0], []).append(row)
+
+    out = {}
+    for rule_id, group in groups.items():
+        measures = {r[1] for r in group if r[1]}
+        effects = [r[2] for r in group if r[2]]
+        avg_effect = sum(effects) / len(effects) if effects else DEFAULT_EFFECT_SIZE
+        total_n = sum(r[3] or 0 for r in group)
+        directions = {r[4] for r in group if r[4]}
+        out[rule_id] = _scores(len(measures), avg_effect, total_n, len(directions) == 1)
+    return out
+
+
+def compute_scores_numpy(rows: List[Row]) -> Dict[str, Tuple[float, float]]:
+    """rule_id -> (confidence, triangulation_score) via grouped array reductions"""
+    import numpy as np
+
+    if not rows:
+        return {}
+
+    rule_ids, measures, effects, samples, directions = zip(*rows)
+    names, group = np.unique(np.array(rule_ids, dtype=str), return_inverse=True)
+    n_groups = len(names)
+
+    def distinct_per_group(values):
+        labels = np.array([v if v else '' for v in values], dtype=str)
+        codes_names, codes = np.unique(labels, return_inverse=True)
+        present = labels != ''
+        pairs = np.unique(group[present].astype(np.int64) * len(codes_names) + codes[present])
+        return np.bincount(pairs // len(codes_names), minlength=n_groups)
+
+    unique_measures = distinct_per_group(measures)
+    n_directions = distinct_per_group(directions)
+
+    effect = np.array([e if e else 0.0 for e in effects], dtype=float)
+    has_effect = effect != 0.0
+    effect_sum = np.bincount(group[has_effect], weights=effect[has_effect], minlength=n_groups)
+    effect_cnt = np.bincount(group[has_effect], minlength=n_groups)
+    avg_effect = np.where(effect_cnt > 0, effect_sum / np.maximum(effect_cnt, 1), DEFAULT_EFFECT_SIZE)
+
+    total_n = np.bincount(group, weights=np.array([n or 0 for n in samples], dtype=float), minlength=n_groups)
+
+    triangulation = np.minimum(unique_measures / MEASURES_FOR_FULL_TRIANGULATION, 1.0)
+    confidence = (
+        triangulation * TRIANGULATION_WEIGHT
+        + np.minimum(avg_effect / EFFECT_SIZE_FOR_FULL_STRENGTH, 1.0) * EFFECT_WEIGHT
+        + np.minimum(total_n / SAMPLE_SIZE_FOR_FULL_STRENGTH, 1.0) * SAMPLE_WEIGHT
+        + np.where(n_directions == 1, CONSISTENCY_WEIGHT, 0.0)
+    ).clip(0.0, 1.0)
+    return {
+        name: (float(c), float(t))
+        for name, c, t in zip(names.tolist(), confidence.tolist(), triangulation.tolist())
+    }
+
+
+def compute_scores(rows: List[Row]) -> Dict[str, Tuple[float, float]]:
+    """Vectorised when NumPy is installed, plain Python otherwise"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return compute_scores_python(rows)
+    return compute_scores_numpy(rows)
+
+
+def _changed(old: Optional[float], new: float) -> bool:
+    return old is None or math.fabs(old - new) > _EPSILON
+
+
+def recompute_confidence(db_path: str = "./ae.db", rule_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Recompute and write back confidence fields for all (or some) rules
+
+    Args:
+        db_path: Database path
+        rule_ids: Only these rules (e.g. after their evidence changed); None = all
+
+    Returns:
+        Dict with rules scored and rules updated
+    """
+    rule_ids = list(rule_ids) if rule_ids is not None else None
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        scores = compute_scores(load_rule_findings(conn, rule_ids))
+
+        evidence_filter = pair_filter = rules_filter = ""
+        params: tuple = ()
+        if rule_ids is not None:
+            in_rules = "IN (SELECT value FROM json_each(?))"
+            evidence_filter = f"AND rule_id {in_rules}"
+            pair_filter = f"AND re.rule_id {in_rules}"
+            rules_filter = f" WHERE rule_id {in_rules}"
+            params = (json.dumps(rule_ids),)
+
+        # Contradicting evidence rows + confirmed contradiction pairs touching the
+        # rule's findings (the latter is what trg_contradiction_* maintain incrementally)
+        contradictions = dict(conn.execute(f"""
+            SELECT rule_id, SUM(n) FROM (
+                SELECT rule_id, COUNT(*) AS n FROM rule_evidence
+                WHERE stance = 'contradicting' {evidence_filter}
+                GROUP BY rule_id
+                UNION ALL
+                SELECT rule_id, COUNT(*) AS n FROM (
+                    SELECT DISTINCT re.rule_id, c.finding_a, c.finding_b
+                    FROM contradiction_candidates c
+                    JOIN rule_evidence re ON re.finding_id IN (c.finding_a, c.finding_b)
+                    WHERE c.status = 'contradicting' AND COALESCE(re.stance, '') != 'contradicting'
+                          {pair_filter}
+                )
+                GROUP BY rule_id
+            )
+            GROUP BY rule_id
+        """, params * 2).fetchall())
+
+        sql = "SELECT rule_id, confidence, triangulation_score, contradiction_count FROM rules" + rules_filter
+
+        updates = []
+        for rule_id, confidence, triangulation, contradiction_count in conn.execute(sql, params).fetchall():
+            new_contradictions = contradictions.get(rule_id, 0)
+            if rule_id in scores:
+                new_confidence, new_triangulation = scores[rule_id]
+            else:
+                new_confidence, new_triangulation = confidence, triangulation
+            if (
+                (rule_id in scores and (_changed(confidence, new_confidence)
+                                        or _changed(triangulation, new_triangulation)))
+                or (contradiction_count or 0) != new_contradictions
+            ):
+                updates.append((new_confidence, new_triangulation, new_contradictions, rule_id))
+
+        conn.executemany("""
+            UPDATE rules
+            SET confidence = ?, triangulation_score = ?, contradiction_count = ?,
+                updated_at = datetime('now')
+            WHERE rule_id = ?
+        """, updates)
+        conn.commit()
+    finally:
+        conn.close()
+
+    logger.info(f"Confidence recompute: {len(scores)} rules scored, {len(updates)} updated")
+    return {'scored': len(scores), 'updated': len(updates)}
+
+
+def main():
+    """Recompute rule confidence after evidence or formula changes"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Article Eater confidence recompute')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--rule', action='append', help='Only this rule_id (repeatable)')
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = recompute_confidence(args.db, args.rule)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
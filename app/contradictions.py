@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Contradiction Candidate Index
+Near-linear candidate generation for prompts/contradiction_detection.md
+
+Each finding is bucketed once by its normalised (antecedents, consequent)
+key. A new finding is compared only with the findings in its own bucket
+whose measure_direction is the opposite (increase vs decrease), and those
+pairs are queued in contradiction_candidates. Only queued pairs go to the
+LLM stance check. Confirming or retracting a contradiction adjusts
+rules.contradiction_count for the rules backed by either finding, through
+triggers in db/sql/024_contradiction_index.sql. app/confidence.py
+recomputes the same count from scratch.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.extraction import parse_json_output
+from app.llm import LLMClient
+
+logger = logging.getLogger(__name__)
+
+PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "contradiction_detection.md"
+
+DIRECTION_SYNONYMS = {
+    'increase': 'increase', 'increases': 'increase', 'increased': 'increase', 'positive': 'increase',
+    'higher': 'increase', 'up': 'increase', 'improve': 'increase', 'improves': 'increase',
+    'decrease': 'decrease', 'decreases': 'decrease', 'decreased': 'decrease', 'negative': 'decrease',
+    'lower': 'decrease', 'down': 'decrease', 'reduce': 'decrease', 'reduces': 'decrease',
+}
+OPPOSITE = {'increase': 'decrease', 'decrease': 'increase'}
+STANCE_STATUS = {'contradicting': 'contradicting', 'supporting': 'consistent', 'neutral': 'neutral'}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_construct(text: str) -> str:
+    """'Window View ' -> 'window_view'"""
+    return _NON_WORD.sub('_', (text or '').lower()).strip('_')
+
+
+def bucket_key(antecedents: Optional[str], consequent: str) -> str:
+    """Order-insensitive key for a finding's (antecedents, consequent)"""
+    try:
+        items = json.loads(antecedents) if antecedents else []
+    except (TypeError, json.JSONDecodeError):
+        items = [antecedents]
+    if not isinstance(items, list):
+        items = [items]
+    names = sorted({normalize_construct(str(a)) for a in items if a} - {''})
+    return f"{'+'.join(names)}->{normalize_construct(consequent)}"
+
+
+def normalize_direction(direction: Optional[str]) -> Optional[str]:
+    if not direction:
+        return None
+    d = direction.strip().lower()
+    return DIRECTION_SYNONYMS.get(d, d)
+
+
+def index_findings(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Bucket findings not yet indexed and queue their opposite-direction peers
+
+    Work is proportional to the new findings times their bucket sizes, not
+    to the square of the table. Caller commits.
+
+    Returns:
+        Dict with indexed findings and new candidate pairs
+    """
+    new = conn.execute("""
+        SELECT f.id, f.antecedents, f.consequent, f.measure_direction
+        FROM findings f
+        LEFT JOIN finding_buckets b ON b.finding_id = f.id
+        WHERE b.finding_id IS NULL
+    """).fetchall()
+
+    rows = [(fid, bucket_key(ants, cons), normalize_direction(direction)) for fid, ants, cons, direction in new]
+    conn.executemany(
+        "INSERT INTO finding_buckets (finding_id, bucket_key, direction) VALUES (?, ?, ?)", rows
+    )
+
+    before = conn.total_changes
+    for fid, key, direction in rows:
+        opposite = OPPOSITE.get(direction)
+        if not opposite:
+            continue
+        conn.execute("""
+            INSERT OR IGNORE INTO contradiction_candidates (finding_a, finding_b, bucket_key)
+            SELECT MIN(?, finding_id), MAX(?, finding_id), ?
+            FROM finding_buckets
+            WHERE bucket_key = ? AND direction = ? AND finding_id != ?
+        """, (fid, fid, key, key, opposite, fid))
+    candidates = conn.total_changes - before
+
+    if rows:
+        logger.info(f"Contradiction index: {len(rows)} findings bucketed, {candidates} new candidate pairs")
+    return {'indexed': len(rows), 'candidates': candidates}
+
+
+def record_stance(
+    conn: sqlite3.Connection,
+    finding_a: int,
+    finding_b: int,
+    stance: str,
+    rationale: Any = None
+) -> str:
+    """Store the stance for a candidate pair; triggers keep contradiction_count in step. Caller commits."""
+    status = STANCE_STATUS.get((stance or '').lower(), 'neutral')
+    a, b = sorted((finding_a, finding_b))
+    conn.execute("""
+        UPDATE contradiction_candidates
+        SET status = ?, rationale = ?, checked_at = datetime('now')
+        WHERE finding_a = ? AND finding_b = ?
+    """, (status, json.dumps(rationale) if rationale is not None else None, a, b))
+    return status
+
+
+def _finding_payload(conn: sqlite3.Connection, finding_id: int) -> Dict[str, Any]:
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("""
+            SELECT id, consequent, antecedents, operational_measure, measure_type, measure_direction,
+                   p_value, effect_size, sample_size, study_design, paper_id
+            FROM findings WHERE id = ?
+        """, (finding_id,)).fetchone()
+    finally:
+        conn.row_factory = None
+    return dict(row) if row else {'id': finding_id}
+
+
+async def check_candidates(
+    llm: LLMClient,
+    db_path: str,
+    user_id: str,
+    provider: str,
+    model: str,
+    limit: int = 100,
+    concurrency: int = 8
+) -> Dict[str, int]:
+    """
+    Send pending candidate pairs to the LLM stance check
+
+    Pairs are checked independently: a provider error or unparsable reply
+    for one pair is logged and that pair stays pending for the next run,
+    while every verdict that did come back is recorded.
+
+    Returns:
+        Count of pairs per resulting status, plus 'failed' for pairs whose check raised
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        pending = conn.execute("""
+            SELECT finding_a, finding_b FROM contradiction_candidates
+            WHERE status = 'pending' ORDER BY created_at LIMIT ?
+        """, (limit,)).fetchall()
+        pairs = [(a, b, _finding_payload(conn, a), _finding_payload(conn, b)) for a, b in pending]
+    finally:
+        conn.close()
+
+    template = PROMPT_PATH.read_text(encoding='utf-8').strip()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def check(a, b, fa, fb):
+        inputs = {'finding_a': fa, 'finding_b': fb}
+        prompt = (
+            f"{template}\n\nTreat FINDING A as the rule and FINDING B as the article. "
+            f"Return a single JSON object with keys stance and quotes.\n\n"
+            f"### FINDING A\n{json.dumps(fa, indent=2)}\n\n### FINDING B\n{json.dumps(fb, indent=2)}"
+        )
+        try:
+            async with gate:
+                result = await llm.complete(
+                    user_id, provider, model, prompt,
+                    max_tokens=512, template=str(PROMPT_PATH), inputs=inputs,
+                    operation='contradiction_check'
+                )
+            return a, b, parse_json_output(result['text'])
+        except Exception as e:
+            logger.warning(f"Stance check for findings {a}/{b} failed, left pending: {e}")
+            return a, b, None
+
+    checked = await asyncio.gather(*(check(*pair) for pair in pairs))
+
+    counts: Dict[str, int] = {}
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        for a, b, verdict in checked:
+            if verdict is None:
+                counts['failed'] = counts.get('failed', 0) + 1
+                continue
+            status = record_stance(conn, a, b, verdict.get('stance', 'neutral'), verdict)
+            counts[status] = counts.get(status, 0) + 1
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def main():
+    """Index new findings and optionally run the LLM check on pending pairs"""
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Article Eater contradiction candidates')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--check', type=int, default=0, metavar='N',
+                        help='Send up to N pending pairs to the LLM stance check')
+    parser.add_argument('--user', default='system', help='User whose API key pays for --check')
+    parser.add_argument('--provider', default=os.environ.get('AE_LLM_PROVIDER', 'openai'))
+    parser.add_argument('--model', default=os.environ.get('AE_LLM_MODEL', 'gpt-4o-mini'))
+
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        result: Dict[str, Any] = index_findings(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if args.check:
+        from app.llm import LLMCache, RateLimiter
+        from app.security import KeyManager
+        from app.usage import UsageLedger
+
+        keys = KeyManager(args.db)
+
+        async def run():
+            async with LLMClient(keys.retrieve_key, RateLimiter(args.db), cache=LLMCache(),
+                                 ledger=UsageLedger(args.db)) as llm:
+                return await check_candidates(llm, args.db, args.user, args.provider, args.model, args.check)
+
+        try:
+            result['checked'] = asyncio.run(run())
+        finally:
+            keys.close()  # flush usage counts, zero cached keys
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
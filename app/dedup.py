@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Near-Duplicate Article Detection
+MinHash signatures + LSH banding over ingested paper text
+
+The same paper reaches the corpus as preprint and published versions,
+repeated uploads, and harvests without a DOI. At ingest each article's
+cleaned text and abstract are reduced to word 5-shingles and a 128-value
+MinHash signature (512 bytes). The signature is split into 16 bands of 8
+rows; articles sharing any band bucket are candidates, and a candidate
+whose estimated Jaccard similarity reaches the threshold is linked as a
+duplicate of the earlier (canonical) article. L1 fan-out and L2
+extraction resolve to the canonical article, so the paper is extracted once.
+
+Schema: db/sql/022_article_minhash.sql.
+"""
+
+import hashlib
+import logging
+import random
+import re
+import sqlite3
+import struct
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+LSH_BANDS = 16
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.8
+MIN_SHINGLES = 50
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+@lru_cache(maxsize=4)
+def _permutations(num_perm: int) -> Tuple[Tuple[int, int], ...]:
+    """Universal hash (a, b) pairs; fixed seed so signatures are stable across processes"""
+    rng = random.Random(20251019)
+    return tuple((rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm))
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> set:
+    """32-bit hashes of the distinct word shingles in text (case and punctuation folded)"""
+    tokens = _TOKEN.findall(text.lower())
+    shingles = [' '.join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))] if tokens else []
+    return {
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+        for s in shingles
+    }
+
+
+def minhash_signature(text: str, num_perm: int = NUM_PERM) -> Tuple[List[int], int]:
+    """
+    MinHash signature of text
+
+    Returns:
+        (signature, number of distinct shingles)
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return [_MAX_HASH] * num_perm, 0
+    return [
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in hashes)
+        for a, b in _permutations(num_perm)
+    ], len(hashes)
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    return struct.pack(f'<{len(signature)}I', *signature)
+
+
+def unpack_signature(blob: bytes) -> List[int]:
+    return list(struct.unpack(f'<{len(blob) // 4}I', blob))
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def band_buckets(signature: List[int], bands: int = LSH_BANDS) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs; bucket is a signed 64-bit hash of the band's rows"""
+    rows = len(signature) // bands
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(pack_signature(signature[band * rows:(band + 1) * rows]), digest_size=8).digest(),
+            'little', signed=True
+        ))
+        for band in range(bands)
+    ]
+
+
+def canonical_ids(conn: sqlite3.Connection, article_ids: Iterable[str]) -> Dict[str, str]:
+    """Map each article_id to its canonical article (itself when not a duplicate)"""
+    article_ids = list(article_ids)
+    placeholders = ','.join('?' * len(article_ids))
+    links = dict(conn.execute(
+        f"SELECT article_id, canonical_id FROM article_duplicates WHERE article_id IN ({placeholders})",
+        article_ids
+    ).fetchall()) if article_ids else {}
+    return {a: links.get(a, a) for a in article_ids}
+
+
+def index_article(
+    conn: sqlite3.Connection,
+    article_id: str,
+    text: str,
+    threshold: float = DUPLICATE_THRESHOLD,
+    min_shingles: int = MIN_SHINGLES
+) -> Optional[str]:
+    """
+    Store an article's signature and LSH buckets, linking it if it duplicates another
+
+    Args:
+        conn: Open connection (caller commits)
+        article_id: Article just ingested
+        text: Cleaned full text plus abstract
+        threshold: Minimum estimated Jaccard similarity to count as a duplicate
+        min_shingles: Articles with fewer distinct shingles are indexed but never linked
+
+    Returns:
+        canonical_id if article_id was linked as a duplicate, else None
+    """
+    signature, shingles = minhash_signature(text)
+    buckets = band_buckets(signature)
+
+    conn.execute("""
+        INSERT OR REPLACE INTO article_signatures (article_id, signature, num_perm, shingles, computed_at)
+        VALUES (?, ?, ?, ?, datetime('now'))
+    """, (article_id, pack_signature(signature), len(signature), shingles))
+    conn.execute("DELETE FROM article_lsh_bands WHERE article_id = ?", (article_id,))
+    conn.execute("DELETE FROM article_duplicates WHERE article_id = ?", (article_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO article_lsh_bands (band, bucket, article_id) VALUES (?, ?, ?)",
+        [(band, bucket, article_id) for band, bucket in buckets]
+    )
+    if shingles < min_shingles:
+        return None
+
+    values = ','.join('(?, ?)' for _ in buckets)
+    candidates = conn.execute(f"""
+        SELECT DISTINCT s.article_id, s.signature, COALESCE(d.canonical_id, s.article_id)
+        FROM article_lsh_bands b
+        JOIN article_signatures s ON s.article_id = b.article_id
+        LEFT JOIN article_duplicates d ON d.article_id = s.article_id
+        WHERE (b.band, b.bucket) IN (VALUES {values})
+          AND b.article_id != ? AND s.shingles >= ?
+    """, [v for pair in buckets for v in pair] + [article_id, min_shingles]).fetchall()
+
+    best: Optional[Tuple[float, str]] = None
+    for other_id, blob, canonical in candidates:
+        if canonical == article_id:
+            continue
+        sim = similarity(signature, unpack_signature(blob))
+        if sim >= threshold and (best is None or sim > best[0]):
+            best = (sim, canonical)
+
+    if best is None:
+        return None
+
+    sim, canonical = best
+    conn.execute("""
+        INSERT INTO article_duplicates (article_id, canonical_id, similarity) VALUES (?, ?, ?)
+    """, (article_id, canonical, sim))
+    # Anything that pointed at this article now points at its canonical copy
+    conn.execute(
+        "UPDATE article_duplicates SET canonical_id = ? WHERE canonical_id = ?", (canonical, article_id)
+    )
+    logger.info(f"Article {article_id} is a near-duplicate of {canonical} (similarity {sim:.2f})")
+    return canonical
+
+
+def reindex_all(db_path: str = "./ae.db") -> Dict[str, int]:
+    """
+    Backfill signatures for every article with text, oldest first
+
+    Returns:
+        Dict with indexed and duplicates counts
+    """
+    from app.pdf_ingest import clean_extracted_text
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute("""
+            SELECT article_id, full_text, abstract FROM articles
+            WHERE full_text IS NOT NULL OR abstract IS NOT NULL
+            ORDER BY created_at, article_id
+        """).fetchall()
+        duplicates = 0
+        for article_id, full_text, abstract in rows:
+            text = f"{clean_extracted_text(full_text or '')} {abstract or ''}"
+            if index_article(conn, article_id, text):
+                duplicates += 1
+        conn.commit()
+    finally:
+        conn.close()
+    return {'indexed': len(rows), 'duplicates': duplicates}
+
+
+def main():
+    """Backfill MinHash signatures and report near-duplicates"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Article Eater near-duplicate detection')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+
+    args = parser.parse_args()
+    print(json.dumps(reindex_all(args.db), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Concurrent 7-Panel Extraction
+Runs the independent L2 prompt passes for one paper concurrently
+
+The Panel 5 findings pass (7panel_pass2_findings) and the Panel 6
+mechanisms/limits pass (7panel_pass3_mechanisms_limits) both read only
+the sectioned text, so they run side by side in one asyncio.TaskGroup.
+Each pass is followed directly by its 7panel_qc_guard check, so QC for
+one pass starts as soon as that pass is done. Chunks produced by
+app/llm/packing.py are also sent concurrently. Wall-clock time per paper
+is the slowest pass + QC rather than the sum of every call.
+
+If any pass fails or times out, the TaskGroup cancels its siblings and
+the error propagates to the worker, which retries the job; passes that
+already finished are then served from the LLM cache, together with the
+parsed panels stored for them, so they are neither paid for nor re-parsed.
+
+Every chunk answer is checked against seven_panel.schema.json in one
+batch with the compiled validators from app/schemas.py, and all errors
+are grouped by panel. The QC guard is told which panels failed. Any
+owned panel that failed validation or that QC lists under "reasks" is
+then re-asked once: all of a pass's re-asked panels go out together in a
+single narrow call per chunk, so re-asking never costs more input than the
+pass itself. An empty string is a valid (if empty) answer, e.g. a paper
+with no limitations section; only a panel absent from every chunk counts
+as missing.
+
+extract_batch() is the batch-mode entry point: short papers are packed
+several to a request (app/llm/packing.py pack_papers/render_batch) and the
+answer is split back per article before the same per-paper checks.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.llm import LLMClient, model_budget, pack_papers, pack_sections, render_batch, render_sections
+from app.schemas import get_registry
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+# Pass name -> panels it is responsible for (seven_panel.schema.json keys)
+EXTRACTION_PASSES: Dict[str, tuple] = {
+    '7panel_pass2_findings': ('findings_effect', 'stats_effect_sizes'),
+    '7panel_pass3_mechanisms_limits': ('limitations_confounds', 'findings_effect'),
+}
+QC_PASS = '7panel_qc_guard'
+PANEL_SCHEMA = 'seven_panel.schema.json'
+
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$', re.MULTILINE)
+
+
+def parse_json_output(text: str) -> Dict[str, Any]:
+    """
+    Parse a model's JSON answer, tolerating ```json fences and surrounding prose
+
+    Returns:
+        Parsed object, or {} if no JSON object could be recovered
+    """
+    cleaned = _FENCE.sub('', text or '').strip()
+    try:
+        data = json.loads(cleaned)
+        return data if isinstance(data, dict) else {}
+    except json.JSONDecodeError:
+        start, end = cleaned.find('{'), cleaned.rfind('}')
+        if start != -1 and end > start:
+            try:
+                data = json.loads(cleaned[start:end + 1])
+                return data if isinstance(data, dict) else {}
+            except json.JSONDecodeError:
+                pass
+    return {}
+
+
+def _merge_panels(target: Dict[str, str], update: Dict[str, Any], panels: tuple) -> None:
+    """Append each owned panel's text from update into target"""
+    for panel in panels:
+        value = update.get(panel)
+        if not value:
+            continue
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False)
+        target[panel] = f"{target[panel]}\n{value}" if target.get(panel) else value
+
+
+def panel_errors(article_id: str, outputs: List[Dict[str, Any]], panels: tuple) -> Dict[str, List[str]]:
+    """
+    Validate every chunk's answer for the given panels in one batch
+
+    Returns:
+        {panel: [error, ...]} for panels that failed the schema or that no
+        chunk returned at all ({} when everything is valid); an empty
+        string is a valid answer
+    """
+    documents = [
+        {'article_id': article_id, 'panels': {p: output[p] for p in panels if p in output}}
+        for output in outputs
+    ]
+    failed: Dict[str, List[str]] = {}
+    for i, errors in get_registry().validate_many(PANEL_SCHEMA, documents).items():
+        for error in errors:
+            panel = error['path'].split('/')[2] if error['path'].startswith('/panels/') else ''
+            failed.setdefault(panel, []).append(f"chunk {i}{error['path']}: {error['message']}")
+    for panel in panels:
+        if panel not in failed and not any(panel in output for output in outputs):
+            failed[panel] = ['missing from every chunk']
+    return failed
+
+
+def _qc_reasks(qc: Dict[str, Any]) -> Set[str]:
+    """Panel names the QC guard asked to regenerate ("reasks": names or {"panel": ...})"""
+    reasks = qc.get('reasks') or []
+    if not isinstance(reasks, list):
+        return set()
+    return {r.get('panel') if isinstance(r, dict) else r for r in reasks} - {None}
+
+
+def _no_input(article_id: str, pass_name: str) -> Dict[str, Any]:
+    logger.warning(f"Article {article_id}: no input sections for {pass_name}")
+    return {'panels': {}, 'qc': {'skipped': 'no input sections'}, 'validation': {'errors': {}, 'reasked': []}}
+
+
+def _first_error(group: BaseExceptionGroup) -> BaseException:
+    """First leaf exception of a (possibly nested) TaskGroup failure"""
+    error = group.exceptions[0]
+    while isinstance(error, BaseExceptionGroup):
+        error = error.exceptions[0]
+    return error
+
+
+class SevenPanelExtractor:
+    """
+    Concurrent L2 extraction for one article
+
+    Usage:
+        async with LLMClient(...) as llm:
+            extractor = SevenPanelExtractor(llm, 'user123', 'openai', 'gpt-4o-mini')
+            result = await extractor.extract('art-001', sections)
+            result['panels'], result['qc'], result['validation'], result['calls']
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        user_id: str,
+        provider: str,
+        model: str,
+        pass_timeout: float = 300.0,
+        max_output_tokens: int = 2048
+    ):
+        self.llm = llm
+        self.user_id = user_id
+        self.provider = provider
+        self.model = model
+        self.pass_timeout = pass_timeout
+        self.max_output_tokens = max_output_tokens
+        self.budget = model_budget(model, max_output_tokens=max_output_tokens)
+        get_registry()  # compile schemas/ once per process, failing fast on a bad schema
+        self.calls: List[Dict[str, Any]] = []
+
+    def _template(self, pass_name: str) -> Path:
+        return PROMPTS_DIR / f"{pass_name}.md"
+
+    async def _call(self, pass_name: str, inputs: Dict[str, Any], body: str) -> Dict[str, Any]:
+        template = self._template(pass_name)
+        prompt = f"{template.read_text(encoding='utf-8').strip()}\n\nReturn a single JSON object.\n\n{body}"
+        result = await self.llm.complete(
+            self.user_id,
+            self.provider,
+            self.model,
+            prompt,
+            max_tokens=self.max_output_tokens,
+            template=str(template),
+            inputs=inputs,
+            operation='L2_extraction'
+        )
+        self.calls.append({
+            'pass': pass_name,
+            'cached': result.get('cached', False),
+            'tokens_in': result.get('tokens_in', 0),
+            'tokens_out': result.get('tokens_out', 0),
+        })
+        parsed = result.get('parsed')
+        if parsed is None:
+            parsed = parse_json_output(result['text'])
+            if result.get('cache_key'):
+                await asyncio.to_thread(self.llm.cache.set_parsed, result['cache_key'], parsed)
+        return parsed
+
+    async def _run_pass(self, article_id: str, pass_name: str, sections: Dict[str, str]) -> Dict[str, Any]:
+        """One extraction pass (all chunks concurrently) followed by its QC guard"""
+        async with asyncio.timeout(self.pass_timeout):
+            chunks = pack_sections(sections, pass_name, self.budget)
+            if not chunks:
+                return _no_input(article_id, pass_name)
+
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(self._call(
+                        pass_name,
+                        {'article_id': article_id, 'chunk': chunk},
+                        render_sections(chunk)
+                    ))
+                    for chunk in chunks
+                ]
+            outputs = [task.result() for task in tasks]
+            return await self._check_pass(article_id, pass_name, chunks, outputs)
+
+    async def _run_batch_pass(
+        self,
+        pass_name: str,
+        papers: List[Tuple[str, Dict[str, str]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """One pass over several papers (requests packed by pack_papers); each paper is then checked alone"""
+        async with asyncio.timeout(self.pass_timeout):
+            requests = pack_papers(papers, pass_name, self.budget)
+            async with asyncio.TaskGroup() as tg:
+                tasks = [tg.create_task(self._call_batch(pass_name, batch)) for batch in requests]
+
+            answers: Dict[str, Tuple[list, list]] = {article_id: ([], []) for article_id, _ in papers}
+            for batch, task in zip(requests, tasks):
+                for (article_id, chunk), output in zip(batch, task.result()):
+                    answers[article_id][0].append(chunk)
+                    answers[article_id][1].append(output)
+
+            async with asyncio.TaskGroup() as tg:
+                checks = {
+                    article_id: tg.create_task(self._check_pass(article_id, pass_name, chunks, outputs))
+                    for article_id, (chunks, outputs) in answers.items() if chunks
+                }
+        return {
+            article_id: checks[article_id].result() if article_id in checks else _no_input(article_id, pass_name)
+            for article_id in answers
+        }
+
+    async def _call_batch(self, pass_name: str, batch: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """One request for a packed bin of papers; returns each member's answer, in order"""
+        if len(batch) == 1:
+            article_id, chunk = batch[0]
+            return [await self._call(pass_name, {'article_id': article_id, 'chunk': chunk}, render_sections(chunk))]
+        ids = [article_id for article_id, _ in batch]
+        answer = await self._call(
+            pass_name,
+            {'batch': [[article_id, chunk] for article_id, chunk in batch]},
+            f"### BATCH: answer each article separately, as one JSON object keyed by article id "
+            f"({', '.join(ids)}) whose values are that article's panels\n\n{render_batch(batch)}"
+        )
+        # A member the model skipped comes back empty and is re-asked on its own
+        return [answer[a] if isinstance(answer.get(a), dict) else {} for a in ids]
+
+    async def _check_pass(
+        self,
+        article_id: str,
+        pass_name: str,
+        chunks: List[Dict[str, str]],
+        outputs: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Merge one paper's answers for a pass, validate them, run the QC guard and re-ask failures"""
+        owned = EXTRACTION_PASSES[pass_name]
+        panels: Dict[str, str] = {}
+        for output in outputs:
+            _merge_panels(panels, output, owned)
+        failed = panel_errors(article_id, outputs, owned)
+
+        schema_report = json.dumps(failed, ensure_ascii=False, indent=2) if failed else 'none'
+        qc = await self._call(
+            QC_PASS,
+            {'article_id': article_id, 'pass': pass_name, 'panels': panels, 'schema_errors': failed},
+            f"### PANELS ({pass_name})\n{json.dumps(panels, ensure_ascii=False, indent=2)}\n\n"
+            f"### SCHEMA ERRORS (re-ask these panels)\n{schema_report}"
+        )
+
+        reasked = [p for p in owned if p in failed or p in _qc_reasks(qc)]
+        if reasked:
+            logger.info(f"Article {article_id}: {pass_name} re-asking {reasked}")
+            values, errors = await self._reask(article_id, pass_name, tuple(reasked), chunks, failed)
+            for panel in reasked:
+                if panel in errors:
+                    failed[panel] = errors[panel]
+                else:
+                    panels[panel] = values.get(panel, '')
+                    failed.pop(panel, None)
+
+        return {'panels': panels, 'qc': qc, 'validation': {'errors': failed, 'reasked': reasked}}
+
+    async def _reask(
+        self,
+        article_id: str,
+        pass_name: str,
+        panels: tuple,
+        chunks: List[Dict[str, str]],
+        errors: Optional[Dict[str, List[str]]] = None
+    ) -> tuple:
+        """
+        Regenerate several panels of a pass in one call per chunk (concurrently)
+
+        Returns:
+            ({panel: merged text}, {panel: errors}); a panel's text is only
+            usable when it has no errors
+        """
+        errors = errors or {}
+        names = ', '.join(f'"{panel}"' for panel in panels)
+        problems = '\n'.join(
+            f"- {panel}: {e}" for panel in panels for e in errors.get(panel) or ['flagged by QC guard']
+        )
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(self._call(
+                    pass_name,
+                    {'article_id': article_id, 'chunk': chunk, 'reask': list(panels)},
+                    f"### RE-ASK: return only the {names} panel(s), each as a string\n{problems}\n\n"
+                    f"{render_sections(chunk)}"
+                ))
+                for chunk in chunks
+            ]
+        outputs = [task.result() for task in tasks]
+        merged: Dict[str, str] = {}
+        for output in outputs:
+            _merge_panels(merged, output, panels)
+        return merged, panel_errors(article_id, outputs, panels)
+
+    async def extract(self, article_id: str, sections: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Run every extraction pass concurrently
+
+        Args:
+            article_id: Article being extracted
+            sections: Output of section_paper_text()
+
+        Returns:
+            Dict with panels (merged), qc (per pass), validation (per pass:
+            errors left after re-asking, panels re-asked) and calls (per LLM call)
+
+        Raises:
+            TimeoutError: A pass exceeded pass_timeout (siblings are cancelled)
+            ProviderError: A provider call failed (siblings are cancelled)
+        """
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {
+                    pass_name: tg.create_task(self._run_pass(article_id, pass_name, sections))
+                    for pass_name in EXTRACTION_PASSES
+                }
+        except BaseExceptionGroup as group:
+            raise _first_error(group) from group
+        return self._combine(article_id, {pass_name: task.result() for pass_name, task in tasks.items()})
+
+    async def extract_batch(self, papers: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+        """
+        Batch-mode extract(): short papers share requests
+
+        Each pass bin-packs the papers with pack_papers(), so several short
+        papers go out in one request (render_batch) while a long one is
+        chunked on its own. Every paper's answers are then validated,
+        QC-checked and re-asked separately, exactly as in extract().
+
+        Args:
+            papers: (article_id, sections) pairs with distinct article ids
+
+        Returns:
+            One extract()-shaped result per paper, in order; calls covers the whole batch
+        """
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {
+                    pass_name: tg.create_task(self._run_batch_pass(pass_name, papers))
+                    for pass_name in EXTRACTION_PASSES
+                }
+        except BaseExceptionGroup as group:
+            raise _first_error(group) from group
+        return [
+            self._combine(article_id, {pass_name: task.result()[article_id] for pass_name, task in tasks.items()})
+            for article_id, _ in papers
+        ]
+
+    def _combine(self, article_id: str, outcomes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-pass outcomes into one paper's result"""
+        panels: Dict[str, str] = {}
+        qc: Dict[str, Any] = {}
+        validation: Dict[str, Any] = {}
+        for pass_name, outcome in outcomes.items():
+            _merge_panels(panels, outcome['panels'], EXTRACTION_PASSES[pass_name])
+            qc[pass_name] = outcome['qc']
+            validation[pass_name] = outcome['validation']
+
+        return {'article_id': article_id, 'panels': panels, 'qc': qc, 'validation': validation,
+                'calls': list(self.calls)}
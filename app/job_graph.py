@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Job Dependency Graph
+Fan-out / fan-in scheduling on top of processing_queue
+
+A job enqueued with depends_on=[...] starts in 'blocked' and is released
+to 'pending' in the same transaction that completes its last parent.
+When a parent fails terminally, every blocked descendant is failed too.
+Edges live in job_dependencies (db/sql/018_job_dependencies.sql).
+
+Functions take an open sqlite3 connection and do not commit, so callers
+can make enqueue + state change a single transaction.
+"""
+
+import json
+import logging
+import sqlite3
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_FAILURE = ('failed', 'dead')
+
+
+def enqueue_job(
+    conn: sqlite3.Connection,
+    job_type: str,
+    params: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    depends_on: Iterable[str] = (),
+    job_id: Optional[str] = None,
+    max_attempts: int = 3,
+    user_id: str = 'system',
+    job_class: str = 'batch'
+) -> str:
+    """
+    Insert a job, blocked on its parents if any are unfinished
+
+    Inserting an existing job_id is a no-op, so a handler that is retried
+    can fan out again with deterministic child ids without duplicating work.
+    Parents must already exist, which keeps the graph acyclic.
+
+    Args:
+        conn: Open connection (not committed here)
+        job_type: One of the L0-L4 job types
+        params: JSON-serialisable job parameters
+        priority: Queue priority (higher first)
+        depends_on: Parent job_ids that must complete first
+        job_id: Explicit id (default: random UUID)
+        max_attempts: Retry budget
+        user_id: Owner, for fair-share scheduling
+        job_class: 'interactive' (served first) or 'batch'
+
+    Returns:
+        The job_id
+
+    Raises:
+        ValueError: If a parent job does not exist
+    """
+    job_id = job_id or f"job-{uuid.uuid4()}"
+    parents = list(dict.fromkeys(depends_on))
+
+    status, error = 'pending', None
+    if parents:
+        placeholders = ','.join('?' * len(parents))
+        found = dict(conn.execute(
+            f"SELECT job_id, status FROM processing_queue WHERE job_id IN ({placeholders})",
+            parents
+        ).fetchall())
+        missing = [p for p in parents if p not in found]
+        if missing:
+            raise ValueError(f"Unknown parent job(s): {missing}")
+
+        failed = [p for p in parents if found[p] in TERMINAL_FAILURE]
+        if failed:
+            status, error = 'failed', f"upstream job {failed[0]} failed"
+        elif any(found[p] != 'complete' for p in parents):
+            status = 'blocked'
+
+    cursor = conn.execute("""
+        INSERT OR IGNORE INTO processing_queue (
+            job_id, job_type, params, status, priority, max_attempts, error, user_id, job_class
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        job_id, job_type, json.dumps(params or {}), status, priority, max_attempts, error,
+        user_id, job_class
+    ))
+
+    if cursor.rowcount:
+        conn.executemany(
+            "INSERT OR IGNORE INTO job_dependencies (job_id, depends_on) VALUES (?, ?)",
+            [(job_id, p) for p in parents]
+        )
+        logger.info(f"Enqueued {job_type} job {job_id} ({status}, {len(parents)} parent(s))")
+
+    return job_id
+
+
+def release_dependents(conn: sqlite3.Connection, job_id: str) -> List[str]:
+    """
+    Move blocked children of a just-completed job whose parents are all complete to pending
+
+    Returns:
+        job_ids released
+    """
+    rows = conn.execute("""
+        UPDATE processing_queue
+        SET status = 'pending'
+        WHERE status = 'blocked'
+          AND job_id IN (SELECT job_id FROM job_dependencies WHERE depends_on = ?)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM job_dependencies d
+              JOIN processing_queue p ON p.job_id = d.depends_on
+              WHERE d.job_id = processing_queue.job_id
+                AND p.status <> 'complete'
+          )
+        RETURNING job_id
+    """, (job_id,)).fetchall()
+
+    released = [r[0] for r in rows]
+    if released:
+        logger.info(f"Job {job_id} released {len(released)} dependent job(s)")
+    return released
+
+
+def fail_dependents(conn: sqlite3.Connection, job_id: str) -> List[str]:
+    """
+    Fail every blocked descendant of a terminally failed job
+
+    Returns:
+        job_ids failed
+    """
+    rows = conn.execute("""
+        WITH RECURSIVE descendants(job_id) AS (
+            SELECT job_id FROM job_dependencies WHERE depends_on = ?
+            UNION
+            SELECT d.job_id
+            FROM job_dependencies d
+            JOIN descendants ON d.depends_on = descendants.job_id
+        )
+        UPDATE processing_queue
+        SET status = 'failed',
+            error = ?,
+            completed_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+        WHERE status = 'blocked'
+          AND job_id IN (SELECT job_id FROM descendants)
+        RETURNING job_id
+    """, (job_id, f"upstream job {job_id} failed")).fetchall()
+
+    failed = [r[0] for r in rows]
+    if failed:
+        logger.warning(f"Job {job_id} failure cascaded to {len(failed)} dependent job(s)")
+    return failed
+
+
+def enqueue_topic_pipeline(
+    db_path: str,
+    query: str,
+    priority: int = 10,
+    limit: Optional[int] = None,
+    user_id: str = 'system'
+) -> str:
+    """
+    Enqueue an end-to-end pipeline for a topic
+
+    Only the L0 harvest is created up front; each stage fans out the next
+    (L0 -> L1 -> L2 per kept article -> L3 per cluster) when it runs with
+    params['pipeline'] set.
+
+    Returns:
+        job_id of the root L0 job
+    """
+    params: Dict[str, Any] = {'query': query, 'pipeline': True}
+    if limit:
+        params['limit'] = limit
+
+    conn = sqlite3.connect(db_path)
+    try:
+        job_id = enqueue_job(conn, 'L0_harvest', params, priority=priority, user_id=user_id)
+        conn.commit()
+    finally:
+        conn.close()
+    return job_id
+
+
+def main():
+    """Enqueue a topic pipeline from the command line"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Enqueue an L0->L3 topic pipeline')
+    parser.add_argument('query', help='Harvest query terms')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--priority', type=int, default=10, help='Queue priority')
+    parser.add_argument('--limit', type=int, help='Max papers to harvest')
+    parser.add_argument('--user', default='system', help='Owner for fair-share scheduling')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(enqueue_topic_pipeline(args.db, args.query, args.priority, args.limit, args.user))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""
+Article Eater LLM Module
+Provider clients, rate limiting, response caching and prompt packing
+for L2/L3 prompt passes
+"""
+
+from .rate_limit import RateLimiter, RateLimitTimeout, retry_after_seconds
+from .cache import LLMCache, prompt_cache_key, template_sha
+from .client import LLMClient, ProviderError, RateLimitedError, TransientProviderError, estimate_tokens
+from .packing import model_budget, pack_sections, pack_papers, render_sections, render_batch
+
+__all__ = [
+    'RateLimiter', 'RateLimitTimeout', 'retry_after_seconds',
+    'LLMCache', 'prompt_cache_key', 'template_sha',
+    'LLMClient', 'ProviderError', 'RateLimitedError', 'TransientProviderError', 'estimate_tokens',
+    'model_budget', 'pack_sections', 'pack_papers', 'render_sections', 'render_batch',
+]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - LLM Response Cache
+Content-addressed, size-bounded store of provider responses and parsed panels
+
+Entries are keyed by sha256 over (prompt template content hash, provider,
+model, rendered inputs, call params), so a replay after a crash or a QC
+retry costs nothing, while any edit to a prompt file changes the key.
+invalidate_stale() reclaims entries whose template no longer matches the
+file on disk. Eviction is least-recently-used once max_bytes is exceeded.
+
+The cache lives in its own SQLite file (default ./llm_cache.db) so it
+can be shipped as a test fixture or deleted without touching ae.db.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key TEXT PRIMARY KEY,
+    template_path TEXT,
+    template_sha TEXT,
+    provider TEXT,
+    model TEXT,
+    response TEXT NOT NULL,  -- JSON: LLMClient.complete() result
+    parsed TEXT,  -- JSON: parsed panels, filled in after parsing
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_lru ON llm_cache(last_used_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_template ON llm_cache(template_path, template_sha);
+
+CREATE TABLE IF NOT EXISTS llm_cache_meta (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    total_bytes INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO llm_cache_meta (id, total_bytes) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_llm_cache_insert AFTER INSERT ON llm_cache
+BEGIN
+    UPDATE llm_cache_meta SET total_bytes = total_bytes + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_llm_cache_delete AFTER DELETE ON llm_cache
+BEGIN
+    UPDATE llm_cache_meta SET total_bytes = total_bytes - old.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_llm_cache_size AFTER UPDATE OF size ON llm_cache
+BEGIN
+    UPDATE llm_cache_meta SET total_bytes = total_bytes - old.size + new.size WHERE id = 1;
+END;
+"""
+
+_template_memo: Dict[str, Tuple[int, int, str]] = {}
+
+
+def template_sha(path) -> str:
+    """
+    sha256 of a prompt template file, memoised on (mtime_ns, size)
+
+    Args:
+        path: Template file path
+
+    Returns:
+        Hex digest of the file contents
+    """
+    path = str(path)
+    st = os.stat(path)
+    memo = _template_memo.get(path)
+    if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+        return memo[2]
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    _template_memo[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def prompt_cache_key(
+    template_path,
+    provider: str,
+    model: str,
+    inputs: Any,
+    params: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Content address for one prompt call
+
+    Args:
+        template_path: Prompt template file (its content hash is used)
+        provider: Provider name
+        model: Model name
+        inputs: JSON-serialisable rendered inputs (e.g. section texts)
+        params: Call params that change output (max_tokens, temperature, system)
+
+    Returns:
+        Hex sha256 key
+    """
+    material = json.dumps(
+        [template_sha(template_path), provider.lower(), model, inputs, params or {}],
+        sort_keys=True, ensure_ascii=False, separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent response cache
+
+    Usage:
+        cache = LLMCache('./llm_cache.db')
+        key = prompt_cache_key('prompts/7panel_pass2_findings.md', 'openai', model, inputs, params)
+        hit = cache.get(key)            # {'response': {...}, 'parsed': ... or None}
+        cache.put(key, response, template_path=..., provider=..., model=...)
+        cache.set_parsed(key, panels)
+    """
+
+    def __init__(self, path: str = "./llm_cache.db", max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {'response', 'parsed'} for key, or None on a miss"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT response, parsed FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                (time.time(), key)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        return {
+            'response': json.loads(row[0]),
+            'parsed': json.loads(row[1]) if row[1] is not None else None,
+        }
+
+    def put(
+        self,
+        key: str,
+        response: Dict[str, Any],
+        template_path: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        parsed: Any = None
+    ) -> None:
+        """Store a provider response (and optionally its parsed form), then evict if over budget"""
+        response_json = json.dumps(response, ensure_ascii=False)
+        parsed_json = json.dumps(parsed, ensure_ascii=False) if parsed is not None else None
+        size = len(response_json.encode('utf-8')) + len((parsed_json or '').encode('utf-8'))
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+            conn.execute("""
+                INSERT INTO llm_cache (
+                    cache_key, template_path, template_sha, provider, model,
+                    response, parsed, size, created_at, last_used_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                key,
+                str(template_path) if template_path else None,
+                template_sha(template_path) if template_path else None,
+                provider,
+                model,
+                response_json,
+                parsed_json,
+                size,
+                now,
+                now
+            ))
+            conn.commit()
+            self._evict(conn)
+        finally:
+            conn.close()
+
+    def set_parsed(self, key: str, parsed: Any) -> bool:
+        """Attach parsed output to an existing entry; False if the key is gone"""
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        conn = self._connect()
+        try:
+            cursor = conn.execute("""
+                UPDATE llm_cache
+                SET parsed = ?, size = length(CAST(response AS BLOB)) + length(CAST(? AS BLOB))
+                WHERE cache_key = ?
+            """, (parsed_json, parsed_json, key))
+            conn.commit()
+            self._evict(conn)
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Drop least-recently-used entries until total size is within max_bytes"""
+        total = conn.execute("SELECT total_bytes FROM llm_cache_meta WHERE id = 1").fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT cache_key, size FROM llm_cache ORDER BY last_used_at ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM llm_cache WHERE cache_key = ?", victims)
+            evicted += len(victims)
+        if evicted:
+            conn.commit()
+            logger.info(f"LLM cache evicted {evicted} entries (max_bytes={self.max_bytes})")
+        return evicted
+
+    def invalidate_template(self, template_path) -> int:
+        """Drop every entry produced from template_path, regardless of version"""
+        conn = self._connect()
+        try:
+            n = conn.execute(
+                "DELETE FROM llm_cache WHERE template_path = ?", (str(template_path),)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return n
+
+    def invalidate_stale(self) -> int:
+        """
+        Drop entries whose prompt template changed (or was removed) since caching
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connect()
+        try:
+            removed = 0
+            templates = conn.execute(
+                "SELECT DISTINCT template_path, template_sha FROM llm_cache "
+                "WHERE template_path IS NOT NULL"
+            ).fetchall()
+            for path, sha in templates:
+                current = template_sha(path) if os.path.exists(path) else None
+                if current != sha:
+                    removed += conn.execute(
+                        "DELETE FROM llm_cache WHERE template_path = ? AND template_sha = ?",
+                        (path, sha)
+                    ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        if removed:
+            logger.info(f"LLM cache dropped {removed} entries from changed prompt templates")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, bytes used and total hits"""
+        conn = self._connect()
+        try:
+            entries, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM llm_cache"
+            ).fetchone()
+            total = conn.execute("SELECT total_bytes FROM llm_cache_meta WHERE id = 1").fetchone()[0]
+        finally:
+            conn.close()
+        return {'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes, 'hits': hits}
+
+
+def main():
+    """Inspect or prune the LLM response cache"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Article Eater LLM response cache')
+    parser.add_argument('--cache', default='./llm_cache.db', help='Cache database path')
+    parser.add_argument('--invalidate-stale', action='store_true',
+                        help='Drop entries whose prompt template changed')
+    parser.add_argument('--invalidate-template', help='Drop all entries for one template path')
+
+    args = parser.parse_args()
+
+    cache = LLMCache(args.cache)
+    if args.invalidate_stale:
+        print(f"Removed {cache.invalidate_stale()} stale entries")
+    if args.invalidate_template:
+        print(f"Removed {cache.invalidate_template(args.invalidate_template)} entries")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
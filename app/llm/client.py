@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - LLM Provider Client
+Async OpenAI / Anthropic / Google calls behind the shared rate limiter
+
+One httpx.AsyncClient (connection pool) is shared by every call made
+through an LLMClient. Provider base URLs can be pointed at a local mock
+server with AE_LLM_BASE_URL_<PROVIDER> (e.g. AE_LLM_BASE_URL_OPENAI).
+With a ledger (app/usage.py), each call's predicted and actual cost is
+recorded under its pipeline stage. The prediction is read in a worker
+thread, and usage events are queued in memory and written in one batch
+per usage_flush_ms (and on flush_usage()/aclose()) via asyncio.to_thread,
+so accounting never blocks the event loop or adds an ae.db write per call.
+Rate-limiter transactions, key lookups and cache reads/writes run in
+worker threads for the same reason.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from .cache import LLMCache, prompt_cache_key
+from .rate_limit import RateLimiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URLS = {
+    'openai': 'https://api.openai.com',
+    'anthropic': 'https://api.anthropic.com',
+    'google': 'https://generativelanguage.googleapis.com',
+}
+
+RETRY_BASE_SECONDS = 1.0
+
+
+class ProviderError(Exception):
+    """Non-retryable provider failure (bad request, auth, missing key)"""
+
+
+class TransientProviderError(ProviderError):
+    """Provider kept failing with 5xx or transport errors after all retries; the job may be retried"""
+
+
+class RateLimitedError(TransientProviderError):
+    """Provider kept returning 429 after all retries"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)"""
+    return len(text) // 4 + 1
+
+
+def _build_request(provider, model, prompt, system, max_tokens, temperature, api_key):
+    """Return (path, headers, json_body) for provider"""
+    if provider == 'openai':
+        messages = [{'role': 'system', 'content': system}] if system else []
+        messages.append({'role': 'user', 'content': prompt})
+        return '/v1/chat/completions', {'Authorization': f'Bearer {api_key}'}, {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+        }
+    if provider == 'anthropic':
+        body = {
+            'model': model,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'messages': [{'role': 'user', 'content': prompt}],
+        }
+        if system:
+            body['system'] = system
+        return '/v1/messages', {
+            'x-api-key': api_key,
+            'anthropic-version': '2023-06-01',
+        }, body
+    if provider == 'google':
+        body = {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generationConfig': {'maxOutputTokens': max_tokens, 'temperature': temperature},
+        }
+        if system:
+            body['systemInstruction'] = {'parts': [{'text': system}]}
+        return f'/v1beta/models/{model}:generateContent', {'x-goog-api-key': api_key}, body
+    raise ProviderError(f"Unsupported provider: {provider}")
+
+
+def _parse_response(provider: str, data: Dict[str, Any]):
+    """Return (text, tokens_in, tokens_out) from a provider response body"""
+    if provider == 'openai':
+        usage = data.get('usage', {})
+        return (data['choices'][0]['message']['content'],
+                usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+    if provider == 'anthropic':
+        usage = data.get('usage', {})
+        text = ''.join(b.get('text', '') for b in data.get('content', []) if b.get('type') == 'text')
+        return text, usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+    usage = data.get('usageMetadata', {})
+    parts = data['candidates'][0]['content']['parts']
+    return (''.join(p.get('text', '') for p in parts),
+            usage.get('promptTokenCount', 0), usage.get('candidatesTokenCount', 0))
+
+
+class LLMClient:
+    """
+    Rate-limited async client for the three supported providers
+
+    Usage:
+        km = KeyManager()
+        async with LLMClient(km.retrieve_key, RateLimiter()) as llm:
+            result = await llm.complete('user123', 'openai', 'gpt-4o-mini', prompt)
+            result['text'], result['tokens_in'], result['tokens_out']
+    """
+
+    def __init__(
+        self,
+        key_lookup: Callable[[str, str], Optional[str]],
+        limiter: Optional[RateLimiter] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        base_urls: Optional[Dict[str, str]] = None,
+        max_retries: int = 4,
+        timeout: float = 120.0,
+        cache: Optional[LLMCache] = None,
+        ledger: Optional[Any] = None,
+        usage_flush_ms: int = 500
+    ):
+        self.key_lookup = key_lookup
+        self.limiter = limiter
+        self.cache = cache
+        self.ledger = ledger
+        self.usage_flush_ms = usage_flush_ms
+        self._usage: List[Dict[str, Any]] = []
+        self._usage_task: Optional[asyncio.Task] = None
+        self.http = http or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+        self.base_urls = {
+            p: os.environ.get(f'AE_LLM_BASE_URL_{p.upper()}', url)
+            for p, url in DEFAULT_BASE_URLS.items()
+        }
+        self.base_urls.update(base_urls or {})
+        self.max_retries = max_retries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._usage_task is not None and not self._usage_task.done():
+            self._usage_task.cancel()
+        await self.flush_usage()
+        await self.http.aclose()
+
+    async def flush_usage(self):
+        """Write every queued usage event in one transaction, off the event loop"""
+        batch, self._usage = self._usage, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.ledger.record_many, batch)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record {len(batch)} usage event(s): {e}")
+
+    async def _drain_usage(self):
+        await asyncio.sleep(self.usage_flush_ms / 1000)
+        await self.flush_usage()
+
+    async def complete(
+        self,
+        user_id: str,
+        provider: str,
+        model: str,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 2048,
+        temperature: float = 0.0,
+        template: Optional[str] = None,
+        inputs: Any = None,
+        operation: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run one completion under the (user, provider) budget
+
+        When the client has a cache and `template` (prompt file path) is
+        given, the call is content-addressed on (template, provider, model,
+        inputs or prompt, params) and served from the cache when possible.
+        `operation` names the pipeline stage for usage accounting (defaults
+        to the template's file name).
+
+        Returns:
+            Dict with text, tokens_in, tokens_out, provider, model, cached,
+            parsed (what LLMCache.set_parsed() stored for a cache hit, else None)
+            and cache_key (None when uncached) for LLMCache.set_parsed()
+
+        Raises:
+            ProviderError: Missing key, unsupported provider or 4xx response
+            RateLimitedError: Still throttled after max_retries
+            TransientProviderError: Still failing with 5xx/transport errors after max_retries
+        """
+        provider = provider.lower()
+        operation = operation or (Path(template).stem if template else None)
+        input_chars = len(system or '') + len(prompt)
+
+        cache_key = None
+        if self.cache and template:
+            cache_key = prompt_cache_key(
+                template, provider, model, prompt if inputs is None else inputs,
+                {'system': system, 'max_tokens': max_tokens, 'temperature': temperature}
+            )
+            hit = await asyncio.to_thread(self.cache.get, cache_key)
+            if hit:
+                self._record_usage(user_id, provider, model, 0, 0, operation, None, input_chars, cached=True)
+                return {**hit['response'], 'parsed': hit['parsed'], 'cached': True, 'cache_key': cache_key}
+
+        api_key = await asyncio.to_thread(self.key_lookup, user_id, provider)
+        if not api_key:
+            raise ProviderError(f"No {provider} API key for user {user_id}")
+
+        path, headers, body = _build_request(
+            provider, model, prompt, system, max_tokens, temperature, api_key
+        )
+        url = self.base_urls[provider].rstrip('/') + path
+        estimated = estimate_tokens((system or '') + prompt) + max_tokens
+        predicted = await asyncio.to_thread(
+            self._predict_cost, operation, provider, model, input_chars, max_tokens
+        ) if self.ledger else None
+
+        last_failure = None
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                await self.limiter.acquire_async(user_id, provider, estimated)
+
+            try:
+                if self.limiter:
+                    async with self.limiter.slot_async(provider):
+                        response = await self.http.post(url, headers=headers, json=body)
+                else:
+                    response = await self.http.post(url, headers=headers, json=body)
+            except httpx.TransportError as e:
+                logger.warning(f"{provider} transport error (attempt {attempt + 1}): {e}")
+                last_failure = f"transport error: {e}"
+                await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** attempt)
+                continue
+
+            if response.status_code == 429:
+                retry_after = retry_after_seconds(response.headers.get('retry-after'))
+                last_failure = 429
+                if self.limiter:
+                    await self.limiter.record_throttle_async(user_id, provider, retry_after)
+                else:
+                    await asyncio.sleep(
+                        retry_after if retry_after is not None else RETRY_BASE_SECONDS * 2 ** attempt
+                    )
+                continue
+
+            if response.status_code >= 500:
+                logger.warning(f"{provider} returned {response.status_code} (attempt {attempt + 1})")
+                last_failure = f"HTTP {response.status_code}"
+                await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** attempt)
+                continue
+
+            if response.status_code >= 400:
+                raise ProviderError(f"{provider} returned {response.status_code}: {response.text[:200]}")
+
+            text, tokens_in, tokens_out = _parse_response(provider, response.json())
+            if self.limiter:
+                await self.limiter.settle_async(user_id, provider, estimated, tokens_in + tokens_out)
+                await self.limiter.record_success_async(user_id, provider)
+            self._record_usage(user_id, provider, model, tokens_in, tokens_out,
+                               operation, predicted, input_chars)
+
+            result = {
+                'text': text,
+                'tokens_in': tokens_in,
+                'tokens_out': tokens_out,
+                'provider': provider,
+                'model': model,
+            }
+            if cache_key:
+                await asyncio.to_thread(self.cache.put, cache_key, result, template_path=template,
+                                        provider=provider, model=model)
+            return {**result, 'parsed': None, 'cached': False, 'cache_key': cache_key}
+
+        if last_failure == 429:
+            raise RateLimitedError(f"{provider} request for {user_id} still throttled after {self.max_retries} retries")
+        raise TransientProviderError(
+            f"{provider} request for {user_id} failed after {self.max_retries} retries ({last_failure})"
+        )
+
+    def _predict_cost(self, operation, provider, model, input_chars, max_tokens) -> Optional[float]:
+        if not self.ledger:
+            return None
+        try:
+            return self.ledger.predict(operation, provider, model, input_chars, max_tokens)['cost_usd']
+        except sqlite3.Error as e:
+            logger.warning(f"Cost prediction unavailable: {e}")
+            return None
+
+    def _record_usage(self, user_id, provider, model, tokens_in, tokens_out,
+                      operation, predicted, input_chars, cached=False):
+        """Queue a usage event; must never block or fail the call it describes"""
+        if not self.ledger:
+            return
+        self._usage.append(self.ledger.event(
+            user_id, provider, model, tokens_in, tokens_out, operation=operation,
+            predicted_cost_usd=predicted, input_chars=input_chars, cached=cached
+        ))
+        if self._usage_task is None or self._usage_task.done():
+            self._usage_task = asyncio.get_running_loop().create_task(self._drain_usage())
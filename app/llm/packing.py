@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Prompt Packing and Token Budgeting
+Sits between section_paper_text() and the 7-panel prompt passes
+
+Each pass only receives the sections it needs (references are never
+sent), sized in tokens against the model's context window rather than
+fixed character counts. A primary section that is too large is split on
+paragraph/sentence boundaries into several requests, with the secondary
+sections trimmed to a share of the budget and repeated as context. In
+batch mode, short papers are bin-packed several to a request.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .client import estimate_tokens
+
+# Usable context per model family (tokens). Unknown models fall back to DEFAULT_CONTEXT.
+MODEL_CONTEXT = {
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-4.1': 1000000,
+    'claude-3-5-haiku': 200000,
+    'claude-3-5-sonnet': 200000,
+    'claude-sonnet-4': 200000,
+    'gemini-1.5-flash': 1000000,
+    'gemini-2.0-flash': 1000000,
+}
+DEFAULT_CONTEXT = 16000
+
+# Sections each pass reads, most important first
+PASS_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    '7panel_pass1_sectioning': ('full_text',),
+    '7panel_pass2_findings': ('results', 'methods', 'abstract'),
+    '7panel_pass3_mechanisms_limits': ('discussion', 'conclusion', 'introduction'),
+    '7panel_qc_guard': ('abstract',),
+}
+
+# Share of the input budget the secondary (context) sections may use when
+# the primary section has to be chunked
+SECONDARY_SHARE = 0.25
+
+_PARAGRAPH = re.compile(r'\n\s*\n')
+_SENTENCE = re.compile(r'(?<=[.!?])\s+')
+
+
+def model_budget(
+    model: str,
+    max_output_tokens: int = 2048,
+    prompt_overhead: int = 500,
+    cap: Optional[int] = None
+) -> int:
+    """
+    Input-token budget for one request
+
+    Args:
+        model: Model name; the longest MODEL_CONTEXT prefix match wins
+        max_output_tokens: Tokens reserved for the completion
+        prompt_overhead: Tokens reserved for the template and framing
+        cap: Optional hard ceiling (cost control) below the context size
+
+    Returns:
+        Tokens available for section text
+    """
+    matches = [name for name in MODEL_CONTEXT if model.startswith(name)]
+    context = MODEL_CONTEXT[max(matches, key=len)] if matches else DEFAULT_CONTEXT
+    budget = context - max_output_tokens - prompt_overhead
+    if cap is not None:
+        budget = min(budget, cap)
+    return max(budget, 256)
+
+
+def _split_units(text: str) -> List[str]:
+    """Non-empty paragraphs"""
+    units = []
+    for para in _PARAGRAPH.split(text):
+        para = para.strip()
+        if para:
+            units.append(para)
+    return units
+
+
+def trim_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of text that fits budget, cut at a sentence boundary when possible"""
+    if estimate_tokens(text) <= budget:
+        return text
+    out, used = [], 0
+    for sentence in _SENTENCE.split(text):
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            break
+        out.append(sentence)
+        used += cost
+    if out:
+        return ' '.join(out)
+    return text[:max(budget, 0) * 4]
+
+
+def split_to_tokens(text: str, budget: int) -> List[str]:
+    """
+    Split text into pieces of at most budget tokens
+
+    Paragraph boundaries are preferred, then sentence boundaries, then a
+    hard character cut for pathological runs without punctuation.
+    """
+    pieces: List[str] = []
+    current: List[str] = []
+    used = 0
+
+    def flush():
+        nonlocal current, used
+        if current:
+            pieces.append('\n\n'.join(current))
+        current, used = [], 0
+
+    for unit in _split_units(text):
+        cost = estimate_tokens(unit)
+        if cost > budget:
+            flush()
+            sentences = _SENTENCE.split(unit)
+            for sentence in sentences:
+                s_cost = estimate_tokens(sentence)
+                if s_cost > budget:
+                    flush()
+                    step = budget * 4
+                    pieces.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+                    continue
+                if used + s_cost > budget:
+                    flush()
+                current.append(sentence)
+                used += s_cost
+            flush()
+            continue
+        if used + cost > budget:
+            flush()
+        current.append(unit)
+        used += cost
+    flush()
+    return pieces
+
+
+def pack_sections(
+    sections: Dict[str, str],
+    pass_name: str,
+    budget: int
+) -> List[Dict[str, str]]:
+    """
+    Select and size the sections one pass needs
+
+    Args:
+        sections: Output of section_paper_text()
+        pass_name: Key of PASS_SECTIONS (prompt file stem)
+        budget: Input tokens per request (see model_budget)
+
+    Returns:
+        One dict of {section: text} per request; a single element when
+        everything fits. Empty list when the paper has none of the sections.
+    """
+    wanted = [name for name in PASS_SECTIONS[pass_name] if sections.get(name)]
+    if not wanted:
+        return []
+
+    sizes = {name: estimate_tokens(sections[name]) for name in wanted}
+    if sum(sizes.values()) <= budget:
+        return [{name: sections[name] for name in wanted}]
+
+    primary, secondary = wanted[0], wanted[1:]
+
+    # Secondary sections become shared context, trimmed in priority order
+    context: Dict[str, str] = {}
+    allowance = min(sum(sizes[n] for n in secondary), int(budget * SECONDARY_SHARE))
+    for name in secondary:
+        if allowance <= 0:
+            break
+        text = trim_to_tokens(sections[name], allowance)
+        if text:
+            context[name] = text
+            allowance -= estimate_tokens(text)
+
+    primary_budget = budget - sum(estimate_tokens(t) for t in context.values())
+    return [
+        {primary: piece, **context}
+        for piece in split_to_tokens(sections[primary], primary_budget)
+    ]
+
+
+def pack_papers(
+    papers: Sequence[Tuple[str, Dict[str, str]]],
+    pass_name: str,
+    budget: int
+) -> List[List[Tuple[str, Dict[str, str]]]]:
+    """
+    Batch-mode packing: several short papers per request
+
+    Papers whose sections fit in one request are combined by
+    first-fit-decreasing bin packing; papers that need chunking go alone,
+    one request per chunk.
+
+    Args:
+        papers: (article_id, sections) pairs
+        pass_name: Key of PASS_SECTIONS
+        budget: Input tokens per request
+
+    Returns:
+        Requests, each a list of (article_id, {section: text}) pairs
+    """
+    singles: List[Tuple[int, str, Dict[str, str]]] = []
+    requests: List[List[Tuple[str, Dict[str, str]]]] = []
+
+    for article_id, sections in papers:
+        chunks = pack_sections(sections, pass_name, budget)
+        if len(chunks) == 1:
+            size = sum(estimate_tokens(t) for t in chunks[0].values())
+            singles.append((size, article_id, chunks[0]))
+        else:
+            requests.extend([[(article_id, chunk)] for chunk in chunks])
+
+    bins: List[Tuple[int, List[Tuple[str, Dict[str, str]]]]] = []
+    for size, article_id, chunk in sorted(singles, key=lambda s: -s[0]):
+        for i, (used, members) in enumerate(bins):
+            if used + size <= budget:
+                members.append((article_id, chunk))
+                bins[i] = (used + size, members)
+                break
+        else:
+            bins.append((size, [(article_id, chunk)]))
+
+    return [members for _, members in bins] + requests
+
+
+def render_sections(chunk: Dict[str, str]) -> str:
+    """Format one packed chunk as prompt input"""
+    return '\n\n'.join(f"### {name.upper()}\n{text}" for name, text in chunk.items())
+
+
+def render_batch(batch: Sequence[Tuple[str, Dict[str, str]]]) -> str:
+    """Format a batch of papers as prompt input, one block per article"""
+    return '\n\n'.join(
+        f"=== ARTICLE {article_id} ===\n{render_sections(chunk)}" for article_id, chunk in batch
+    )
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - LLM Rate Limiter
+Cross-process token buckets and concurrency slots for provider calls
+
+Every worker process shares one SQLite table of buckets keyed by
+(user_id, provider): one bucket for requests per minute and one for
+LLM tokens per minute. A 429 halves that pair's effective rate and sets
+a cool-down; successes restore it additively (AIMD). Per-provider
+concurrency is capped with leased slots, so a crashed holder frees its
+slot once the lease expires. Schema: db/sql/020_llm_rate_limits.sql.
+
+Each method is one short BEGIN IMMEDIATE transaction that may wait up to
+30 s on a locked ae.db. The *_async twins therefore run them in a worker
+thread (asyncio.to_thread), and slot_async backs its polling off towards
+MAX_SLOT_POLL, so a busy database never stalls the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Conservative defaults; override per deployment via RateLimiter(limits=...)
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    'openai': {'rpm': 500, 'tpm': 200000, 'concurrency': 8},
+    'anthropic': {'rpm': 50, 'tpm': 40000, 'concurrency': 4},
+    'google': {'rpm': 60, 'tpm': 120000, 'concurrency': 4},
+}
+
+MIN_RATE_SCALE = 0.05
+RATE_RECOVERY_STEP = 0.05
+THROTTLE_BASE_SECONDS = 2.0
+MAX_WAIT_SLICE = 5.0
+MAX_SLOT_POLL = 1.0
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a budget or slot could not be obtained within the timeout"""
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, either delta-seconds or an
+    HTTP-date (RFC 9110); None when absent or unparsable, so callers fall
+    back to their own backoff
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """
+    Shared (user, provider) token buckets plus provider concurrency slots
+
+    Usage:
+        limiter = RateLimiter('./ae.db')
+        limiter.acquire('user123', 'openai', tokens=3000)
+        with limiter.slot('openai'):
+            ...call the provider...
+        limiter.settle('user123', 'openai', estimated=3000, actual=2412)
+        limiter.record_success('user123', 'openai')   # or record_throttle()
+
+    Async callers use acquire_async() and slot_async().
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./ae.db",
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        slot_lease_seconds: float = 600.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.db_path = db_path
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.slot_lease_seconds = slot_lease_seconds
+        self.clock = clock
+        self.holder_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _limits(self, provider: str) -> Dict[str, float]:
+        provider = provider.lower()
+        if provider not in self.limits:
+            raise ValueError(f"No rate limits configured for provider: {provider}")
+        return self.limits[provider]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    # ===== TOKEN BUCKETS =====
+
+    def _refill(
+        self,
+        conn: sqlite3.Connection,
+        user_id: str,
+        provider: str,
+        now: float
+    ) -> Tuple[float, float, float, float]:
+        """Return (request_tokens, token_tokens, rate_scale, cooldown_until) refilled to now"""
+        lim = self._limits(provider)
+        row = conn.execute("""
+            SELECT request_tokens, token_tokens, rate_scale, cooldown_until, updated_at
+            FROM llm_rate_buckets
+            WHERE user_id = ? AND provider = ?
+        """, (user_id, provider)).fetchone()
+
+        if not row:
+            return float(lim['rpm']), float(lim['tpm']), 1.0, 0.0
+
+        req, tok, scale, cooldown, updated = row
+        elapsed = max(now - updated, 0.0)
+        req = min(req + elapsed * lim['rpm'] * scale / 60.0, lim['rpm'])
+        tok = min(tok + elapsed * lim['tpm'] * scale / 60.0, lim['tpm'])
+        return req, tok, scale, cooldown
+
+    def _save(self, conn, user_id, provider, req, tok, scale, cooldown, now):
+        conn.execute("""
+            INSERT INTO llm_rate_buckets (
+                user_id, provider, request_tokens, token_tokens,
+                rate_scale, cooldown_until, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, provider) DO UPDATE SET
+                request_tokens = excluded.request_tokens,
+                token_tokens = excluded.token_tokens,
+                rate_scale = excluded.rate_scale,
+                cooldown_until = excluded.cooldown_until,
+                updated_at = excluded.updated_at
+        """, (user_id, provider, req, tok, scale, cooldown, now))
+
+    def try_acquire(self, user_id: str, provider: str, tokens: int) -> float:
+        """
+        Take one request and `tokens` LLM tokens if both are available
+
+        Args:
+            user_id: Key owner (budgets follow the per-user API key)
+            provider: openai, anthropic or google
+            tokens: Estimated prompt + completion tokens (clamped to TPM)
+
+        Returns:
+            0.0 if granted, otherwise seconds to wait before retrying
+        """
+        provider = provider.lower()
+        lim = self._limits(provider)
+        tokens = min(max(int(tokens), 0), int(lim['tpm']))
+
+        conn = self._connect()
+        try:
+            now = self.clock()
+            req, tok, scale, cooldown = self._refill(conn, user_id, provider, now)
+
+            if now < cooldown:
+                wait = cooldown - now
+            elif req >= 1.0 and tok >= tokens:
+                req, tok, wait = req - 1.0, tok - tokens, 0.0
+            else:
+                per_s = scale / 60.0
+                wait = max(
+                    (1.0 - req) / (lim['rpm'] * per_s) if req < 1.0 else 0.0,
+                    (tokens - tok) / (lim['tpm'] * per_s) if tok < tokens else 0.0,
+                )
+
+            self._save(conn, user_id, provider, req, tok, scale, cooldown, now)
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    def acquire(
+        self,
+        user_id: str,
+        provider: str,
+        tokens: int,
+        timeout: Optional[float] = None
+    ) -> None:
+        """
+        Block until the (user, provider) budget admits one request of `tokens`
+
+        Raises:
+            RateLimitTimeout: If not admitted within timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(user_id, provider, tokens)
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"{provider} budget for {user_id} not available in {timeout}s")
+            time.sleep(min(wait, MAX_WAIT_SLICE))
+
+    async def acquire_async(
+        self,
+        user_id: str,
+        provider: str,
+        tokens: int,
+        timeout: Optional[float] = None
+    ) -> None:
+        """Async twin of acquire(); database work in a thread, waits with asyncio.sleep"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, user_id, provider, tokens)
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"{provider} budget for {user_id} not available in {timeout}s")
+            await asyncio.sleep(min(wait, MAX_WAIT_SLICE))
+
+    def settle(self, user_id: str, provider: str, estimated: int, actual: int) -> None:
+        """Refund (or charge) the difference between estimated and actual token use"""
+        provider = provider.lower()
+        lim = self._limits(provider)
+        conn = self._connect()
+        try:
+            now = self.clock()
+            req, tok, scale, cooldown = self._refill(conn, user_id, provider, now)
+            tok = min(tok + (int(estimated) - int(actual)), lim['tpm'])
+            self._save(conn, user_id, provider, req, tok, scale, cooldown, now)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def record_throttle(
+        self,
+        user_id: str,
+        provider: str,
+        retry_after: Optional[float] = None
+    ) -> float:
+        """
+        Adapt to a provider 429: halve the effective rate and cool down
+
+        Args:
+            retry_after: Provider's Retry-After in seconds, if sent
+
+        Returns:
+            Cool-down applied in seconds
+        """
+        provider = provider.lower()
+        conn = self._connect()
+        try:
+            now = self.clock()
+            req, tok, scale, cooldown = self._refill(conn, user_id, provider, now)
+            scale = max(scale * 0.5, MIN_RATE_SCALE)
+            pause = retry_after if retry_after is not None else THROTTLE_BASE_SECONDS / scale
+            cooldown = max(cooldown, now + pause)
+            self._save(conn, user_id, provider, 0.0, tok, scale, cooldown, now)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        logger.warning(
+            f"{provider} throttled user {user_id}: rate x{scale:.2f}, cooling down {pause:.1f}s"
+        )
+        return pause
+
+    def record_success(self, user_id: str, provider: str) -> None:
+        """Additively restore the effective rate after a successful call"""
+        provider = provider.lower()
+        conn = self._connect()
+        try:
+            now = self.clock()
+            req, tok, scale, cooldown = self._refill(conn, user_id, provider, now)
+            if scale < 1.0:
+                scale = min(scale + RATE_RECOVERY_STEP, 1.0)
+            self._save(conn, user_id, provider, req, tok, scale, cooldown, now)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    # ===== CONCURRENCY SLOTS =====
+
+    def try_take_slot(self, provider: str) -> Optional[str]:
+        """
+        Claim a free concurrency slot for provider
+
+        Returns:
+            Holder token to pass to release_slot(), or None if all slots are busy
+        """
+        provider = provider.lower()
+        capacity = int(self._limits(provider)['concurrency'])
+        conn = self._connect()
+        try:
+            now = self.clock()
+            taken = {r[0] for r in conn.execute(
+                "SELECT slot FROM llm_provider_slots WHERE provider = ? AND expires_at > ?",
+                (provider, now)
+            )}
+            free = next((s for s in range(capacity) if s not in taken), None)
+            holder = None
+            if free is not None:
+                holder = f"{self.holder_prefix}:{uuid.uuid4().hex[:8]}"
+                conn.execute("""
+                    INSERT OR REPLACE INTO llm_provider_slots (provider, slot, holder, expires_at)
+                    VALUES (?, ?, ?, ?)
+                """, (provider, free, holder, now + self.slot_lease_seconds))
+            conn.execute("COMMIT")
+            return holder
+        finally:
+            conn.close()
+
+    def release_slot(self, provider: str, holder: str) -> None:
+        """Free the slot held by holder"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute(
+                "DELETE FROM llm_provider_slots WHERE provider = ? AND holder = ?",
+                (provider.lower(), holder)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def slot(self, provider: str, timeout: Optional[float] = None, poll: float = 0.05):
+        """Hold one of provider's concurrency slots for the duration of the block"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (holder := self.try_take_slot(provider)) is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise RateLimitTimeout(f"No free {provider} slot in {timeout}s")
+            time.sleep(poll)
+        try:
+            yield holder
+        finally:
+            self.release_slot(provider, holder)
+
+    @asynccontextmanager
+    async def slot_async(self, provider: str, timeout: Optional[float] = None, poll: float = 0.05):
+        """Async twin of slot(); polls in a thread, backing off from poll to MAX_SLOT_POLL"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (holder := await asyncio.to_thread(self.try_take_slot, provider)) is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise RateLimitTimeout(f"No free {provider} slot in {timeout}s")
+            await asyncio.sleep(poll)
+            poll = min(poll * 2, MAX_SLOT_POLL)
+        try:
+            yield holder
+        finally:
+            await asyncio.to_thread(self.release_slot, provider, holder)
+
+    async def settle_async(self, user_id: str, provider: str, estimated: int, actual: int) -> None:
+        """Async twin of settle()"""
+        await asyncio.to_thread(self.settle, user_id, provider, estimated, actual)
+
+    async def record_success_async(self, user_id: str, provider: str) -> None:
+        """Async twin of record_success()"""
+        await asyncio.to_thread(self.record_success, user_id, provider)
+
+    async def record_throttle_async(
+        self,
+        user_id: str,
+        provider: str,
+        retry_after: Optional[float] = None
+    ) -> float:
+        """Async twin of record_throttle()"""
+        return await asyncio.to_thread(self.record_throttle, user_id, provider, retry_after)
@@ -1,17 +1,71 @@
-from fastapi import FastAPI, Request, Response
-import time, logging
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
+import logging
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, generate_latest
+
+from app.audit import AuditSink, audit_event
+from app.auth import current_user, require_admin
+from app.queue_stats import QueueStats
+from app.usage import UsageLedger
+
 logging.basicConfig(level=logging.INFO)
+DB_PATH = os.environ.get("DB_URL", "sqlite:///./ae.db").removeprefix("sqlite:///")
 REQUESTS = Counter("app_requests_total", "Total HTTP requests", ["method","path"])
-app = FastAPI(title="Article Eater Service")
+AUDIT = AuditSink(DB_PATH)
+AUDIT_EVENTS = Gauge("app_audit_events", "Audit sink counters since start", ["outcome"])
+for _outcome in AUDIT.counters:
+    AUDIT_EVENTS.labels(_outcome).set_function(lambda o=_outcome: AUDIT.counters[o])
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await AUDIT.close()
+app = FastAPI(title="Article Eater Service", lifespan=lifespan)
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     start = time.time()
     response = await call_next(request)
-    try: REQUESTS.labels(request.method, request.url.path).inc()
-    except Exception: pass
+    try:
+        REQUESTS.labels(request.method, request.url.path).inc()
+    except Exception:
+        pass
+    # Queued only; AuditSink group-commits in the background
+    event = audit_event(
+        request.method,
+        request.url.path,
+        response.status_code,
+        (time.time() - start) * 1000,
+        getattr(request.state, "user_id", None),
+        request.client.host if request.client else None,
+        request.headers.get("user-agent"),
+    )
+    AUDIT.record(event)
     return response
 @app.get("/healthz")
-async def healthz(): return {"status": "ok"}
+async def healthz():
+    return {"status": "ok"}
 @app.get("/metrics")
-async def metrics(): return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+@app.get("/queue/stats")
+def queue_stats(runtime_hours: int = 24):
+    try:
+        return QueueStats(DB_PATH).snapshot(runtime_window_hours=runtime_hours)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(503, f"queue stats unavailable: {e}")
+@app.get("/usage/me")
+def usage_me(days: int = 30, user_id: str = Depends(current_user)):
+    # Identity from a signed bearer token or the auth layer (app/auth.py), never a raw header
+    try:
+        return UsageLedger(DB_PATH).user_usage(user_id, days)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(503, f"usage unavailable: {e}")
+@app.get("/usage/admin", dependencies=[Depends(require_admin)])
+def usage_admin(days: int = 30, top: int = 50):
+    try:
+        return UsageLedger(DB_PATH).admin_usage(days, top)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(503, f"usage unavailable: {e}")
\ No newline at end of file
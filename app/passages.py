@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Passage Index
+Sentence offsets + FTS5 for evidence verification and passage retrieval
+
+Ingested papers are split into sentences with character offsets into
+articles.full_text (article_passages), indexed by FTS5
+(article_passages_fts). On top of that:
+
+    verify_quote()    - is a rule_evidence.passage really in the paper?
+                        exact match, else best fuzzy match within a window
+                        of consecutive sentences
+    top_passages()    - BM25 top-k sentences (with context) for a rule
+                        statement, optionally restricted to some articles
+    verify_evidence() - run verify_quote() over rule_evidence
+
+Only the handful of FTS candidate sentences is compared, never the whole
+full_text blob. FTS lookups are bounded to an article's own rows: an
+article's passages get consecutive ids (index_passages inserts them in one
+batch), so a rowid range from the (article_id, ordinal) index lets FTS5
+seek straight to that article instead of ranking every match in the
+corpus and filtering afterwards. Schema: db/sql/023_passage_index.sql.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FUZZY_THRESHOLD = 0.9
+MATCH_WINDOW = 3
+MAX_QUERY_TERMS = 24
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]?\s+(?=[A-Z0-9"(\[])|\n\s*\n')
+_TERM = re.compile(r'[A-Za-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the their this to was were '
+    'which with we our than then these those also been not no'.split()
+)
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of each non-empty sentence in text"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    out = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if e > s:
+            out.append((s, e))
+    return out
+
+
+def normalize(text: str) -> str:
+    """Fold case, quotes, dashes, ligatures and whitespace for matching"""
+    text = text.lower()
+    for src, dst in (('‘', "'"), ('’', "'"), ('“', '"'), ('”', '"'),
+                     ('–', '-'), ('—', '-'), ('ﬁ', 'fi'), ('ﬂ', 'fl')):
+        text = text.replace(src, dst)
+    text = re.sub(r'-\s+', '-', text)  # hyphenation across line breaks
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def fts_query(text: str, max_terms: int = MAX_QUERY_TERMS) -> str:
+    """OR-query of text's distinctive terms, longest first, quoted for FTS5"""
+    terms = {t.lower() for t in _TERM.findall(text) if t.lower() not in _STOPWORDS and len(t) > 1}
+    ranked = sorted(terms, key=lambda t: (-len(t), t))[:max_terms]
+    return ' OR '.join(f'"{t}"' for t in ranked)
+
+
+def partial_ratio(needle: str, haystack: str) -> Tuple[float, int]:
+    """
+    Best similarity of needle against any same-length slice of haystack
+
+    Returns:
+        (ratio 0..1, start offset of the best slice in haystack)
+    """
+    if not needle or not haystack:
+        return 0.0, 0
+    if len(needle) >= len(haystack):
+        return SequenceMatcher(None, needle, haystack, autojunk=False).ratio(), 0
+
+    best, best_at = 0.0, 0
+    blocks = SequenceMatcher(None, haystack, needle, autojunk=False).get_matching_blocks()
+    for block in blocks:
+        start = min(max(block.a - block.b, 0), len(haystack) - len(needle))
+        ratio = SequenceMatcher(None, needle, haystack[start:start + len(needle)], autojunk=False).ratio()
+        if ratio > best:
+            best, best_at = ratio, start
+            if best == 1.0:
+                break
+    return best, best_at
+
+
+def index_passages(conn: sqlite3.Connection, article_id: str, full_text: str) -> int:
+    """
+    (Re)build one article's sentence passages; caller commits
+
+    Returns:
+        Number of passages stored
+    """
+    conn.execute("DELETE FROM article_passages WHERE article_id = ?", (article_id,))
+    rows = [
+        (article_id, ordinal, s, e, full_text[s:e])
+        for ordinal, (s, e) in enumerate(split_sentences(full_text or ''))
+    ]
+    conn.executemany("""
+        INSERT INTO article_passages (article_id, ordinal, start_offset, end_offset, text)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
+
+
+def _article_ranges(conn, article_ids: Iterable[str]) -> List[Tuple[str, int, int]]:
+    """(article_id, first passage id, last passage id) for the indexed articles among article_ids"""
+    return conn.execute("""
+        SELECT article_id, MIN(id), MAX(id) FROM article_passages
+        WHERE article_id IN (SELECT value FROM json_each(?))
+        GROUP BY article_id
+    """, (json.dumps(list(article_ids)),)).fetchall()
+
+
+def _ranked(conn, query: str, ranges: List[Tuple[str, int, int]], limit: int) -> List[tuple]:
+    """
+    BM25-best (article_id, ordinal, score) within each article's rowid range,
+    merged across articles
+    """
+    hits = []
+    for article_id, first, last in ranges:
+        hits += conn.execute("""
+            SELECT p.article_id, p.ordinal, bm25(article_passages_fts) AS score
+            FROM article_passages_fts f
+            JOIN article_passages p ON p.id = f.rowid
+            WHERE article_passages_fts MATCH ? AND f.rowid BETWEEN ? AND ? AND p.article_id = ?
+            ORDER BY score
+            LIMIT ?
+        """, (query, first, last, article_id, limit)).fetchall()
+    return sorted(hits, key=lambda h: h[2])[:limit]
+
+
+def _window(conn, article_id: str, ordinal: int, before: int, after: int) -> List[tuple]:
+    return conn.execute("""
+        SELECT ordinal, start_offset, end_offset, text FROM article_passages
+        WHERE article_id = ? AND ordinal BETWEEN ? AND ?
+        ORDER BY ordinal
+    """, (article_id, ordinal - before, ordinal + after)).fetchall()
+
+
+def _match_span(needle: str, rows: List[tuple], threshold: float) -> Tuple[float, str, List[tuple]]:
+    """
+    Smallest run of consecutive sentences in rows that contains needle
+
+    Exact (substring) matches are tried first, then fuzzy matches on runs at
+    least as long as the needle; falls back to the best score over all rows.
+    """
+    runs = [rows[i:i + size] for size in range(1, len(rows) + 1) for i in range(len(rows) - size + 1)]
+    texts = [normalize(' '.join(r[3] for r in run)) for run in runs]
+
+    for run, text in zip(runs, texts):
+        if needle in text:
+            return 1.0, 'exact', run
+
+    best = (0.0, 'missing', rows)
+    for run, text in zip(runs, texts):
+        if len(text) < len(needle) and len(run) < len(rows):
+            continue
+        score, _ = partial_ratio(needle, text)
+        if score >= threshold:
+            return score, 'fuzzy', run
+        if score > best[0]:
+            best = (score, 'missing', run)
+    return best
+
+
+def verify_quote(
+    conn: sqlite3.Connection,
+    article_id: str,
+    quote: str,
+    threshold: float = FUZZY_THRESHOLD,
+    window: int = MATCH_WINDOW,
+    candidates: int = 5
+) -> Dict[str, Any]:
+    """
+    Check that quote occurs in the article's indexed text
+
+    The best FTS candidate sentences are expanded to a window of
+    consecutive sentences (quotes may span sentence breaks) and compared
+    after normalisation: substring match first, then partial_ratio.
+
+    Returns:
+        Dict with status ('exact', 'fuzzy', 'missing' or 'unindexed'),
+        score, start_offset/end_offset of the matched sentences and passage
+    """
+    result = {'article_id': article_id, 'status': 'missing', 'score': 0.0,
+              'start_offset': None, 'end_offset': None, 'passage': None}
+
+    ranges = _article_ranges(conn, [article_id])
+    if not ranges:
+        result['status'] = 'unindexed'
+        return result
+
+    query = fts_query(quote)
+    if not query:
+        return result
+
+    needle = normalize(quote)
+    seen = set()
+    for _, ordinal, _ in _ranked(conn, query, ranges, candidates):
+        rows = _window(conn, article_id, ordinal, window - 1, window - 1)
+        key = tuple(r[0] for r in rows)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        score, status, span = _match_span(needle, rows, threshold)
+        if score > result['score']:
+            result.update(
+                status=status,
+                score=round(score, 4),
+                start_offset=span[0][1],
+                end_offset=span[-1][2],
+                passage=' '.join(r[3] for r in span)
+            )
+            if status == 'exact':
+                break
+
+    return result
+
+
+def top_passages(
+    conn: sqlite3.Connection,
+    statement: str,
+    k: int = 5,
+    article_ids: Optional[Iterable[str]] = None,
+    context: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    BM25 top-k passages for a rule statement
+
+    Args:
+        conn: Open connection
+        statement: Rule text or finding summary
+        k: Passages to return
+        article_ids: Restrict to these articles (None = whole corpus)
+        context: Neighbouring sentences included on each side
+
+    Returns:
+        Dicts with article_id, ordinal, score (lower bm25 = better), start/end offsets and passage
+    """
+    query = fts_query(statement)
+    if not query:
+        return []
+
+    if article_ids is not None:
+        hits = _ranked(conn, query, _article_ranges(conn, article_ids), k)
+    else:
+        hits = conn.execute("""
+            SELECT p.article_id, p.ordinal, bm25(article_passages_fts) AS score
+            FROM article_passages_fts f
+            JOIN article_passages p ON p.id = f.rowid
+            WHERE article_passages_fts MATCH ?
+            ORDER BY score LIMIT ?
+        """, (query, k)).fetchall()
+
+    out = []
+    for article_id, ordinal, score in hits:
+        rows = _window(conn, article_id, ordinal, context, context)
+        out.append({
+            'article_id': article_id,
+            'ordinal': ordinal,
+            'score': score,
+            'start_offset': rows[0][1],
+            'end_offset': rows[-1][2],
+            'passage': ' '.join(r[3] for r in rows),
+        })
+    return out
+
+
+def verify_evidence(db_path: str = "./ae.db", rule_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Verify rule_evidence passages against their source articles
+
+    Returns:
+        One verify_quote() result per evidence row, with evidence_id and rule_id added
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        sql = "SELECT id, rule_id, article_id, passage FROM rule_evidence"
+        params: tuple = ()
+        if rule_id:
+            sql += " WHERE rule_id = ?"
+            params = (rule_id,)
+        results = []
+        for evidence_id, rid, article_id, passage in conn.execute(sql, params).fetchall():
+            check = verify_quote(conn, article_id, passage)
+            results.append({'evidence_id': evidence_id, 'rule_id': rid, **check})
+    finally:
+        conn.close()
+    return results
+
+
+def reindex_all(db_path: str = "./ae.db") -> Dict[str, int]:
+    """Rebuild passages for every article with full_text"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute(
+            "SELECT article_id, full_text FROM articles WHERE full_text IS NOT NULL"
+        ).fetchall()
+        passages = sum(index_passages(conn, article_id, text) for article_id, text in rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return {'articles': len(rows), 'passages': passages}
+
+
+def main():
+    """Build the passage index, verify evidence quotes, or search passages"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Article Eater passage index')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--reindex', action='store_true', help='Rebuild passages for all articles')
+    parser.add_argument('--verify', action='store_true', help='Verify rule_evidence quotes')
+    parser.add_argument('--rule', help='Limit --verify to one rule_id')
+    parser.add_argument('--search', help='Top-k passages for a statement')
+    parser.add_argument('-k', type=int, default=5, help='Passages to return for --search')
+
+    args = parser.parse_args()
+
+    if args.reindex:
+        print(json.dumps(reindex_all(args.db), indent=2))
+    if args.verify:
+        results = verify_evidence(args.db, args.rule)
+        bad = [r for r in results if r['status'] not in ('exact', 'fuzzy')]
+        for r in bad:
+            print(f"evidence {r['evidence_id']} (rule {r['rule_id']}): {r['status']} score={r['score']}")
+        print(f"{len(results) - len(bad)}/{len(results)} evidence passages verified")
+        if bad:
+            raise SystemExit(1)
+    if args.search:
+        conn = sqlite3.connect(args.db)
+        try:
+            print(json.dumps(top_passages(conn, args.search, k=args.k), indent=2))
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -61,6 +61,9 @@ def section_paper_text(text: str) -> Dict[str, str]:
     - Figure/table extraction and captioning
     - Reference extraction and parsing
     
+    Sections are kept whole; per-pass selection and token budgeting
+    happen later in app/llm/packing.py.
+    
     Args:
         text: Full paper text
         
@@ -105,7 +108,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = intro_pattern.search(text)
     if match:
-        sections['introduction'] = match.group(1).strip()[:5000]  # Truncate if too long
+        sections['introduction'] = match.group(1).strip()
     
     # Find methods
     methods_pattern = re.compile(
@@ -114,7 +117,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = methods_pattern.search(text)
     if match:
-        sections['methods'] = match.group(1).strip()[:5000]
+        sections['methods'] = match.group(1).strip()
     
     # Find results
     results_pattern = re.compile(
@@ -123,7 +126,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = results_pattern.search(text)
     if match:
-        sections['results'] = match.group(1).strip()[:5000]
+        sections['results'] = match.group(1).strip()
     
     # Find discussion
     discussion_pattern = re.compile(
@@ -132,7 +135,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = discussion_pattern.search(text)
     if match:
-        sections['discussion'] = match.group(1).strip()[:5000]
+        sections['discussion'] = match.group(1).strip()
     
     # Find conclusion
     conclusion_pattern = re.compile(
@@ -141,7 +144,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = conclusion_pattern.search(text)
     if match:
-        sections['conclusion'] = match.group(1).strip()[:3000]
+        sections['conclusion'] = match.group(1).strip()
     
     # Find references
     references_pattern = re.compile(
@@ -150,7 +153,7 @@ def section_paper_text(text: str) -> Dict[str, str]:
     )
     match = references_pattern.search(text)
     if match:
-        sections['references'] = match.group(1).strip()[:10000]
+        sections['references'] = match.group(1).strip()
     
     # Log extraction quality
     extracted_sections = sum(1 for s in sections.values() if s and s != text)
@@ -208,6 +211,26 @@ def ingest_pdf(pdf_path: Path, article_id: str, db_path: str = "./ae.db") -> boo
             article_id
         ))
         
+        # Near-duplicate check (MinHash/LSH) so L2 never extracts the same paper twice
+        try:
+            from app.dedup import index_article
+            
+            canonical_id = index_article(
+                conn, article_id, f"{clean_extracted_text(text)} {sections.get('abstract', '')}"
+            )
+            if canonical_id:
+                logger.warning(f"Article {article_id} linked as duplicate of {canonical_id}")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Duplicate check skipped for {article_id} (run db/sql/022): {e}")
+        
+        # Sentence passages for quote verification and evidence retrieval
+        try:
+            from app.passages import index_passages
+            
+            index_passages(conn, article_id, text)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Passage index skipped for {article_id} (run db/sql/023): {e}")
+        
         conn.commit()
         conn.close()
         
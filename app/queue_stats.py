@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Queue Introspection
+Reports processing_queue depth, age, throughput and run-time percentiles
+
+All figures come from the trigger-maintained tables in
+db/sql/016_queue_stats.sql, so a snapshot costs a handful of indexed
+lookups regardless of queue size.
+"""
+
+import json
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Upper bound (ms) of each queue_runtime_hist bucket; None is +Inf.
+# Must stay in step with the CASE ladder in trg_queue_runtime.
+RUNTIME_BUCKETS_MS = (
+    250, 500, 1000, 2500, 5000, 10000, 30000,
+    60000, 120000, 300000, 600000, 1800000, None,
+)
+
+JOB_STATUSES = ('blocked', 'pending', 'running', 'complete', 'failed', 'dead')
+
+DEFAULT_WINDOWS_MIN = (1, 5, 15, 60)
+
+
+def histogram_percentile(counts: Sequence[int], q: float) -> Optional[float]:
+    """
+    Estimate a percentile from bucketed run times
+
+    Args:
+        counts: Observations per bucket, indexed like RUNTIME_BUCKETS_MS
+        q: Percentile in [0, 1]
+
+    Returns:
+        Upper bound (ms) of the bucket holding the percentile, the largest
+        finite bound for the overflow bucket, or None if there are no samples
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    target = q * total
+    seen = 0
+    for bucket, n in enumerate(counts):
+        seen += n
+        if n and seen >= target:
+            bound = RUNTIME_BUCKETS_MS[bucket]
+            return float(bound if bound is not None else RUNTIME_BUCKETS_MS[-2])
+    return float(RUNTIME_BUCKETS_MS[-2])
+
+
+class QueueStats:
+    """
+    Read-side view over the queue counters
+
+    Usage:
+        stats = QueueStats('./ae.db')
+        snap = stats.snapshot()
+        snap['job_types']['L2_extract']['pending']
+    """
+
+    def __init__(self, db_path: str = "./ae.db"):
+        self.db_path = db_path
+
+    def snapshot(
+        self,
+        windows_min: Sequence[int] = DEFAULT_WINDOWS_MIN,
+        runtime_window_hours: int = 24,
+    ) -> Dict[str, Any]:
+        """
+        Collect a point-in-time view of the queue
+
+        Args:
+            windows_min: Sliding windows (minutes) for jobs-per-minute rates
+            runtime_window_hours: How far back run-time percentiles look
+
+        Returns:
+            Dict with 'totals' and per-job-type 'job_types' entries holding
+            status counts, oldest_pending_age_s, jobs_per_min and run-time
+            p50/p95 in milliseconds
+
+        Raises:
+            sqlite3.OperationalError: If 016_queue_stats.sql was not applied
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            job_types: Dict[str, Dict[str, Any]] = {}
+
+            def entry(job_type: str) -> Dict[str, Any]:
+                if job_type not in job_types:
+                    job_types[job_type] = {
+                        **{status: 0 for status in JOB_STATUSES},
+                        'oldest_pending_age_s': None,
+                        'jobs_per_min': {f'{w}m': 0.0 for w in windows_min},
+                        'runtime_ms': {'p50': None, 'p95': None, 'samples': 0},
+                    }
+                return job_types[job_type]
+
+            for job_type, status, n in conn.execute(
+                "SELECT job_type, status, n FROM queue_counters"
+            ):
+                entry(job_type)[status] = n
+
+            # One index probe per job type on idx_queue_pending_age
+            for job_type in list(job_types):
+                row = conn.execute("""
+                    SELECT (julianday('now') - julianday(MIN(created_at))) * 86400.0
+                    FROM processing_queue
+                    WHERE status = 'pending' AND job_type = ?
+                """, (job_type,)).fetchone()
+                if row and row[0] is not None:
+                    job_types[job_type]['oldest_pending_age_s'] = round(max(row[0], 0.0), 1)
+
+            for window in windows_min:
+                rows = conn.execute("""
+                    SELECT job_type, SUM(completed + failed)
+                    FROM queue_throughput
+                    WHERE minute >= strftime('%Y-%m-%d %H:%M', 'now', ?)
+                    GROUP BY job_type
+                """, (f'-{int(window) - 1} minutes',))
+                for job_type, done in rows:
+                    entry(job_type)['jobs_per_min'][f'{window}m'] = round(done / window, 3)
+
+            hist: Dict[str, List[int]] = {}
+            for job_type, bucket, n in conn.execute("""
+                SELECT job_type, bucket, SUM(n)
+                FROM queue_runtime_hist
+                WHERE hour >= strftime('%Y-%m-%d %H:00', 'now', ?)
+                GROUP BY job_type, bucket
+            """, (f'-{int(runtime_window_hours)} hours',)):
+                counts = hist.setdefault(job_type, [0] * len(RUNTIME_BUCKETS_MS))
+                if 0 <= bucket < len(counts):
+                    counts[bucket] += n
+            for job_type, counts in hist.items():
+                entry(job_type)['runtime_ms'] = {
+                    'p50': histogram_percentile(counts, 0.50),
+                    'p95': histogram_percentile(counts, 0.95),
+                    'samples': sum(counts),
+                }
+        finally:
+            conn.close()
+
+        totals = {status: sum(jt[status] for jt in job_types.values()) for status in JOB_STATUSES}
+        ages = [jt['oldest_pending_age_s'] for jt in job_types.values()
+                if jt['oldest_pending_age_s'] is not None]
+        totals['oldest_pending_age_s'] = max(ages) if ages else None
+
+        return {'totals': totals, 'job_types': job_types}
+
+    def prune(self, keep_hours: int = 48) -> int:
+        """
+        Drop throughput and histogram rows older than keep_hours
+
+        Returns:
+            Number of rows deleted
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cutoff = f'-{int(keep_hours)} hours'
+            deleted = conn.execute(
+                "DELETE FROM queue_throughput "
+                "WHERE minute < strftime('%Y-%m-%d %H:%M', 'now', ?)",
+                (cutoff,),
+            ).rowcount
+            deleted += conn.execute(
+                "DELETE FROM queue_runtime_hist "
+                "WHERE hour < strftime('%Y-%m-%d %H:00', 'now', ?)",
+                (cutoff,),
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.info(f"Pruned {deleted} queue stats rows older than {keep_hours}h")
+        return deleted
+
+
+def main():
+    """Print a queue snapshot as JSON"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Article Eater Queue Stats')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--window', type=int, action='append',
+                        help='Throughput window in minutes (repeatable)')
+    parser.add_argument('--runtime-hours', type=int, default=24,
+                        help='Look-back for run-time percentiles')
+    parser.add_argument('--prune-hours', type=int,
+                        help='Also drop stats rows older than this many hours')
+
+    args = parser.parse_args()
+
+    stats = QueueStats(args.db)
+    if args.prune_hours:
+        stats.prune(args.prune_hours)
+
+    snap = stats.snapshot(
+        windows_min=args.window or DEFAULT_WINDOWS_MIN,
+        runtime_window_hours=args.runtime_hours,
+    )
+    print(json.dumps(snap, indent=2))
+
+
+if __name__ == '__main__':
+    main()
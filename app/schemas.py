@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Compiled JSON Schema Validators
+Load schemas/ once, resolve $refs, validate elements without re-walking schemas
+
+Each schema is compiled into a tree of small closures the first time it
+is asked for. A type check, for example, becomes a single isinstance()
+call with no keyword dispatch left at validation time. $refs are
+resolved while compiling. They may point at another file in schemas/
+(e.g. "rule_graph.schema.json") or a JSON pointer ("#/properties/rules"),
+and recursive refs compile once. Validators return every error rather
+than stopping at the first, each as {'path': JSON pointer, 'message': ...}.
+
+Only the keywords used by this repository's schemas (and their obvious
+siblings) are compiled; an unsupported keyword raises SchemaError at
+compile time instead of being silently ignored.
+"""
+
+import json
+import logging
+import operator
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS_DIR = Path(__file__).resolve().parents[1] / "schemas"
+
+# Keywords with no effect on validity
+ANNOTATIONS = frozenset({
+    '$schema', '$id', '$comment', 'title', 'description', 'default', 'examples', 'deprecated',
+})
+
+Error = Dict[str, str]
+Check = Callable[[Any, str, List[Error]], None]
+
+
+class SchemaError(Exception):
+    """Schema cannot be loaded or uses a keyword this compiler does not support"""
+
+
+def _is_integer(v):
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'string': lambda v: isinstance(v, str),
+    'integer': _is_integer,
+    'number': _is_number,
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+
+
+def _pointer_escape(key: str) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _resolve_pointer(document: Any, pointer: str) -> Any:
+    node = document
+    for part in pointer.lstrip('/').split('/') if pointer.strip('/') else []:
+        part = part.replace('~1', '/').replace('~0', '~')
+        try:
+            node = node[int(part)] if isinstance(node, list) else node[part]
+        except (KeyError, IndexError, ValueError):
+            raise SchemaError(f"Unresolvable JSON pointer: #{pointer}")
+    return node
+
+
+class SchemaRegistry:
+    """
+    Every *.schema.json in a directory, compiled on first use
+
+    Usage:
+        registry = SchemaRegistry()
+        check = registry.validator('rule_graph.schema.json')
+        errors = check(rule)                      # [] when valid
+        items = registry.validator('bn_package.schema.json#/properties/nodes/items')
+        failed = registry.validate_many('seven_panel.schema.json', outputs)  # {index: errors}
+    """
+
+    def __init__(self, schemas_dir: Path = SCHEMAS_DIR):
+        self.schemas_dir = Path(schemas_dir)
+        self.documents: Dict[str, Any] = {}
+        for path in sorted(self.schemas_dir.glob('*.json')):
+            try:
+                self.documents[path.name] = json.loads(path.read_text(encoding='utf-8'))
+            except json.JSONDecodeError as e:
+                raise SchemaError(f"{path.name}: invalid JSON: {e}")
+        self._compiled: Dict[Tuple[str, str], Check] = {}
+
+    def names(self) -> List[str]:
+        return list(self.documents)
+
+    def validator(self, ref: str) -> Callable[[Any], List[Error]]:
+        """
+        Compiled validator for 'file.schema.json' or 'file.schema.json#/pointer'
+
+        Returns:
+            Function value -> list of errors (empty when valid)
+        """
+        name, _, pointer = ref.partition('#')
+        check = self._compile_ref(name, pointer)
+
+        def validate(value: Any) -> List[Error]:
+            errors: List[Error] = []
+            check(value, '', errors)
+            return errors
+
+        return validate
+
+    def validate_many(self, ref: str, values: List[Any]) -> Dict[int, List[Error]]:
+        """
+        Validate a batch against one compiled schema
+
+        Returns:
+            {index: errors} for the invalid values only ({} when all pass)
+        """
+        check = self._compile_ref(*ref.partition('#')[::2])
+        failed: Dict[int, List[Error]] = {}
+        for i, value in enumerate(values):
+            errors: List[Error] = []
+            check(value, '', errors)
+            if errors:
+                failed[i] = errors
+        return failed
+
+    def compile_all(self) -> int:
+        """Compile every loaded schema now (fail fast at startup); returns the count"""
+        for name in self.documents:
+            self._compile_ref(name, '')
+        return len(self.documents)
+
+    def _compile_ref(self, name: str, pointer: str) -> Check:
+        key = (name, pointer)
+        if key in self._compiled:
+            return self._compiled[key]
+        if name not in self.documents:
+            raise SchemaError(f"Unknown schema: {name}")
+
+        # Placeholder first so recursive $refs resolve to the finished check
+        cell: List[Check] = []
+        self._compiled[key] = lambda v, p, e: cell[0](v, p, e)
+        check = self._compile(_resolve_pointer(self.documents[name], pointer), name)
+        cell.append(check)
+        self._compiled[key] = check
+        return check
+
+    def _compile(self, schema: Any, base: str) -> Check:
+        if schema is True or schema == {}:
+            return lambda v, p, e: None
+        if schema is False:
+            return lambda v, p, e: e.append({'path': p, 'message': 'no value is allowed here'})
+        if not isinstance(schema, dict):
+            raise SchemaError(
+                f"{base}: schema must be an object or boolean, got {type(schema).__name__}"
+            )
+
+        checks: List[Check] = []
+        for keyword, arg in schema.items():
+            if keyword in ANNOTATIONS:
+                continue
+            if keyword == 'additionalProperties' and 'properties' in schema:
+                continue
+            compile_keyword = _KEYWORDS.get(keyword)
+            if compile_keyword is None:
+                raise SchemaError(f"{base}: unsupported keyword '{keyword}'")
+            checks.append(compile_keyword(self, arg, schema, base))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, path, errors):
+            for c in checks:
+                c(value, path, errors)
+
+        return check_all
+
+
+# ===== KEYWORD COMPILERS =====
+# Each takes (registry, keyword argument, enclosing schema, base file) and
+# returns check(value, path, errors).
+
+def _kw_ref(registry, ref, schema, base):
+    name, _, pointer = ref.partition('#')
+    return registry._compile_ref(name or base, pointer)
+
+
+def _kw_type(registry, types, schema, base):
+    names = [types] if isinstance(types, str) else list(types)
+    unknown = [t for t in names if t not in TYPE_CHECKS]
+    if unknown:
+        raise SchemaError(f"{base}: unknown type {unknown}")
+    tests = tuple(TYPE_CHECKS[t] for t in names)
+    expected = ' or '.join(names)
+
+    def check(value, path, errors):
+        if not any(t(value) for t in tests):
+            message = f"expected {expected}, got {type(value).__name__}"
+            errors.append({'path': path, 'message': message})
+
+    return check
+
+
+def _same(a, b) -> bool:
+    """JSON equality: true is not 1"""
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+def _kw_enum(registry, options, schema, base):
+    allowed = list(options)
+
+    def check(value, path, errors):
+        if not any(_same(value, a) for a in allowed):
+            errors.append({'path': path, 'message': f"{value!r} is not one of {allowed}"})
+
+    return check
+
+
+def _kw_const(registry, constant, schema, base):
+    def check(value, path, errors):
+        if not _same(value, constant):
+            errors.append({'path': path, 'message': f"must equal {constant!r}"})
+
+    return check
+
+
+def _kw_required(registry, names, schema, base):
+    names = tuple(names)
+
+    def check(value, path, errors):
+        if isinstance(value, dict):
+            for name in names:
+                if name not in value:
+                    errors.append({'path': path, 'message': f"missing required property '{name}'"})
+
+    return check
+
+
+def _kw_properties(registry, properties, schema, base):
+    compiled = {name: registry._compile(sub, base) for name, sub in properties.items()}
+    extra = schema.get('additionalProperties', True)
+    extra_check = None if extra is True else registry._compile(extra, base)
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            return
+        for name, item in value.items():
+            sub = compiled.get(name)
+            if sub is not None:
+                sub(item, f"{path}/{_pointer_escape(name)}", errors)
+            elif extra_check is not None:
+                if extra is False:
+                    errors.append({'path': path, 'message': f"unexpected property '{name}'"})
+                else:
+                    extra_check(item, f"{path}/{_pointer_escape(name)}", errors)
+
+    return check
+
+
+def _kw_additional_only(registry, extra, schema, base):
+    """additionalProperties without properties: applies to every key"""
+    return _kw_properties(registry, {}, {'additionalProperties': extra}, base)
+
+
+def _kw_items(registry, items, schema, base):
+    sub = registry._compile(items, base)
+
+    def check(value, path, errors):
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                sub(item, f"{path}/{i}", errors)
+
+    return check
+
+
+def _bound(name, test, describe, applies):
+    def compile_bound(registry, limit, schema, base):
+        def check(value, path, errors):
+            if applies(value) and not test(value, limit):
+                errors.append({'path': path, 'message': f"{describe} {limit}"})
+        return check
+    return compile_bound
+
+
+def _len_at_least(value, limit) -> bool:
+    return len(value) >= limit
+
+
+def _len_at_most(value, limit) -> bool:
+    return len(value) <= limit
+
+
+def _kw_pattern(registry, pattern, schema, base):
+    regex = re.compile(pattern)
+
+    def check(value, path, errors):
+        if isinstance(value, str) and not regex.search(value):
+            errors.append({'path': path, 'message': f"does not match /{pattern}/"})
+
+    return check
+
+
+def _combinator(mode):
+    def compile_combinator(registry, subschemas, schema, base):
+        subs = [registry._compile(s, base) for s in subschemas]
+
+        def check(value, path, errors):
+            results = []
+            for sub in subs:
+                sub_errors: List[Error] = []
+                sub(value, path, sub_errors)
+                results.append(sub_errors)
+            passed = sum(1 for r in results if not r)
+            if mode == 'allOf':
+                for r in results:
+                    errors.extend(r)
+            elif mode == 'anyOf' and not passed:
+                errors.append({'path': path, 'message': 'does not match any allowed schema'})
+            elif mode == 'oneOf' and passed != 1:
+                message = f"must match exactly one schema, matched {passed}"
+                errors.append({'path': path, 'message': message})
+
+        return check
+    return compile_combinator
+
+
+_KEYWORDS: Dict[str, Callable[..., Check]] = {
+    '$ref': _kw_ref,
+    'type': _kw_type,
+    'enum': _kw_enum,
+    'const': _kw_const,
+    'required': _kw_required,
+    'properties': _kw_properties,
+    'additionalProperties': _kw_additional_only,
+    'items': _kw_items,
+    'pattern': _kw_pattern,
+    'minimum': _bound('minimum', operator.ge, 'must be >=', _is_number),
+    'maximum': _bound('maximum', operator.le, 'must be <=', _is_number),
+    'exclusiveMinimum': _bound('exclusiveMinimum', operator.gt, 'must be >', _is_number),
+    'exclusiveMaximum': _bound('exclusiveMaximum', operator.lt, 'must be <', _is_number),
+    'minLength': _bound('minLength', _len_at_least, 'length must be >=', TYPE_CHECKS['string']),
+    'maxLength': _bound('maxLength', _len_at_most, 'length must be <=', TYPE_CHECKS['string']),
+    'minItems': _bound('minItems', _len_at_least, 'item count must be >=', TYPE_CHECKS['array']),
+    'maxItems': _bound('maxItems', _len_at_most, 'item count must be <=', TYPE_CHECKS['array']),
+    'allOf': _combinator('allOf'),
+    'anyOf': _combinator('anyOf'),
+    'oneOf': _combinator('oneOf'),
+}
+
+
+@lru_cache(maxsize=4)
+def get_registry(schemas_dir: Optional[str] = None) -> SchemaRegistry:
+    """Process-wide registry (schemas are read and compiled once)"""
+    registry = SchemaRegistry(Path(schemas_dir) if schemas_dir else SCHEMAS_DIR)
+    registry.compile_all()
+    return registry
@@ -4,11 +4,14 @@ Article Eater v18.4 - Secure API Key Management
 Per-user API key storage with Fernet encryption-at-rest
 """
 
-import os
 import base64
 import logging
-from typing import Optional
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,21 @@ class KeyManager:
     - Master key derived from MASTER_KEY env var
     - Keys never logged in plaintext
     - Masked when returned to user
+    - Decrypted keys cached in memory for at most cache_ttl seconds;
+      the buffer is zeroed when an entry expires, is evicted or the key
+      is stored/deleted
+    
+    Cache invalidation is per instance: store_key()/delete_key() only
+    drop the entry in the KeyManager that made the change. Other
+    processes (API server, workers) keep serving a replaced or deleted
+    key until their entry expires, so cache_ttl bounds how long a revoked
+    key stays usable. Keep it short, or 0 where revocation must be
+    immediate.
+    
+    Usage accounting is write-behind: retrieve_key() only counts in
+    memory, and the counts are written with one batched UPDATE every
+    flush_interval seconds (or on flush_usage()/close()). A cache hit
+    touches neither the database nor the cipher.
     
     Usage:
         km = KeyManager()
@@ -38,20 +56,39 @@ class KeyManager:
     Environment:
         MASTER_KEY: Base64-encoded Fernet key
         Generate with:
-            python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+            from cryptography.fernet import Fernet
+            print(Fernet.generate_key().decode())
     """
     
-    def __init__(self, db_path: str = "./ae.db"):
+    def __init__(
+        self,
+        db_path: str = "./ae.db",
+        cache_ttl: float = 60.0,
+        cache_size: int = 256,
+        flush_interval: float = 30.0
+    ):
         """
         Initialize with master key from environment
         
         Args:
             db_path: Database path
+            cache_ttl: Seconds a decrypted key stays cached, in this process only
+                (0 disables the cache)
+            cache_size: Maximum cached keys (least recently used evicted first)
+            flush_interval: Seconds between batched usage_count/last_used_at writes
             
         Raises:
             ValueError: If MASTER_KEY not set or invalid
         """
         self.db_path = db_path
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[bytearray, float]]" = OrderedDict()
+        self._usage: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._last_flush = time.monotonic()
         
         master_key_b64 = os.environ.get('MASTER_KEY')
         if not master_key_b64:
@@ -194,6 +231,9 @@ class KeyManager:
             conn.commit()
             conn.close()
             
+            # usage_count was reset above, so pending counts are dropped too
+            self._invalidate(user_id, provider)
+            
             # Log with masked key
             logger.info(
                 f"Stored {provider} key for user {user_id}: {self.mask_key(api_key)}"
@@ -208,6 +248,9 @@ class KeyManager:
         """
         Retrieve and decrypt API key for user
         
+        Served from the in-memory cache while the entry is fresh; usage is
+        counted in memory and written by flush_usage().
+        
         Args:
             user_id: User identifier
             provider: API provider
@@ -219,6 +262,12 @@ class KeyManager:
             import sqlite3
             
             provider = provider.lower()
+            cache_key = (user_id, provider)
+            
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self._record_use(cache_key)
+                return cached
             
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -230,29 +279,17 @@ class KeyManager:
             """, (user_id, provider))
             
             row = cursor.fetchone()
+            conn.close()
             
             if row:
-                encrypted_key = row[0]
-                
-                # Update last_used_at and usage_count
-                cursor.execute("""
-                    UPDATE user_api_keys
-                    SET 
-                        last_used_at = ?,
-                        usage_count = usage_count + 1
-                    WHERE user_id = ? AND provider = ?
-                """, (datetime.utcnow().isoformat(), user_id, provider))
-                
-                conn.commit()
-                conn.close()
-                
-                decrypted = self.decrypt_key(encrypted_key)
+                decrypted = self.decrypt_key(row[0])
+                self._cache_put(cache_key, decrypted)
+                self._record_use(cache_key)
                 logger.info(
                     f"Retrieved {provider} key for user {user_id}: {self.mask_key(decrypted)}"
                 )
                 return decrypted
             
-            conn.close()
             logger.warning(f"No {provider} key found for user {user_id}")
             return None
             
@@ -260,6 +297,101 @@ class KeyManager:
             logger.error(f"Failed to retrieve key for user {user_id}: {e}")
             return None
     
+    def _cache_get(self, cache_key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            buf, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._evict(cache_key)
+                return None
+            self._cache.move_to_end(cache_key)
+            return buf.decode()
+    
+    def _cache_put(self, cache_key: Tuple[str, str], api_key: str):
+        if self.cache_ttl <= 0 or self.cache_size <= 0:
+            return
+        with self._lock:
+            self._evict(cache_key)
+            expires = time.monotonic() + self.cache_ttl
+            self._cache[cache_key] = (bytearray(api_key.encode()), expires)
+            while len(self._cache) > self.cache_size:
+                self._evict(next(iter(self._cache)))
+    
+    def _evict(self, cache_key: Tuple[str, str]):
+        """Drop a cache entry and overwrite its plaintext buffer (caller holds the lock)"""
+        entry = self._cache.pop(cache_key, None)
+        if entry is not None:
+            buf = entry[0]
+            buf[:] = bytes(len(buf))
+    
+    def _invalidate(self, user_id: str, provider: str):
+        cache_key = (user_id, provider.lower())
+        with self._lock:
+            self._evict(cache_key)
+            self._usage.pop(cache_key, None)
+    
+    def clear_cache(self):
+        """Zero and drop every cached key"""
+        with self._lock:
+            for cache_key in list(self._cache):
+                self._evict(cache_key)
+    
+    def _record_use(self, cache_key: Tuple[str, str]):
+        with self._lock:
+            count, _ = self._usage.get(cache_key, (0, None))
+            self._usage[cache_key] = (count + 1, datetime.utcnow().isoformat())
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush_usage()
+    
+    def flush_usage(self) -> int:
+        """
+        Write pending usage counts in one batched UPDATE
+        
+        Returns:
+            Number of (user, provider) rows updated
+        """
+        import sqlite3
+        
+        with self._lock:
+            pending, self._usage = self._usage, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                conn.executemany("""
+                    UPDATE user_api_keys
+                    SET
+                        last_used_at = MAX(COALESCE(last_used_at, ''), ?),
+                        usage_count = usage_count + ?
+                    WHERE user_id = ? AND provider = ?
+                """, [
+                    (last_used, count, user_id, provider)
+                    for (user_id, provider), (count, last_used) in pending.items()
+                ])
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            # Put the counts back so the next flush retries them
+            logger.error(f"Failed to flush key usage: {e}")
+            with self._lock:
+                for cache_key, (count, last_used) in pending.items():
+                    queued, queued_at = self._usage.get(cache_key, (0, ''))
+                    self._usage[cache_key] = (count + queued, max(last_used, queued_at or ''))
+            return 0
+        return len(pending)
+    
+    def close(self):
+        """Flush pending usage and zero the key cache"""
+        self.flush_usage()
+        self.clear_cache()
+    
     def delete_key(self, user_id: str, provider: str) -> bool:
         """
         Delete API key for user
@@ -289,6 +421,8 @@ class KeyManager:
             conn.commit()
             conn.close()
             
+            self._invalidate(user_id, provider)
+            
             if deleted > 0:
                 logger.info(f"Deleted {provider} key for user {user_id}")
                 return True
@@ -310,6 +444,7 @@ class KeyManager:
         Returns:
             List of provider names
         """
+        self.flush_usage()
         try:
             import sqlite3
             
@@ -350,7 +485,8 @@ if __name__ == '__main__':
     if 'MASTER_KEY' not in os.environ:
         print("Error: MASTER_KEY environment variable not set")
         print("\nGenerate one with:")
-        print("  python -c \"from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())\"")
+        print("  python -c \"from cryptography.fernet import Fernet; "
+              "print(Fernet.generate_key().decode())\"")
         print("\nThen set it:")
         print("  export MASTER_KEY=<generated-key>")
         sys.exit(1)
@@ -367,7 +503,7 @@ if __name__ == '__main__':
     
     decrypted = km.decrypt_key(encrypted)
     assert decrypted == test_key
-    print(f"✓ Decrypted correctly")
+    print("✓ Decrypted correctly")
     
     # Test masking
     masked = km.mask_key(test_key)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Semantic Scholar Harvest Client
+Async bulk search + batch lookup with an on-disk response cache
+
+Uses the Academic Graph bulk search endpoint (up to 1000 papers per page,
+continuation-token pagination) and the batch paper endpoint (up to 500
+ids per POST) over one pooled httpx.AsyncClient. 429s and 5xx honour
+Retry-After (seconds or HTTP-date), else back off exponentially, as do
+transport errors. Once retries run out, S2TransientError tells the worker
+to retry the job later; any other S2Error is permanent.
+
+Every response is cached as JSON under cache_dir, keyed by
+(endpoint, query/ids, fields, page token). A populated cache directory is
+a recorded fixture: with offline=True the client serves only from it and
+never touches the network. Point AE_S2_BASE_URL at a stand-in server to
+benchmark against something other than the live API.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+
+from app.llm.rate_limit import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.semanticscholar.org'
+PAPER_FIELDS = (
+    'paperId,corpusId,externalIds,title,authors,venue,year,abstract,'
+    'citationCount,isOpenAccess,openAccessPdf'
+)
+BATCH_SIZE = 500
+RETRY_BASE_SECONDS = 1.0
+
+
+class S2Error(Exception):
+    """Semantic Scholar request failed permanently (4xx, offline cache miss)"""
+
+
+class S2TransientError(S2Error):
+    """Still throttled or failing (429, 5xx, transport errors) after all retries"""
+
+
+def _cache_key(*parts: Any) -> str:
+    material = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class S2Client:
+    """
+    Semantic Scholar Academic Graph client
+
+    Usage:
+        async with S2Client(api_key=os.environ.get('S2_API_KEY')) as s2:
+            async for page in s2.search_bulk('daylight cognition', limit=2000):
+                upsert_papers(conn, page)
+            papers = await s2.batch_lookup(['DOI:10.1000/x', 'CorpusId:123'])
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        http: Optional[httpx.AsyncClient] = None,
+        base_url: Optional[str] = None,
+        cache_dir: Optional[str] = './s2_cache',
+        offline: bool = False,
+        max_retries: int = 5,
+        timeout: float = 60.0
+    ):
+        self.base_url = (base_url or os.environ.get('AE_S2_BASE_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.headers = {'x-api-key': api_key} if api_key else {}
+        self.http = http or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8)
+        )
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.offline = offline
+        self.max_retries = max_retries
+        self.requests_made = 0
+        self.cache_hits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    # ===== CACHE =====
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / key[:2] / f"{key}.json" if self.cache_dir else None
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        path = self._cache_path(key)
+        if path and path.exists():
+            self.cache_hits += 1
+            return json.loads(path.read_text(encoding='utf-8'))
+        return None
+
+    def _cache_put(self, key: str, data: Any) -> None:
+        path = self._cache_path(key)
+        if not path:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data), encoding='utf-8')
+        tmp.replace(path)
+
+    # ===== HTTP =====
+
+    async def _request(self, method: str, path: str, key: str, **kwargs) -> Any:
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        if self.offline:
+            raise S2Error(f"Offline and no cached response for {method} {path}")
+
+        url = self.base_url + path
+        last_failure = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.http.request(method, url, headers=self.headers, **kwargs)
+                self.requests_made += 1
+            except httpx.TransportError as e:
+                logger.warning(f"S2 transport error (attempt {attempt + 1}): {e}")
+                last_failure = f"transport error: {e}"
+                await asyncio.sleep(RETRY_BASE_SECONDS * 2 ** attempt)
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                last_failure = f"HTTP {response.status_code}"
+                delay = retry_after_seconds(response.headers.get('retry-after'))
+                if delay is None:
+                    delay = RETRY_BASE_SECONDS * 2 ** attempt
+                logger.warning(f"S2 returned {response.status_code}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code >= 400:
+                raise S2Error(f"S2 {method} {path} returned {response.status_code}: {response.text[:200]}")
+
+            data = response.json()
+            self._cache_put(key, data)
+            return data
+
+        raise S2TransientError(f"S2 {method} {path} failed after {self.max_retries} retries ({last_failure})")
+
+    # ===== ENDPOINTS =====
+
+    async def search_bulk(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        fields: str = PAPER_FIELDS,
+        year: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Page through /graph/v1/paper/search/bulk
+
+        Args:
+            query: Boolean query string (S2 bulk search syntax)
+            limit: Stop after this many papers (None = every page)
+            fields: Comma-separated paper fields
+            year: Optional year filter, e.g. '2015-' or '2010-2020'
+
+        Yields:
+            One list of paper dicts per page
+        """
+        token = None
+        seen = 0
+        while True:
+            params = {'query': query, 'fields': fields}
+            if year:
+                params['year'] = year
+            if token:
+                params['token'] = token
+            key = _cache_key('search/bulk', query, fields, year, token)
+            page = await self._request('GET', '/graph/v1/paper/search/bulk', key, params=params)
+
+            papers = page.get('data') or []
+            if limit is not None:
+                papers = papers[:max(limit - seen, 0)]
+            seen += len(papers)
+            if papers:
+                yield papers
+
+            token = page.get('token')
+            if not token or (limit is not None and seen >= limit):
+                break
+
+    async def batch_lookup(
+        self,
+        ids: Iterable[str],
+        fields: str = PAPER_FIELDS,
+        concurrency: int = 4
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch papers via POST /graph/v1/paper/batch, BATCH_SIZE ids per request
+
+        Args:
+            ids: Paper ids in any S2 form ('CorpusId:123', 'DOI:10.x/y', sha)
+            fields: Comma-separated paper fields
+            concurrency: Batches in flight at once
+
+        Returns:
+            Papers in input order; None where S2 has no match
+        """
+        ids = list(ids)
+        chunks = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+        gate = asyncio.Semaphore(concurrency)
+
+        async def fetch(chunk):
+            async with gate:
+                key = _cache_key('batch', chunk, fields)
+                return await self._request(
+                    'POST', '/graph/v1/paper/batch', key,
+                    params={'fields': fields}, json={'ids': chunk}
+                )
+
+        results = await asyncio.gather(*(fetch(chunk) for chunk in chunks))
+        return [paper for batch in results for paper in batch]
+
+
+def _article_row(paper: Dict[str, Any]) -> Optional[tuple]:
+    """Map an S2 paper to an articles row (None if it has no corpusId)"""
+    corpus_id = paper.get('corpusId')
+    if corpus_id is None:
+        return None
+    doi = (paper.get('externalIds') or {}).get('DOI')
+    pdf = paper.get('openAccessPdf') or {}
+    return (
+        f"s2:{corpus_id}",
+        doi.lower() if doi else None,
+        str(corpus_id),
+        paper.get('title') or '(untitled)',
+        json.dumps([a.get('name') for a in paper.get('authors') or []]),
+        paper.get('venue') or None,
+        paper.get('year'),
+        paper.get('abstract'),
+        1 if paper.get('isOpenAccess') else 0,
+        paper.get('citationCount') or 0,
+        pdf.get('url'),
+    )
+
+
+def upsert_papers(conn: sqlite3.Connection, papers: Iterable[Optional[Dict[str, Any]]]) -> List[str]:
+    """
+    Bulk upsert S2 papers into articles, matching on corpus_id then doi
+
+    Rows that already exist under a DOI (e.g. added by hand) get their
+    corpus_id filled in rather than being duplicated. Metadata is
+    refreshed; ingested text is never touched. Caller commits.
+
+    Returns:
+        article_id of every paper, in input order (papers without a corpusId are skipped)
+    """
+    rows = [row for row in (_article_row(p) for p in papers if p) if row]
+    if not rows:
+        return []
+
+    # Link DOI-only rows to their corpus_id, then drop DOIs already owned by another corpus_id
+    conn.executemany("""
+        UPDATE articles SET corpus_id = ?
+        WHERE doi = ? AND corpus_id IS NULL
+          AND NOT EXISTS (SELECT 1 FROM articles WHERE corpus_id = ?)
+    """, [(row[2], row[1], row[2]) for row in rows if row[1]])
+    owners = dict(conn.execute(
+        "SELECT doi, corpus_id FROM articles WHERE doi IN (SELECT value FROM json_each(?))",
+        (json.dumps([row[1] for row in rows if row[1]]),)
+    ).fetchall())
+    for i, row in enumerate(rows):
+        doi, corpus_id = row[1], row[2]
+        if doi and owners.setdefault(doi, corpus_id) != corpus_id:
+            rows[i] = row[:1] + (None,) + row[2:]
+
+    conn.executemany("""
+        INSERT INTO articles (
+            article_id, doi, corpus_id, title, authors, venue, year, abstract,
+            is_open_access, citation_count, url_pdf
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(corpus_id) DO UPDATE SET
+            doi = COALESCE(articles.doi, excluded.doi),
+            title = excluded.title,
+            authors = excluded.authors,
+            venue = excluded.venue,
+            year = excluded.year,
+            abstract = COALESCE(excluded.abstract, articles.abstract),
+            is_open_access = excluded.is_open_access,
+            citation_count = excluded.citation_count,
+            url_pdf = COALESCE(excluded.url_pdf, articles.url_pdf)
+    """, rows)
+
+    ids = dict(conn.execute(
+        "SELECT corpus_id, article_id FROM articles WHERE corpus_id IN (SELECT value FROM json_each(?))",
+        (json.dumps([row[2] for row in rows]),)
+    ).fetchall())
+    return [ids[row[2]] for row in rows]
+
+
+async def harvest(
+    client: S2Client,
+    db_path: str,
+    query: str,
+    limit: Optional[int] = None,
+    year: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run a bulk search and upsert every page as it arrives
+
+    Returns:
+        Dict with article_ids (deduplicated, in result order), pages and papers_found
+    """
+    article_ids: List[str] = []
+    seen = set()
+    pages = 0
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        async for papers in client.search_bulk(query, limit=limit, year=year):
+            pages += 1
+            for article_id in upsert_papers(conn, papers):
+                if article_id not in seen:
+                    seen.add(article_id)
+                    article_ids.append(article_id)
+            conn.commit()
+    finally:
+        conn.close()
+
+    return {'article_ids': article_ids, 'pages': pages, 'papers_found': len(article_ids)}
+
+
+def main():
+    """Harvest a query into the articles table"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Article Eater Semantic Scholar harvest')
+    parser.add_argument('query', help='S2 bulk search query')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--limit', type=int, help='Maximum papers to harvest')
+    parser.add_argument('--year', help="Year filter, e.g. '2015-'")
+    parser.add_argument('--cache-dir', default='./s2_cache', help='Response cache directory')
+    parser.add_argument('--offline', action='store_true', help='Serve only from the response cache')
+
+    args = parser.parse_args()
+
+    async def run():
+        async with S2Client(
+            api_key=os.environ.get('S2_API_KEY'),
+            cache_dir=args.cache_dir,
+            offline=args.offline
+        ) as client:
+            result = await harvest(client, args.db, args.query, limit=args.limit, year=args.year)
+            result.update(requests=client.requests_made, cache_hits=client.cache_hits)
+            return result
+
+    result = asyncio.run(run())
+    result['article_ids'] = len(result['article_ids'])
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - Synergy Candidate Mining
+Eclat frequent-itemset mining over findings' antecedent sets
+
+Antecedent names are normalised and integer-encoded, and findings are
+grouped by consequent. Within a group the transactions are stored
+vertically: one Python int bitset per antecedent occurring there, with
+bit i set when the group's i-th finding lists it. Eclat then intersects
+these narrow bitsets depth-first and prunes combinations below min_count,
+so a consequent costs time in proportion to its own findings.
+Every surviving combination of two or more antecedents is scored:
+
+    support          n(set, consequent) / n(consequent)
+    confidence       n(set, consequent) / n(set)
+    lift             confidence / P(consequent)
+    interaction_lift P(set | consequent) / product of P(item | consequent)
+
+interaction_lift > 1 means the antecedents are reported together more
+often than their individual rates predict: a synergy worth an LLM's time.
+Ranked candidates go to synergy_candidates (db/sql/025) for review with
+prompts/synergy_rule_discovery.md.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.contradictions import normalize_construct
+
+logger = logging.getLogger(__name__)
+
+PROMPT_PATH = Path(__file__).resolve().parents[1] / "prompts" / "synergy_rule_discovery.md"
+EXAMPLES_PER_CANDIDATE = 5
+
+
+def _bits(bitset: int, limit: int) -> List[int]:
+    """Indices of the lowest `limit` set bits"""
+    out = []
+    while bitset and len(out) < limit:
+        low = bitset & -bitset
+        out.append(low.bit_length() - 1)
+        bitset ^= low
+    return out
+
+
+def _bitset(positions: List[int]) -> int:
+    """Bitset from ascending positions, built in one pass over a bytearray"""
+    if not positions:
+        return 0
+    buf = bytearray(positions[-1] // 8 + 1)
+    for p in positions:
+        buf[p >> 3] |= 1 << (p & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _encode(rows: List[Tuple[int, Optional[str], str]]):
+    """
+    Integer-encode findings row by row
+
+    Returns:
+        (finding_ids, finding_items, finding_cons, item_names, consequent_names)
+        where finding_items[i] is a tuple of item codes and finding_cons[i]
+        a consequent code for finding position i
+    """
+    finding_ids: List[int] = []
+    finding_items: List[Tuple[int, ...]] = []
+    finding_cons: List[int] = []
+    item_index: Dict[str, int] = {}
+    cons_index: Dict[str, int] = {}
+
+    for finding_id, antecedents, consequent in rows:
+        try:
+            names = json.loads(antecedents) if antecedents else []
+        except (TypeError, json.JSONDecodeError):
+            names = [antecedents]
+        if not isinstance(names, list):
+            names = [names]
+        items = {normalize_construct(str(n)) for n in names if n} - {''}
+        cons = normalize_construct(consequent)
+        if not items or not cons:
+            continue
+
+        finding_ids.append(finding_id)
+        finding_items.append(tuple(item_index.setdefault(item, len(item_index)) for item in sorted(items)))
+        finding_cons.append(cons_index.setdefault(cons, len(cons_index)))
+
+    return finding_ids, finding_items, finding_cons, list(item_index), list(cons_index)
+
+
+def _positions(codes_per_finding, size: int) -> List[List[int]]:
+    """Ascending finding positions per code"""
+    out: List[List[int]] = [[] for _ in range(size)]
+    for pos, codes in enumerate(codes_per_finding):
+        for code in codes:
+            out[code].append(pos)
+    return out
+
+
+def encode_transactions(rows: List[Tuple[int, Optional[str], str]]):
+    """
+    Integer-encode findings as vertical bitsets
+
+    Args:
+        rows: (finding_id, antecedents JSON, consequent)
+
+    Returns:
+        (finding_ids, item_names, item_bits, consequent_names, consequent_bits)
+        where item_bits[i] / consequent_bits[c] are bitsets over finding positions
+    """
+    finding_ids, finding_items, finding_cons, item_names, cons_names = _encode(rows)
+    item_bits = [_bitset(p) for p in _positions(finding_items, len(item_names))]
+    cons_bits = [_bitset(p) for p in _positions(((c,) for c in finding_cons), len(cons_names))]
+    return finding_ids, item_names, item_bits, cons_names, cons_bits
+
+
+def eclat(
+    items: List[Tuple[int, int]],
+    min_count: int,
+    max_size: int,
+    prefix: Tuple[int, ...] = ()
+) -> List[Tuple[Tuple[int, ...], int]]:
+    """
+    Frequent itemsets of size >= 2 by depth-first tid-set intersection
+
+    Args:
+        items: (item code, bitset) pairs already meeting min_count
+        min_count: Minimum transactions containing the itemset
+        max_size: Largest itemset to grow
+
+    Returns:
+        (itemset, bitset) pairs
+    """
+    out = []
+    for i, (item, bits) in enumerate(items):
+        itemset = prefix + (item,)
+        if len(itemset) >= 2:
+            out.append((itemset, bits))
+        if len(itemset) < max_size:
+            suffix = []
+            for other, other_bits in items[i + 1:]:
+                joint = bits & other_bits
+                if joint.bit_count() >= min_count:
+                    suffix.append((other, joint))
+            if suffix:
+                out.extend(eclat(suffix, min_count, max_size, itemset))
+    return out
+
+
+def mine_synergies(
+    rows: List[Tuple[int, Optional[str], str]],
+    min_count: int = 3,
+    max_size: int = 3,
+    min_lift: float = 1.0
+) -> List[Dict[str, Any]]:
+    """
+    Ranked synergy candidates from (finding_id, antecedents, consequent) rows
+
+    Findings are grouped by consequent first. Each group gets bitsets over
+    its own positions, only for the items that occur in it, so the work per
+    consequent scales with that consequent's findings rather than the whole
+    corpus. Corpus-wide bitsets are built lazily, only for items in a
+    surviving itemset, to count n(set).
+
+    Returns:
+        Candidate dicts, best first (interaction_lift, then lift, then n_findings)
+    """
+    finding_ids, finding_items, finding_cons, item_names, cons_names = _encode(rows)
+    total = len(finding_ids)
+    groups = _positions(((c,) for c in finding_cons), len(cons_names))
+
+    item_positions: Optional[List[List[int]]] = None
+    global_bits: Dict[int, int] = {}
+    set_counts: Dict[Tuple[int, ...], int] = {}
+
+    def n_set(itemset: Tuple[int, ...]) -> int:
+        nonlocal item_positions
+        key = tuple(sorted(itemset))
+        if key not in set_counts:
+            if item_positions is None:
+                item_positions = _positions(finding_items, len(item_names))
+            bits = -1
+            for code in key:
+                if code not in global_bits:
+                    global_bits[code] = _bitset(item_positions[code])
+                bits &= global_bits[code]
+            set_counts[key] = bits.bit_count()
+        return set_counts[key]
+
+    candidates = []
+    for cons, positions in zip(cons_names, groups):
+        n_cons = len(positions)
+        if n_cons < min_count:
+            continue
+
+        local: Dict[int, List[int]] = {}
+        for i, pos in enumerate(positions):
+            for code in finding_items[pos]:
+                local.setdefault(code, []).append(i)
+        frequent = sorted(
+            ((code, _bitset(p)) for code, p in local.items() if len(p) >= min_count),
+            key=lambda pair: (-len(local[pair[0]]), pair[0])
+        )
+        if len(frequent) < 2:
+            continue
+
+        for itemset, bits in eclat(frequent, min_count, max_size):
+            n = bits.bit_count()
+            expected = math.prod(len(local[c]) / n_cons for c in itemset)
+            interaction_lift = (n / n_cons) / expected if expected else 0.0
+            if interaction_lift < min_lift:
+                continue
+
+            confidence = n / n_set(itemset)
+            lift = confidence / (n_cons / total)
+            candidates.append({
+                'consequent': cons,
+                'antecedents': sorted(item_names[c] for c in itemset),
+                'n_findings': n,
+                'support': round(n / n_cons, 6),
+                'confidence': round(confidence, 6),
+                'lift': round(lift, 6),
+                'interaction_lift': round(interaction_lift, 6),
+                'example_finding_ids': [finding_ids[positions[i]] for i in _bits(bits, EXAMPLES_PER_CANDIDATE)],
+            })
+
+    candidates.sort(key=lambda c: (-c['interaction_lift'], -c['lift'], -c['n_findings'], c['antecedents']))
+    return candidates
+
+
+def store_candidates(conn: sqlite3.Connection, candidates: List[Dict[str, Any]]) -> int:
+    """
+    Replace pending candidates with a fresh mining run; reviewed ones are kept as-is
+
+    Returns:
+        Candidates written
+    """
+    conn.execute("DELETE FROM synergy_candidates WHERE status = 'pending'")
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT OR IGNORE INTO synergy_candidates (
+            consequent, antecedents, n_findings, support, confidence, lift,
+            interaction_lift, example_finding_ids
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (c['consequent'], json.dumps(c['antecedents']), c['n_findings'], c['support'],
+         c['confidence'], c['lift'], c['interaction_lift'], json.dumps(c['example_finding_ids']))
+        for c in candidates
+    ])
+    return conn.total_changes - before
+
+
+def review_batch(conn: sqlite3.Connection, limit: int = 20) -> str:
+    """
+    Review prompt for the top pending candidates, with representative DOIs
+
+    Returns:
+        prompts/synergy_rule_discovery.md followed by one block per candidate
+    """
+    blocks = []
+    for cid, cons, ants, n, lift, ilift, examples in conn.execute("""
+        SELECT id, consequent, antecedents, n_findings, lift, interaction_lift, example_finding_ids
+        FROM synergy_candidates WHERE status = 'pending'
+        ORDER BY interaction_lift DESC, lift DESC LIMIT ?
+    """, (limit,)).fetchall():
+        dois = [r[0] for r in conn.execute("""
+            SELECT DISTINCT a.doi FROM findings f JOIN articles a ON a.article_id = f.paper_id
+            WHERE f.id IN (SELECT value FROM json_each(?)) AND a.doi IS NOT NULL
+        """, (examples,))]
+        blocks.append(
+            f"### CANDIDATE {cid}\n"
+            f"antecedents: {' + '.join(json.loads(ants))}\nconsequent: {cons}\n"
+            f"findings: {n}, lift: {lift:.2f}, interaction_lift: {ilift:.2f}\n"
+            f"DOIs: {', '.join(dois) or 'n/a'}"
+        )
+    return '\n\n'.join([PROMPT_PATH.read_text(encoding='utf-8').strip()] + blocks)
+
+
+def run_mining(
+    db_path: str = "./ae.db",
+    min_count: int = 3,
+    max_size: int = 3,
+    min_lift: float = 1.0
+) -> Dict[str, Any]:
+    """Mine all findings and refresh the pending synergy candidates"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute("SELECT id, antecedents, consequent FROM findings").fetchall()
+        candidates = mine_synergies(rows, min_count=min_count, max_size=max_size, min_lift=min_lift)
+        stored = store_candidates(conn, candidates)
+        conn.commit()
+    finally:
+        conn.close()
+
+    by_consequent = Counter(c['consequent'] for c in candidates)
+    logger.info(f"Synergy mining: {len(rows)} findings, {len(candidates)} candidates")
+    return {'findings': len(rows), 'candidates': len(candidates), 'stored': stored,
+            'consequents': len(by_consequent)}
+
+
+def main():
+    """Mine synergy candidates and print the top of the review queue"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Article Eater synergy candidate mining')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--min-count', type=int, default=3, help='Minimum supporting findings')
+    parser.add_argument('--max-size', type=int, default=3, help='Largest antecedent combination')
+    parser.add_argument('--min-lift', type=float, default=1.0, help='Minimum interaction lift')
+    parser.add_argument('--show', type=int, default=0, metavar='N', help='Print review input for top N')
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = run_mining(args.db, args.min_count, args.max_size, args.min_lift)
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result, indent=2))
+
+    if args.show:
+        conn = sqlite3.connect(args.db)
+        try:
+            print(review_batch(conn, args.show))
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
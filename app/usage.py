@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Article Eater v18.5 - API Usage Ledger
+Append-only LLM usage events, pre-aggregated rollups and a cost predictor
+
+Every provider call made through an LLMClient with a ledger is appended
+to api_usage_events (schemas/api_usage.schema.json); the client queues
+events in memory and writes them in batches off the event loop. Cache hits are
+recorded too, with zero tokens and cost. Triggers in
+db/sql/026_usage_ledger.sql keep per-user totals, per-user/day and
+per-stage/day rollups in step, so /usage/me and /usage/admin read a few
+primary-key rows instead of summing events.
+
+The predictor follows the same pattern. For each (stage, provider,
+model), the trigger maintains least-squares sums of tokens_in against
+prompt length in characters, plus the mean tokens_out. predict() turns
+these into expected tokens and cost before a call. With fewer than
+MIN_SAMPLES billed calls it falls back to the chars/4 estimate.
+cheapest() ranks candidate models for least-cost escalation (the
+worker's L2 model ladder, app/worker.py _model_ladder). The
+predicted and actual cost of each stage are rolled up side by side.
+"""
+
+import logging
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens; override per deployment via UsageLedger(prices=...)
+DEFAULT_PRICES_USD_PER_MTOK: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ('openai', 'gpt-4o-mini'): (0.15, 0.60),
+    ('openai', 'gpt-4o'): (2.50, 10.00),
+    ('anthropic', 'claude-3-5-haiku-latest'): (0.80, 4.00),
+    ('anthropic', 'claude-3-5-sonnet-latest'): (3.00, 15.00),
+    ('google', 'gemini-1.5-flash'): (0.075, 0.30),
+    ('google', 'gemini-1.5-pro'): (1.25, 5.00),
+}
+
+MIN_SAMPLES = 5
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKENS_OUT = 512
+
+ROLLUP_COLUMNS = ('calls', 'cached_calls', 'tokens_in', 'tokens_out', 'cost_usd')
+EVENT_COLUMNS = (
+    'event_id', 'user_id', 'provider', 'model', 'operation', 'job_id', 'tokens_in', 'tokens_out',
+    'cost_usd', 'predicted_cost_usd', 'input_chars', 'cached', 'ts'
+)
+
+
+class UsageLedger:
+    """
+    Records usage events and answers usage/cost questions from the rollups
+
+    Usage:
+        ledger = UsageLedger('./ae.db')
+        guess = ledger.predict('L2_extraction', 'openai', 'gpt-4o-mini', input_chars=42000)
+        ...call the provider...
+        ledger.record('user123', 'openai', 'gpt-4o-mini', 10512, 840,
+                      operation='L2_extraction', predicted_cost_usd=guess['cost_usd'],
+                      input_chars=42000)
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./ae.db",
+        prices: Optional[Dict[Tuple[str, str], Tuple[float, float]]] = None
+    ):
+        self.db_path = db_path
+        self.prices = {**DEFAULT_PRICES_USD_PER_MTOK, **(prices or {})}
+        self._unpriced: set = set()
+
+    def cost(self, provider: str, model: str, tokens_in: int, tokens_out: int) -> float:
+        """Billed cost in USD; 0 (with one warning) for models missing from the price table"""
+        price = self.prices.get((provider, model))
+        if price is None:
+            if (provider, model) not in self._unpriced:
+                self._unpriced.add((provider, model))
+                logger.warning(f"No price for {provider}/{model}; recording cost 0")
+            return 0.0
+        return (tokens_in * price[0] + tokens_out * price[1]) / 1_000_000
+
+    def event(
+        self,
+        user_id: str,
+        provider: str,
+        model: str,
+        tokens_in: int,
+        tokens_out: int,
+        operation: Optional[str] = None,
+        job_id: Optional[str] = None,
+        predicted_cost_usd: Optional[float] = None,
+        input_chars: Optional[int] = None,
+        cached: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Build one usage event without touching the database
+
+        Returns:
+            An api_usage.schema.json object plus the job_id,
+            predicted_cost_usd, input_chars and cached columns
+        """
+        return {
+            'event_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'provider': provider,
+            'model': model,
+            'operation': operation,
+            'job_id': job_id,
+            'tokens_in': 0 if cached else int(tokens_in),
+            'tokens_out': 0 if cached else int(tokens_out),
+            'cost_usd': 0.0 if cached else self.cost(provider, model, tokens_in, tokens_out),
+            'predicted_cost_usd': predicted_cost_usd,
+            'input_chars': input_chars,
+            'cached': int(cached),
+            'ts': datetime.utcnow().isoformat(),
+        }
+
+    def record(self, user_id: str, provider: str, model: str, tokens_in: int, tokens_out: int,
+               **kwargs: Any) -> Dict[str, Any]:
+        """Append one usage event now (see event() for arguments); returns the event"""
+        event = self.event(user_id, provider, model, tokens_in, tokens_out, **kwargs)
+        self.record_many([event])
+        return event
+
+    def record_many(self, events: List[Dict[str, Any]]) -> int:
+        """Append events from event() in one transaction (rollups follow via trigger)"""
+        if not events:
+            return 0
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO api_usage_events ({', '.join(EVENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(EVENT_COLUMNS))})",
+                    [tuple(e[c] for c in EVENT_COLUMNS) for e in events]
+                )
+        finally:
+            conn.close()
+        return len(events)
+
+    def predict(
+        self,
+        operation: Optional[str],
+        provider: str,
+        model: str,
+        input_chars: int,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Expected tokens and cost of one call
+
+        Args:
+            operation: Pipeline stage the history is keyed on
+            provider: Provider
+            model: Model
+            input_chars: Prompt length in characters
+            max_tokens: Output cap; bounds the predicted tokens_out
+
+        Returns:
+            Dict with tokens_in, tokens_out, cost_usd, samples and basis
+            ('history' or 'estimate')
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            row = conn.execute("""
+                SELECT n, sum_x, sum_xx, sum_in, sum_x_in, sum_out FROM usage_cost_model
+                WHERE operation = ? AND provider = ? AND model = ?
+            """, (operation or '', provider, model)).fetchone()
+        finally:
+            conn.close()
+
+        n = row[0] if row else 0
+        if n >= MIN_SAMPLES:
+            _, sx, sxx, sy, sxy, sout = row
+            mean_x, mean_y = sx / n, sy / n
+            var_x = sxx / n - mean_x ** 2
+            slope = (sxy / n - mean_x * mean_y) / var_x if var_x > 1e-9 else 0.0
+            tokens_in = max(mean_y + slope * (input_chars - mean_x), 0.0)
+            tokens_out = sout / n
+            basis = 'history'
+        else:
+            tokens_in = input_chars / CHARS_PER_TOKEN + 1
+            tokens_out = DEFAULT_TOKENS_OUT
+            basis = 'estimate'
+        if max_tokens is not None:
+            tokens_out = min(tokens_out, max_tokens)
+
+        tokens_in, tokens_out = int(round(tokens_in)), int(round(tokens_out))
+        return {
+            'tokens_in': tokens_in,
+            'tokens_out': tokens_out,
+            'cost_usd': self.cost(provider, model, tokens_in, tokens_out),
+            'samples': n,
+            'basis': basis,
+        }
+
+    def cheapest(
+        self,
+        operation: Optional[str],
+        input_chars: int,
+        candidates: Iterable[Tuple[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """Candidate (provider, model) pairs ranked by predicted cost, cheapest first"""
+        ranked = [
+            {'provider': provider, 'model': model,
+             **self.predict(operation, provider, model, input_chars)}
+            for provider, model in candidates
+        ]
+        return sorted(ranked, key=lambda r: r['cost_usd'])
+
+    def user_usage(self, user_id: str, days: int = 30) -> Dict[str, Any]:
+        """Lifetime totals and the last `days` daily rows for one user"""
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            totals = conn.execute(
+                "SELECT * FROM usage_user_totals WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            daily = conn.execute(f"""
+                SELECT day, {', '.join(ROLLUP_COLUMNS)} FROM usage_user_daily
+                WHERE user_id = ? AND day >= ? ORDER BY day
+            """, (user_id, since)).fetchall()
+        finally:
+            conn.close()
+        return {
+            'user_id': user_id,
+            'totals': dict(totals) if totals else {c: 0 for c in ROLLUP_COLUMNS},
+            'daily': [dict(r) for r in daily],
+        }
+
+    def admin_usage(self, days: int = 30, top: int = 50) -> Dict[str, Any]:
+        """Top users by cost, and predicted vs actual cost per stage over the last `days`"""
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            users = conn.execute(
+                "SELECT * FROM usage_user_totals ORDER BY cost_usd DESC LIMIT ?", (top,)
+            ).fetchall()
+            stages = conn.execute("""
+                SELECT operation, SUM(calls) AS calls, SUM(cached_calls) AS cached_calls,
+                       SUM(tokens_in) AS tokens_in, SUM(tokens_out) AS tokens_out,
+                       SUM(cost_usd) AS cost_usd, SUM(predicted_cost_usd) AS predicted_cost_usd,
+                       SUM(predicted_actual_usd) AS predicted_actual_usd
+                FROM usage_stage_daily WHERE day >= ?
+                GROUP BY operation ORDER BY cost_usd DESC
+            """, (since,)).fetchall()
+        finally:
+            conn.close()
+        return {
+            'days': days,
+            'users': [dict(r) for r in users],
+            'stages': [dict(r) for r in stages],
+            'total_cost_usd': sum(r['cost_usd'] for r in stages),
+        }
+
+
+def main():
+    """Print usage for a user, the admin overview, or a cost prediction"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Article Eater API usage ledger')
+    parser.add_argument('--db', default='./ae.db', help='Database path')
+    parser.add_argument('--user', help='Usage for this user_id (default: admin overview)')
+    parser.add_argument('--days', type=int, default=30, help='Days of daily rollups')
+    parser.add_argument('--predict', metavar='STAGE', help='Predict one call of this stage')
+    parser.add_argument('--chars', type=int, default=40000, help='Prompt length for --predict')
+    parser.add_argument('--model', action='append', metavar='PROVIDER/MODEL',
+                        help='Candidate for --predict (repeatable; default: every priced model)')
+
+    args = parser.parse_args()
+    ledger = UsageLedger(args.db)
+
+    if args.predict:
+        if args.model:
+            candidates = [tuple(m.split('/', 1)) for m in args.model]
+        else:
+            candidates = list(ledger.prices)
+        result: Any = ledger.cheapest(args.predict, args.chars, candidates)
+    elif args.user:
+        result = ledger.user_usage(args.user, args.days)
+    else:
+        result = ledger.admin_usage(args.days)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,33 @@ Article Eater v18.4 - Queue Worker
 Minimal in-process worker that polls processing_queue and executes L0-L5 jobs
 """
 
+import asyncio
+import os
 import time
+import random
+import socket
 import logging
 import json
 import sys
-from typing import Optional, Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+
+if __package__ in (None, ''):
+    # Allow `python app/worker.py` as well as `python -m app.worker`
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.job_graph import enqueue_job, release_dependents, fail_dependents
+from app.extraction import SevenPanelExtractor
+from app.llm import LLMCache, LLMClient, ProviderError, RateLimiter, TransientProviderError
+from app.pdf_ingest import section_paper_text
+from app.bn_export import export_package
+from app.citation_graph import expand_articles
+from app.dedup import canonical_ids
+from app.semantic_scholar import S2Client, S2Error, S2TransientError, harvest
+from app.usage import UsageLedger
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,29 +38,88 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def retry_delay_seconds(attempts: int, jitter: float = 0.2) -> float:
+    """
+    Exponential backoff before the next attempt of a failed job
+
+    Args:
+        attempts: Attempts made so far (>= 1)
+        jitter: Fractional +/- spread so retries from one burst don't align
+
+    Returns:
+        Delay in seconds, capped at RETRY_MAX_SECONDS
+    """
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
 
 class SimpleWorker:
     """
     In-process worker for Article Eater v18.4
     Polls processing_queue database table and executes L0-L5 operations
     
+    Jobs are claimed under a lease (lease_expires_at) that a heartbeat
+    thread extends while the handler runs. If the worker dies, any worker's
+    reaper pass returns the job to pending once the lease expires. Failed
+    attempts are retried with exponential backoff until max_attempts, then
+    moved to the 'dead' status. See db/sql/017_queue_leases.sql.
+    
+    Claims are fair-shared across job owners (db/sql/019_queue_fair_share.sql).
+    Capacity is reserved for interactive work by running some workers with
+    job_classes=('interactive',); per-user caps come from
+    queue_users.max_running, falling back to user_concurrency.
+    
     Production note: For distributed processing, replace with Celery/Redis/RQ
     """
     
-    def __init__(self, poll_interval: int = 5, db_path: str = "./ae.db"):
+    def __init__(
+        self,
+        poll_interval: int = 5,
+        db_path: str = "./ae.db",
+        lease_seconds: int = 300,
+        reap_interval: int = 60,
+        worker_id: Optional[str] = None,
+        job_classes: tuple = ('interactive', 'batch'),
+        user_concurrency: int = 4,
+        fair_share_scan: int = 16,
+        pass_timeout: float = 300.0
+    ):
         self.poll_interval = poll_interval
         self.running = False
         self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.reap_interval = reap_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.job_classes = tuple(c for c in job_classes if c in ('interactive', 'batch'))
+        self.user_concurrency = user_concurrency
+        self.fair_share_scan = fair_share_scan
+        self.pass_timeout = pass_timeout
         self.processed_count = 0
         self.error_count = 0
+        self._last_reap = 0.0
+        self._loop = None
+        self._keys = None
+        self._llm = None
+        self._s2 = None
         
     def start(self):
         """Main worker loop - polls queue and processes jobs"""
         self.running = True
-        logger.info(f"Worker starting (poll_interval={self.poll_interval}s, db={self.db_path})")
+        logger.info(
+            f"Worker {self.worker_id} starting "
+            f"(poll_interval={self.poll_interval}s, lease={self.lease_seconds}s, db={self.db_path})"
+        )
         
         while self.running:
             try:
+                if time.monotonic() - self._last_reap >= self.reap_interval:
+                    self.reap_expired_leases()
+                    self._last_reap = time.monotonic()
+                
                 job = self.fetch_next_job()
                 if job:
                     self.process_job(job)
@@ -55,52 +134,218 @@ class SimpleWorker:
                 logger.error(f"Worker error: {e}", exc_info=True)
                 self.error_count += 1
                 time.sleep(self.poll_interval)
+        
+        self.close()
     
     def fetch_next_job(self) -> Optional[Dict[str, Any]]:
         """
-        Poll processing_queue for highest priority pending job
+        Claim the next job under a lease, fair-sharing across users
+        
+        Classes are tried in self.job_classes order (interactive first by
+        default). Within a class, backlogged users under their concurrency
+        cap are visited in virtual-time order and the first with a
+        claimable job wins; that user's virtual time then advances by
+        1/weight, so heavy enqueuers cannot starve others. Within a user,
+        jobs run by priority DESC, created_at ASC. Each per-user probe is
+        an index-only lookup on idx_queue_status_priority.
+        
+        Users are read fair_share_scan at a time; when no user on a page
+        has a claimable job (all backed off), the next page is tried, so
+        retrying users never hide a runnable job further down.
+        
+        A job is claimable when pending and its next_attempt_at (retry
+        backoff) has passed. Everything runs in one IMMEDIATE transaction,
+        so two workers never claim the same row.
         
         Returns:
-            Job dict with keys: job_id, job_type, params, priority
+            Job dict with keys: job_id, job_type, params, priority,
+            created_at, attempts, max_attempts, user_id, job_class
             None if queue empty
         """
         try:
             import sqlite3
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            # Get highest priority pending job (with lock)
+            now = datetime.utcnow()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            sys_vtime = cursor.execute("SELECT vtime FROM queue_sched WHERE id = 1").fetchone()[0]
+            job = None
+            
+            for job_class in self.job_classes:
+                offset = 0
+                while job is None:
+                    candidates = cursor.execute(f"""
+                        SELECT user_id, weight, MAX(vtime, ?) AS start_tag
+                        FROM queue_users
+                        WHERE pending_{job_class} > 0
+                          AND running < COALESCE(max_running, ?)
+                        ORDER BY start_tag ASC, user_id ASC
+                        LIMIT ? OFFSET ?
+                    """, (sys_vtime, self.user_concurrency, self.fair_share_scan, offset)).fetchall()
+                    job = self._claim_first(cursor, job_class, candidates, now)
+                    if len(candidates) < self.fair_share_scan:
+                        break
+                    offset += self.fair_share_scan
+                if job:
+                    break
+            
+            cursor.execute("COMMIT")
+            conn.close()
+            
+            return dict(job) if job else None
+            
+        except Exception as e:
+            logger.error(f"Error fetching job: {e}")
+            return None
+    
+    def _claim_first(self, cursor, job_class: str, candidates: list, now: datetime):
+        """Lease the first candidate user's next claimable job and advance virtual time"""
+        for user in candidates:
+            job = cursor.execute("""
+                UPDATE processing_queue
+                SET status = 'running',
+                    started_at = ?,
+                    attempts = attempts + 1,
+                    lease_owner = ?,
+                    lease_expires_at = ?,
+                    heartbeat_at = ?
+                WHERE job_id = (
+                    SELECT job_id
+                    FROM processing_queue INDEXED BY idx_queue_status_priority
+                    WHERE status = 'pending'
+                      AND job_class = ?
+                      AND user_id = ?
+                      AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                    ORDER BY priority DESC, created_at ASC
+                    LIMIT 1
+                )
+                RETURNING job_id, job_type, params, priority, created_at,
+                          attempts, max_attempts, user_id, job_class
+            """, (
+                now.isoformat(),
+                self.worker_id,
+                (now + timedelta(seconds=self.lease_seconds)).isoformat(),
+                now.isoformat(),
+                job_class,
+                user['user_id'],
+                now.isoformat()
+            )).fetchone()
+            
+            if job:
+                cursor.execute(
+                    "UPDATE queue_users SET vtime = ? WHERE user_id = ?",
+                    (user['start_tag'] + 1.0 / user['weight'], user['user_id'])
+                )
+                cursor.execute(
+                    "UPDATE queue_sched SET vtime = ? WHERE id = 1",
+                    (user['start_tag'],)
+                )
+                return job
+        return None
+    
+    def heartbeat(self, job_id: str) -> bool:
+        """
+        Extend the lease on a running job
+        
+        Returns:
+            True if this worker still holds the lease, False if it was
+            reaped (another worker may now own the job)
+        """
+        try:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            now = datetime.utcnow()
             cursor.execute("""
-                SELECT job_id, job_type, params, priority, created_at
-                FROM processing_queue
-                WHERE status = 'pending'
-                ORDER BY priority DESC, created_at ASC
-                LIMIT 1
-            """)
+                UPDATE processing_queue
+                SET lease_expires_at = ?, heartbeat_at = ?
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+            """, (
+                (now + timedelta(seconds=self.lease_seconds)).isoformat(),
+                now.isoformat(),
+                job_id,
+                self.worker_id
+            ))
+            held = cursor.rowcount > 0
             
-            row = cursor.fetchone()
-            if not row:
-                conn.close()
-                return None
+            conn.commit()
+            conn.close()
+            
+            if not held:
+                logger.warning(f"Lost lease on job {job_id}")
+            return held
             
-            job = dict(row)
+        except Exception as e:
+            logger.error(f"Heartbeat failed for job {job_id}: {e}")
+            return True
+    
+    @contextmanager
+    def _lease_heartbeat(self, job_id: str):
+        """Heartbeat every lease_seconds/3 in a background thread while the body runs"""
+        stop = threading.Event()
+        interval = max(self.lease_seconds / 3.0, 1.0)
+        
+        def beat():
+            while not stop.wait(interval):
+                if not self.heartbeat(job_id):
+                    return
+        
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join(timeout=interval)
+    
+    def reap_expired_leases(self) -> int:
+        """
+        Return running jobs whose lease expired to the queue
+        
+        Jobs that still have attempts left go back to pending immediately;
+        the rest are dead-lettered.
+        
+        Returns:
+            Number of jobs reaped
+        """
+        try:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
             
-            # Mark as running
+            now = datetime.utcnow().isoformat()
             cursor.execute("""
                 UPDATE processing_queue
-                SET status = 'running', started_at = ?
-                WHERE job_id = ?
-            """, (datetime.utcnow().isoformat(), job['job_id']))
+                SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+                    error = 'lease expired (owner ' || COALESCE(lease_owner, '?') || ')',
+                    completed_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,
+                    next_attempt_at = ?,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE status = 'running' AND lease_expires_at < ?
+                RETURNING job_id, status
+            """, (now, now, now))
+            rows = cursor.fetchall()
+            reaped = len(rows)
+            
+            for reaped_id, status in rows:
+                if status == 'dead':
+                    fail_dependents(conn, reaped_id)
             
             conn.commit()
             conn.close()
             
-            return job
+            if reaped:
+                logger.warning(f"Reaped {reaped} job(s) with expired leases")
+            return reaped
             
         except Exception as e:
-            logger.error(f"Error fetching job: {e}")
-            return None
+            logger.error(f"Lease reaper failed: {e}")
+            return 0
     
     def process_job(self, job: Dict[str, Any]):
         """Route job to appropriate handler based on job_type"""
@@ -115,25 +360,38 @@ class SimpleWorker:
             if isinstance(params, str):
                 params = json.loads(params) if params else {}
             
+            params.setdefault('user_id', job.get('user_id', 'system'))
+            
             # Route to handler
-            if job_type == 'L0_harvest':
-                self.run_l0_harvest(job_id, params)
-            elif job_type == 'L1_cluster':
-                self.run_l1_clustering(job_id, params)
-            elif job_type == 'L2_extract':
-                self.run_l2_extraction(job_id, params)
-            elif job_type == 'L3_synthesize':
-                self.run_l3_synthesis(job_id, params)
-            elif job_type == 'L4_expand':
-                self.run_l4_expansion(job_id, params)
-            else:
-                logger.warning(f"Unknown job type: {job_type}")
-                self.mark_job_failed(job_id, f"Unknown job type: {job_type}")
-                return
+            with self._lease_heartbeat(job_id):
+                if job_type == 'L0_harvest':
+                    self.run_l0_harvest(job_id, params)
+                elif job_type == 'L1_cluster':
+                    self.run_l1_clustering(job_id, params)
+                elif job_type == 'L2_extract':
+                    self.run_l2_extraction(job_id, params)
+                elif job_type == 'L3_synthesize':
+                    self.run_l3_synthesis(job_id, params)
+                elif job_type == 'L4_expand':
+                    self.run_l4_expansion(job_id, params)
+                elif job_type == 'L5_export':
+                    self.run_l5_export(job_id, params)
+                else:
+                    logger.warning(f"Unknown job type: {job_type}")
+                    self.mark_job_failed(job_id, f"Unknown job type: {job_type}", retryable=False)
+                    return
             
             # Mark success
             self.mark_job_complete(job_id)
             
+        except (TransientProviderError, S2TransientError) as e:
+            # Throttled / 5xx / transport failures after the client's own retries
+            logger.error(f"Job {job_id} failed: {e}")
+            self.mark_job_failed(job_id, str(e))
+        except (ValueError, ProviderError, S2Error) as e:
+            # Bad params / malformed input / rejected by provider: retrying cannot help
+            logger.error(f"Job {job_id} failed permanently: {e}")
+            self.mark_job_failed(job_id, str(e), retryable=False)
         except Exception as e:
             logger.error(f"Job {job_id} failed: {e}", exc_info=True)
             self.mark_job_failed(job_id, str(e))
@@ -150,20 +408,28 @@ class SimpleWorker:
         if not query:
             raise ValueError("L0 requires 'query' parameter")
         
-        # TODO: Call Semantic Scholar API
-        # For now, stub implementation
-        logger.info(f"L0: Would query Semantic Scholar for: {query}")
+        harvested = self._event_loop().run_until_complete(harvest(
+            self._s2_client(), self.db_path, query,
+            limit=params.get('limit', 1000), year=params.get('year')
+        ))
         
-        # Placeholder: pretend we found 10 papers
         results = {
             'job_id': job_id,
             'query': query,
-            'papers_found': 10,
+            'papers_found': harvested['papers_found'],
+            'pages': harvested['pages'],
+            'article_ids': harvested['article_ids'],
             'timestamp': datetime.utcnow().isoformat()
         }
         
         # Store results
         self._store_job_results(job_id, 'L0_harvest', results)
+        
+        if params.get('pipeline') and results.get('article_ids'):
+            self._fan_out(job_id, [{
+                'job_type': 'L1_cluster',
+                'params': {'article_ids': results['article_ids'], 'pipeline': True},
+            }])
     
     def run_l1_clustering(self, job_id: str, params: Dict[str, Any]):
         """
@@ -183,6 +449,7 @@ class SimpleWorker:
         
         # Placeholder: keep 70% of articles
         kept_count = int(len(article_ids) * 0.7)
+        kept_ids = article_ids[:kept_count]
         results = {
             'job_id': job_id,
             'total_articles': len(article_ids),
@@ -193,34 +460,282 @@ class SimpleWorker:
         }
         
         self._store_job_results(job_id, 'L1_cluster', results)
+        
+        if params.get('pipeline') and kept_ids:
+            # Near-duplicates collapse onto their canonical article before any L2 work
+            kept_ids = list(dict.fromkeys(self._canonical_ids(kept_ids).values()))
+            
+            # Fan out one L2 per kept article (or per l2_batch_size articles,
+            # which share requests), fan in to one L3 for the cluster
+            cluster_id = params.get('cluster_id') or job_id
+            batch_size = int(params.get('l2_batch_size') or 1)
+            if batch_size > 1:
+                groups = [kept_ids[i:i + batch_size] for i in range(0, len(kept_ids), batch_size)]
+                l2_jobs = [
+                    {
+                        'job_type': 'L2_extract',
+                        'key': f"L2_extract/{'+'.join(group)}",
+                        'params': {'article_ids': group, 'cluster_id': cluster_id},
+                    }
+                    for group in groups
+                ]
+            else:
+                l2_jobs = [
+                    {
+                        'job_type': 'L2_extract',
+                        'key': f"L2_extract/{article_id}",
+                        'params': {'article_id': article_id, 'cluster_id': cluster_id},
+                    }
+                    for article_id in kept_ids
+                ]
+            l2_ids = self._fan_out(job_id, l2_jobs)
+            self._fan_out(job_id, [{
+                'job_type': 'L3_synthesize',
+                'params': {'cluster_id': cluster_id, 'article_ids': kept_ids, 'pipeline': True},
+                'depends_on': l2_ids,
+            }])
     
     def run_l2_extraction(self, job_id: str, params: Dict[str, Any]):
         """
         L2: 7-panel extraction from full text
-        Input: article ID
+        Input: article ID (or 'article_ids' for batch mode, see _run_l2_batch)
         Output: structured 7-panel JSON
+        
+        Models are tried cheapest predicted first (see _model_ladder); a run
+        whose panels still fail the schema after re-asking escalates to the
+        next model, so a dearer model is only paid for when needed.
         """
+        if params.get('article_ids'):
+            return self._run_l2_batch(job_id, params)
+        
         logger.info(f"L2 extraction: article {params.get('article_id', 'unknown')}")
         
         article_id = params.get('article_id')
         if not article_id:
             raise ValueError("L2 requires 'article_id' parameter")
         
-        # TODO: Load PDF, extract text, run 7-panel prompt
-        # Use prompts/7panel_*.md
-        logger.info(f"L2: Would extract 7-panel from article {article_id}")
+        canonical_id = self._canonical_ids([article_id])[article_id]
+        if canonical_id != article_id:
+            logger.info(f"L2: article {article_id} is a duplicate of {canonical_id}, skipping extraction")
+            self._store_job_results(job_id, 'L2_extract', {
+                'job_id': job_id,
+                'article_id': article_id,
+                'duplicate_of': canonical_id,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+            return
+        
+        sections = self._load_sections(article_id)
+        ladder = self._model_ladder(params, sum(len(text or '') for text in sections.values()))
+        
+        calls: List[Dict[str, Any]] = []
+        attempts = []
+        for rung, (provider, model) in enumerate(ladder, 1):
+            # Findings and mechanisms passes run concurrently; QC follows each pass
+            extractor = SevenPanelExtractor(
+                self._llm_client(), params['user_id'], provider, model,
+                pass_timeout=self.pass_timeout
+            )
+            extraction = self._event_loop().run_until_complete(
+                extractor.extract(article_id, sections)
+            )
+            calls += extraction['calls']
+            invalid = sorted({p for v in extraction['validation'].values() for p in v['errors']})
+            attempts.append({'provider': provider, 'model': model, 'invalid_panels': invalid})
+            if not invalid:
+                break
+            if rung < len(ladder):
+                logger.info(f"L2: article {article_id} panels {invalid} failed on {model}, escalating")
+        # Usage events are batched in memory; write this job's before reporting it
+        self._event_loop().run_until_complete(self._llm_client().flush_usage())
+        
+        if invalid:
+            logger.warning(f"L2: article {article_id} panels still failing schema after re-ask: {invalid}")
         
-        # Placeholder
         results = {
             'job_id': job_id,
             'article_id': article_id,
-            'findings_extracted': 3,
-            'mechanisms_identified': 2,
+            'provider': provider,
+            'model': model,
+            'panels': extraction['panels'],
+            'qc': extraction['qc'],
+            'validation': extraction['validation'],
+            'attempts': attempts,
+            'llm_calls': len(calls),
+            'cached_calls': sum(1 for c in calls if c['cached']),
+            'tokens_in': sum(c['tokens_in'] for c in calls),
+            'tokens_out': sum(c['tokens_out'] for c in calls),
             'timestamp': datetime.utcnow().isoformat()
         }
         
         self._store_job_results(job_id, 'L2_extract', results)
     
+    def _run_l2_batch(self, job_id: str, params: Dict[str, Any]):
+        """
+        L2 batch mode: several articles in one job
+        
+        SevenPanelExtractor.extract_batch() packs short papers several to a
+        request. Escalation works as for a single article, but only the
+        articles whose panels still fail move up the model ladder.
+        """
+        canonical = self._canonical_ids(list(params['article_ids']))
+        duplicates = {a: c for a, c in canonical.items() if a != c}
+        article_ids = list(dict.fromkeys(canonical.values()))
+        logger.info(f"L2 extraction: batch of {len(article_ids)} articles")
+        
+        papers = [(article_id, self._load_sections(article_id)) for article_id in article_ids]
+        ladder = self._model_ladder(params, sum(len(t or '') for _, s in papers for t in s.values()))
+        
+        calls: List[Dict[str, Any]] = []
+        attempts = []
+        articles: Dict[str, Dict[str, Any]] = {}
+        pending = papers
+        for rung, (provider, model) in enumerate(ladder, 1):
+            extractor = SevenPanelExtractor(
+                self._llm_client(), params['user_id'], provider, model,
+                pass_timeout=self.pass_timeout
+            )
+            extractions = self._event_loop().run_until_complete(extractor.extract_batch(pending))
+            calls += extractor.calls
+            failed = []
+            for paper, extraction in zip(pending, extractions):
+                invalid = sorted({p for v in extraction['validation'].values() for p in v['errors']})
+                articles[paper[0]] = {
+                    'provider': provider,
+                    'model': model,
+                    'panels': extraction['panels'],
+                    'qc': extraction['qc'],
+                    'validation': extraction['validation'],
+                    'invalid_panels': invalid,
+                }
+                if invalid:
+                    failed.append(paper)
+            attempts.append({
+                'provider': provider,
+                'model': model,
+                'article_ids': [a for a, _ in pending],
+                'invalid_article_ids': [a for a, _ in failed],
+            })
+            pending = failed
+            if not pending:
+                break
+            if rung < len(ladder):
+                logger.info(f"L2: {len(pending)} articles failed schema on {model}, escalating")
+        self._event_loop().run_until_complete(self._llm_client().flush_usage())
+        
+        if pending:
+            logger.warning(f"L2: articles still failing schema after re-ask: {[a for a, _ in pending]}")
+        
+        self._store_job_results(job_id, 'L2_extract', {
+            'job_id': job_id,
+            'article_ids': article_ids,
+            'duplicates': duplicates,
+            'articles': articles,
+            'attempts': attempts,
+            'llm_calls': len(calls),
+            'cached_calls': sum(1 for c in calls if c['cached']),
+            'tokens_in': sum(c['tokens_in'] for c in calls),
+            'tokens_out': sum(c['tokens_out'] for c in calls),
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    
+    def _model_ladder(self, params: Dict[str, Any], input_chars: int) -> List[Tuple[str, str]]:
+        """
+        (provider, model) pairs to try for an L2 job, cheapest predicted first
+        
+        An explicit params['model'] is used alone. Otherwise candidates come
+        from params['models'] or AE_LLM_MODELS ("provider:model,...") and are
+        ranked with UsageLedger.cheapest() for the paper's length; with none
+        configured, AE_LLM_PROVIDER / AE_LLM_MODEL is the only rung.
+        """
+        provider = params.get('provider') or os.environ.get('AE_LLM_PROVIDER', 'openai')
+        if params.get('model'):
+            return [(provider, params['model'])]
+        spec = params.get('models') or os.environ.get('AE_LLM_MODELS', '')
+        names = spec.split(',') if isinstance(spec, str) else spec
+        candidates = [tuple(n.strip().split(':', 1)) for n in names if ':' in n]
+        if not candidates:
+            return [(provider, os.environ.get('AE_LLM_MODEL', 'gpt-4o-mini'))]
+        ledger = self._llm_client().ledger
+        if ledger is None or len(candidates) == 1:
+            return candidates
+        ranked = ledger.cheapest('L2_extraction', input_chars, candidates)
+        return [(r['provider'], r['model']) for r in ranked]
+    
+    def _canonical_ids(self, article_ids: list) -> Dict[str, str]:
+        """Resolve near-duplicate articles to their canonical copy (see app/dedup.py)"""
+        import sqlite3
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return canonical_ids(conn, article_ids)
+        finally:
+            conn.close()
+    
+    def _load_sections(self, article_id: str) -> Dict[str, str]:
+        """Sectioned text stored by pdf_ingest.ingest_pdf()"""
+        import sqlite3
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT sections, full_text FROM articles WHERE article_id = ?", (article_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        
+        if not row:
+            raise ValueError(f"Unknown article: {article_id}")
+        sections = json.loads(row[0]) if row[0] else {}
+        if not any(sections.values()) and row[1]:
+            sections = section_paper_text(row[1])
+        if not any(sections.values()):
+            raise ValueError(f"Article {article_id} has no ingested text (run pdf_ingest first)")
+        return sections
+    
+    def _event_loop(self):
+        """Event loop kept for the worker's lifetime so the HTTP pool is reused across jobs"""
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+    
+    def _llm_client(self) -> LLMClient:
+        """Shared LLM client: one httpx pool, the ae.db rate limiter, response cache and usage ledger"""
+        if self._llm is None:
+            from app.security import KeyManager
+            
+            self._keys = KeyManager(self.db_path)
+            self._llm = LLMClient(
+                self._keys.retrieve_key,
+                limiter=RateLimiter(self.db_path),
+                cache=LLMCache(os.environ.get('AE_LLM_CACHE', './llm_cache.db')),
+                ledger=UsageLedger(self.db_path)
+            )
+        return self._llm
+    
+    def _s2_client(self) -> S2Client:
+        """Shared Semantic Scholar client (pooled connections, on-disk response cache)"""
+        if self._s2 is None:
+            self._s2 = S2Client(
+                api_key=os.environ.get('S2_API_KEY'),
+                cache_dir=os.environ.get('AE_S2_CACHE', './s2_cache')
+            )
+        return self._s2
+    
+    def close(self):
+        """Release the HTTP connection pools and event loop; flush key usage"""
+        if self._loop is not None and not self._loop.is_closed():
+            for client in (self._llm, self._s2):
+                if client is not None:
+                    self._loop.run_until_complete(client.aclose())
+            self._loop.close()
+        if self._keys is not None:
+            self._keys.close()
+        self._keys = None
+        self._llm = None
+        self._s2 = None
+        self._loop = None
+    
     def run_l3_synthesis(self, job_id: str, params: Dict[str, Any]):
         """
         L3: Multi-document rule synthesis
@@ -261,35 +776,124 @@ class SimpleWorker:
         if not seed_articles:
             raise ValueError("L4 requires 'seed_articles' parameter")
         
-        # TODO: Find related papers via citations, semantic search
-        logger.info(f"L4: Would expand from {len(seed_articles)} seed articles")
+        expansion = self._event_loop().run_until_complete(expand_articles(
+            self._s2_client(), self.db_path, seed_articles,
+            hops=params.get('hops', 2),
+            max_frontier=params.get('max_frontier', 200),
+            max_candidates=params.get('max_candidates', 50)
+        ))
         
-        # Placeholder
         results = {
             'job_id': job_id,
-            'new_candidates': 5,
+            'new_candidates': len(expansion['article_ids']),
+            **expansion,
             'timestamp': datetime.utcnow().isoformat()
         }
         
         self._store_job_results(job_id, 'L4_expand', results)
+        
+        if expansion['article_ids']:
+            # Only novel candidates go on to triage
+            self._fan_out(job_id, [{
+                'job_type': 'L1_cluster',
+                'params': {'article_ids': expansion['article_ids'], 'pipeline': bool(params.get('pipeline'))},
+            }])
     
-    def _store_job_results(self, job_id: str, job_type: str, results: Dict[str, Any]):
-        """Store job results in database for retrieval"""
+    def run_l5_export(self, job_id: str, params: Dict[str, Any]):
+        """
+        L5: Bayesian-network handoff
+        Input: rules (optionally one cluster, optionally only changes since the last export)
+        Output: bn_package file streamed to disk
+        """
+        logger.info(f"L5 export: cluster {params.get('cluster_id', 'all')}")
+
+        export = export_package(
+            self.db_path,
+            out_dir=params.get('out_dir', os.environ.get('AE_EXPORT_DIR', './exports')),
+            cluster_id=params.get('cluster_id'),
+            since_last=bool(params.get('incremental')),
+            fmt=params.get('format', 'json'),
+            compress=bool(params.get('gzip'))
+        )
+
+        results = {
+            'job_id': job_id,
+            **export,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+        self._store_job_results(job_id, 'L5_export', results)
+
+    def _fan_out(self, job_id: str, children: list) -> list:
+        """
+        Enqueue child jobs that wait for this job to complete
+        
+        Args:
+            job_id: Parent (currently running) job
+            children: List of dicts with job_type, params, and optional
+                key (stable per child, so a retried parent does not
+                duplicate work), depends_on (extra parents) and priority.
+                Children inherit the parent's owner and run as batch.
+        
+        Returns:
+            Child job_ids
+        """
+        import sqlite3
+        conn = sqlite3.connect(self.db_path)
         try:
-            import sqlite3
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Store as JSON in job_results table (would need to create this table)
-            # For now, just log
-            logger.info(f"Job {job_id} results: {json.dumps(results, indent=2)}")
+            row = conn.execute(
+                "SELECT priority, user_id FROM processing_queue WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            priority, user_id = row if row else (0, 'system')
             
+            child_ids = []
+            for child in children:
+                child_ids.append(enqueue_job(
+                    conn,
+                    child['job_type'],
+                    child.get('params'),
+                    priority=child.get('priority', priority),
+                    depends_on=[job_id, *child.get('depends_on', [])],
+                    job_id=f"{job_id}/{child.get('key') or child['job_type']}",
+                    user_id=user_id
+                ))
+            conn.commit()
+        finally:
             conn.close()
-        except Exception as e:
-            logger.error(f"Failed to store results for {job_id}: {e}")
+        
+        logger.info(f"Job {job_id} fanned out {len(child_ids)} job(s)")
+        return child_ids
+    
+    def _store_job_results(self, job_id: str, job_type: str, results: Dict[str, Any]):
+        """
+        Store job results as JSON in job_results, one row per job (a retry
+        replaces the earlier row; see db/sql/028_job_results.sql)
+        
+        Errors propagate so the job is retried rather than completed without
+        its (possibly paid-for) output.
+        """
+        import sqlite3
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("""
+                INSERT INTO job_results (job_id, job_type, result_data, created_at)
+                VALUES (?, ?, ?, datetime('now'))
+                ON CONFLICT(job_id) DO UPDATE SET
+                    job_type = excluded.job_type,
+                    result_data = excluded.result_data,
+                    created_at = excluded.created_at
+            """, (job_id, job_type, json.dumps(results, default=str)))
+            conn.commit()
+        finally:
+            conn.close()
+        
+        logger.info(f"Job {job_id} results stored ({job_type})")
     
     def mark_job_complete(self, job_id: str):
-        """Update job status to complete"""
+        """
+        Update job status to complete (only while this worker holds the lease)
+        and release dependents whose parents are now all complete
+        """
         try:
             import sqlite3
             conn = sqlite3.connect(self.db_path)
@@ -298,37 +902,93 @@ class SimpleWorker:
             cursor.execute("""
                 UPDATE processing_queue
                 SET status = 'complete',
-                    completed_at = ?
-                WHERE job_id = ?
-            """, (datetime.utcnow().isoformat(), job_id))
+                    completed_at = ?,
+                    error = NULL,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+            """, (datetime.utcnow().isoformat(), job_id, self.worker_id))
+            updated = cursor.rowcount
+            
+            if updated:
+                release_dependents(conn, job_id)
             
             conn.commit()
             conn.close()
             
-            logger.info(f"✓ Job {job_id} marked complete")
+            if updated:
+                logger.info(f"✓ Job {job_id} marked complete")
+            else:
+                logger.warning(f"Job {job_id} finished after its lease was lost; result not recorded")
             
         except Exception as e:
             logger.error(f"Failed to mark job {job_id} complete: {e}")
     
-    def mark_job_failed(self, job_id: str, error: str):
-        """Update job status to failed with error message"""
+    def mark_job_failed(self, job_id: str, error: str, retryable: bool = True):
+        """
+        Record a failed attempt (only while this worker holds the lease)
+        
+        Retryable failures with attempts left go back to pending with
+        next_attempt_at set by retry_delay_seconds(); exhausted jobs move
+        to 'dead'. Non-retryable failures go straight to 'failed'. Either
+        terminal state fails every blocked descendant.
+        """
         try:
             import sqlite3
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            cursor.execute(
+                "SELECT attempts, max_attempts FROM processing_queue WHERE job_id = ?",
+                (job_id,)
+            )
+            row = cursor.fetchone()
+            attempts, max_attempts = row if row else (0, 0)
+            
+            now = datetime.utcnow()
+            if not retryable:
+                status, next_attempt_at = 'failed', None
+            elif attempts < max_attempts:
+                delay = retry_delay_seconds(attempts)
+                status, next_attempt_at = 'pending', (now + timedelta(seconds=delay)).isoformat()
+            else:
+                status, next_attempt_at = 'dead', None
+            
             cursor.execute("""
                 UPDATE processing_queue
-                SET status = 'failed',
+                SET status = ?,
                     error = ?,
-                    completed_at = ?
-                WHERE job_id = ?
-            """, (error, datetime.utcnow().isoformat(), job_id))
+                    completed_at = ?,
+                    next_attempt_at = ?,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE job_id = ? AND status = 'running' AND lease_owner = ?
+            """, (
+                status,
+                error,
+                None if status == 'pending' else now.isoformat(),
+                next_attempt_at,
+                job_id,
+                self.worker_id
+            ))
+            
+            updated = cursor.rowcount
+            
+            if updated and status != 'pending':
+                fail_dependents(conn, job_id)
             
             conn.commit()
             conn.close()
             
-            logger.error(f"✗ Job {job_id} marked failed: {error}")
+            if not updated:
+                logger.warning(f"Job {job_id} failed after its lease was lost; failure not recorded: {error}")
+            elif status == 'pending':
+                logger.warning(
+                    f"↻ Job {job_id} attempt {attempts}/{max_attempts} failed, "
+                    f"retry at {next_attempt_at}: {error}"
+                )
+            else:
+                logger.error(f"✗ Job {job_id} marked {status}: {error}")
             
         except Exception as e:
             logger.error(f"Failed to mark job {job_id} as failed: {e}")
@@ -341,14 +1001,35 @@ def main():
     parser = argparse.ArgumentParser(description='Article Eater Queue Worker')
     parser.add_argument('--db', default='./ae.db', help='Database path')
     parser.add_argument('--poll-interval', type=int, default=5, help='Seconds between polls')
+    parser.add_argument('--lease-seconds', type=int, default=300,
+                        help='Job lease length; heartbeats renew it every third of this')
+    parser.add_argument('--reap-interval', type=int, default=60,
+                        help='Seconds between expired-lease reaper passes')
+    parser.add_argument('--job-classes', default='interactive,batch',
+                        help="Job classes to serve, in order ('interactive' alone reserves this worker)")
+    parser.add_argument('--user-concurrency', type=int, default=4,
+                        help='Default per-user cap on running jobs')
+    parser.add_argument('--pass-timeout', type=float, default=300.0,
+                        help='Seconds allowed per L2 extraction pass (including its QC check)')
+    parser.add_argument('--reap-once', action='store_true',
+                        help='Run one reaper pass and exit')
     
     args = parser.parse_args()
     
     worker = SimpleWorker(
         poll_interval=args.poll_interval,
-        db_path=args.db
+        db_path=args.db,
+        lease_seconds=args.lease_seconds,
+        reap_interval=args.reap_interval,
+        job_classes=tuple(args.job_classes.split(',')),
+        user_concurrency=args.user_concurrency,
+        pass_timeout=args.pass_timeout
     )
     
+    if args.reap_once:
+        worker.reap_expired_leases()
+        return
+    
     try:
         worker.start()
     except KeyboardInterrupt:
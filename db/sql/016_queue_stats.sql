@@ -0,0 +1,137 @@
+-- Article Eater v18.5 - Queue Introspection Counters
+-- Incrementally maintained queue depth, throughput and run-time histograms
+-- Read by app/queue_stats.py (GET /queue/stats, python -m app.queue_stats)
+-- Date: 2026-10-19
+
+-- ===== DEPTH COUNTERS =====
+-- One row per (job_type, status); kept in step with processing_queue by triggers
+-- so dashboards never need COUNT(*) over the queue.
+
+CREATE TABLE IF NOT EXISTS queue_counters (
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_type, status)
+);
+
+-- ===== THROUGHPUT (PER MINUTE) =====
+
+CREATE TABLE IF NOT EXISTS queue_throughput (
+    job_type TEXT NOT NULL,
+    minute TEXT NOT NULL,  -- 'YYYY-MM-DD HH:MM' (UTC)
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_type, minute)
+);
+
+-- ===== RUN-TIME HISTOGRAM (PER HOUR) =====
+-- bucket is an index into RUNTIME_BUCKETS_MS in app/queue_stats.py:
+--   0:<=250ms 1:<=500ms 2:<=1s 3:<=2.5s 4:<=5s 5:<=10s 6:<=30s
+--   7:<=1m 8:<=2m 9:<=5m 10:<=10m 11:<=30m 12:>30m
+
+CREATE TABLE IF NOT EXISTS queue_runtime_hist (
+    job_type TEXT NOT NULL,
+    hour TEXT NOT NULL,  -- 'YYYY-MM-DD HH:00' (UTC)
+    bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_type, hour, bucket)
+);
+
+-- Oldest pending job per job_type in O(log n)
+CREATE INDEX IF NOT EXISTS idx_queue_pending_age
+ON processing_queue(job_type, created_at)
+WHERE status = 'pending';
+
+-- ===== BACKFILL =====
+
+DELETE FROM queue_counters;
+INSERT INTO queue_counters (job_type, status, n)
+SELECT job_type, status, COUNT(*)
+FROM processing_queue
+GROUP BY job_type, status;
+
+-- ===== TRIGGERS =====
+
+DROP TRIGGER IF EXISTS trg_queue_counters_insert;
+CREATE TRIGGER trg_queue_counters_insert
+AFTER INSERT ON processing_queue
+BEGIN
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_counters_delete;
+CREATE TRIGGER trg_queue_counters_delete
+AFTER DELETE ON processing_queue
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_counters_status;
+CREATE TRIGGER trg_queue_counters_status
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_throughput;
+CREATE TRIGGER trg_queue_throughput
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status AND new.status IN ('complete', 'failed')
+BEGIN
+    INSERT INTO queue_throughput (job_type, minute, completed, failed)
+    VALUES (
+        new.job_type,
+        strftime('%Y-%m-%d %H:%M', COALESCE(new.completed_at, datetime('now'))),
+        new.status = 'complete',
+        new.status <> 'complete'
+    )
+    ON CONFLICT(job_type, minute) DO UPDATE SET
+        completed = completed + excluded.completed,
+        failed = failed + excluded.failed;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_runtime;
+CREATE TRIGGER trg_queue_runtime
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+    AND new.status = 'complete'
+    AND new.started_at IS NOT NULL
+    AND new.completed_at IS NOT NULL
+BEGIN
+    INSERT INTO queue_runtime_hist (job_type, hour, bucket, n)
+    SELECT
+        new.job_type,
+        strftime('%Y-%m-%d %H:00', new.completed_at),
+        CASE
+            WHEN ms <= 250 THEN 0
+            WHEN ms <= 500 THEN 1
+            WHEN ms <= 1000 THEN 2
+            WHEN ms <= 2500 THEN 3
+            WHEN ms <= 5000 THEN 4
+            WHEN ms <= 10000 THEN 5
+            WHEN ms <= 30000 THEN 6
+            WHEN ms <= 60000 THEN 7
+            WHEN ms <= 120000 THEN 8
+            WHEN ms <= 300000 THEN 9
+            WHEN ms <= 600000 THEN 10
+            WHEN ms <= 1800000 THEN 11
+            ELSE 12
+        END,
+        1
+    FROM (
+        SELECT (julianday(new.completed_at) - julianday(new.started_at)) * 86400000.0 AS ms
+    )
+    WHERE true
+    ON CONFLICT(job_type, hour, bucket) DO UPDATE SET n = n + 1;
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.0', 'Queue introspection counters, throughput and run-time histograms');
@@ -0,0 +1,151 @@
+-- Article Eater v18.5 - Job Dependency DAG
+-- Jobs may depend on other jobs; a job with unfinished parents waits in
+-- 'blocked' and is released to 'pending' when its last parent completes.
+-- Used for L0 -> L1 -> L2 (fan-out) -> L3 (fan-in) pipelines; see app/job_graph.py.
+-- Requires: 017_queue_leases.sql
+-- Date: 2026-10-19
+
+-- ===== DEPENDENCY EDGES =====
+
+CREATE TABLE IF NOT EXISTS job_dependencies (
+    job_id TEXT NOT NULL,  -- Child (waits)
+    depends_on TEXT NOT NULL,  -- Parent (must complete first)
+    PRIMARY KEY (job_id, depends_on),
+    FOREIGN KEY (job_id) REFERENCES processing_queue(job_id) ON DELETE CASCADE,
+    FOREIGN KEY (depends_on) REFERENCES processing_queue(job_id) ON DELETE CASCADE
+);
+
+-- Children of a finished job in O(log n)
+CREATE INDEX IF NOT EXISTS idx_job_deps_parent
+ON job_dependencies(depends_on);
+
+-- ===== QUEUE REBUILD FOR 'blocked' STATUS =====
+-- SQLite cannot alter a CHECK constraint in place. Triggers are dropped with
+-- the old table and recreated below.
+
+PRAGMA foreign_keys = OFF;
+
+BEGIN;
+
+CREATE TABLE processing_queue_new (
+    job_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL CHECK(job_type IN ('L0_harvest','L1_cluster','L2_extract','L3_synthesize','L4_expand')),
+    params TEXT,  -- JSON string
+    status TEXT NOT NULL CHECK(status IN ('blocked','pending','running','complete','failed','dead')),
+    priority INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (datetime('now')),
+    started_at TEXT,
+    completed_at TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,  -- Claims so far (incremented on each lease)
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    next_attempt_at TEXT,  -- Not claimable before this time (retry backoff)
+    lease_owner TEXT,  -- worker_id holding the lease
+    lease_expires_at TEXT,  -- Reaper returns the job to pending after this
+    heartbeat_at TEXT
+);
+
+INSERT INTO processing_queue_new
+SELECT job_id, job_type, params, status, priority, created_at, started_at, completed_at, error,
+       attempts, max_attempts, next_attempt_at, lease_owner, lease_expires_at, heartbeat_at
+FROM processing_queue;
+
+DROP TABLE processing_queue;
+ALTER TABLE processing_queue_new RENAME TO processing_queue;
+
+CREATE INDEX IF NOT EXISTS idx_queue_status_priority
+ON processing_queue(status, priority DESC, created_at ASC)
+WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_queue_pending_age
+ON processing_queue(job_type, created_at)
+WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_queue_lease
+ON processing_queue(lease_expires_at)
+WHERE status = 'running';
+
+-- ===== TRIGGERS (from 017_queue_leases.sql) =====
+
+CREATE TRIGGER trg_queue_counters_insert
+AFTER INSERT ON processing_queue
+BEGIN
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER trg_queue_counters_delete
+AFTER DELETE ON processing_queue
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+END;
+
+CREATE TRIGGER trg_queue_counters_status
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER trg_queue_throughput
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status AND new.status IN ('complete', 'failed', 'dead')
+BEGIN
+    INSERT INTO queue_throughput (job_type, minute, completed, failed)
+    VALUES (
+        new.job_type,
+        strftime('%Y-%m-%d %H:%M', COALESCE(new.completed_at, datetime('now'))),
+        new.status = 'complete',
+        new.status <> 'complete'
+    )
+    ON CONFLICT(job_type, minute) DO UPDATE SET
+        completed = completed + excluded.completed,
+        failed = failed + excluded.failed;
+END;
+
+CREATE TRIGGER trg_queue_runtime
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+    AND new.status = 'complete'
+    AND new.started_at IS NOT NULL
+    AND new.completed_at IS NOT NULL
+BEGIN
+    INSERT INTO queue_runtime_hist (job_type, hour, bucket, n)
+    SELECT
+        new.job_type,
+        strftime('%Y-%m-%d %H:00', new.completed_at),
+        CASE
+            WHEN ms <= 250 THEN 0
+            WHEN ms <= 500 THEN 1
+            WHEN ms <= 1000 THEN 2
+            WHEN ms <= 2500 THEN 3
+            WHEN ms <= 5000 THEN 4
+            WHEN ms <= 10000 THEN 5
+            WHEN ms <= 30000 THEN 6
+            WHEN ms <= 60000 THEN 7
+            WHEN ms <= 120000 THEN 8
+            WHEN ms <= 300000 THEN 9
+            WHEN ms <= 600000 THEN 10
+            WHEN ms <= 1800000 THEN 11
+            ELSE 12
+        END,
+        1
+    FROM (
+        SELECT (julianday(new.completed_at) - julianday(new.started_at)) * 86400000.0 AS ms
+    )
+    WHERE true
+    ON CONFLICT(job_type, hour, bucket) DO UPDATE SET n = n + 1;
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.2', 'Job dependency edges and blocked status for pipeline DAGs');
+
+COMMIT;
+
+PRAGMA foreign_keys = ON;
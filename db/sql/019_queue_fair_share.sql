@@ -0,0 +1,98 @@
+-- Article Eater v18.5 - Fair-Share Scheduling
+-- Jobs carry an owner (user_id) and a class ('interactive' or 'batch').
+-- Workers serve interactive before batch, and within a class pick the
+-- backlogged user with the smallest virtual time (start-time fair queuing,
+-- advanced by 1/weight per claim) who is under their concurrency cap.
+-- See SimpleWorker.fetch_next_job in app/worker.py.
+-- Requires: 018_job_dependencies.sql
+-- Date: 2026-10-19
+
+ALTER TABLE processing_queue ADD COLUMN user_id TEXT NOT NULL DEFAULT 'system';
+ALTER TABLE processing_queue ADD COLUMN job_class TEXT NOT NULL DEFAULT 'batch'
+    CHECK(job_class IN ('interactive','batch'));
+
+-- Covering index for the per-user claim probe: every column the probe reads
+-- is in the index, so the claim never touches the table b-tree.
+DROP INDEX IF EXISTS idx_queue_status_priority;
+CREATE INDEX idx_queue_status_priority
+ON processing_queue(status, job_class, user_id, priority DESC, created_at ASC, next_attempt_at, job_id)
+WHERE status = 'pending';
+
+-- ===== PER-USER SCHEDULER STATE =====
+
+CREATE TABLE IF NOT EXISTS queue_users (
+    user_id TEXT PRIMARY KEY,
+    weight REAL NOT NULL DEFAULT 1.0 CHECK(weight > 0),  -- Share of capacity
+    max_running INTEGER,  -- Concurrency cap (NULL: worker --user-concurrency)
+    pending_interactive INTEGER NOT NULL DEFAULT 0,  -- Trigger-maintained
+    pending_batch INTEGER NOT NULL DEFAULT 0,  -- Trigger-maintained
+    running INTEGER NOT NULL DEFAULT 0,  -- Trigger-maintained
+    vtime REAL NOT NULL DEFAULT 0  -- Virtual finish time of last claim
+);
+
+CREATE TABLE IF NOT EXISTS queue_sched (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    vtime REAL NOT NULL DEFAULT 0  -- System virtual time (start tag of last claim)
+);
+
+INSERT OR IGNORE INTO queue_sched (id, vtime) VALUES (1, 0);
+
+-- ===== BACKFILL =====
+
+INSERT OR IGNORE INTO queue_users (user_id)
+SELECT DISTINCT user_id FROM processing_queue;
+
+UPDATE queue_users SET
+    pending_interactive = (SELECT COUNT(*) FROM processing_queue q
+                           WHERE q.user_id = queue_users.user_id
+                             AND q.status = 'pending' AND q.job_class = 'interactive'),
+    pending_batch = (SELECT COUNT(*) FROM processing_queue q
+                     WHERE q.user_id = queue_users.user_id
+                       AND q.status = 'pending' AND q.job_class = 'batch'),
+    running = (SELECT COUNT(*) FROM processing_queue q
+               WHERE q.user_id = queue_users.user_id AND q.status = 'running');
+
+-- ===== TRIGGERS =====
+-- user_id and job_class are treated as immutable once a job is enqueued.
+
+DROP TRIGGER IF EXISTS trg_queue_users_insert;
+CREATE TRIGGER trg_queue_users_insert
+AFTER INSERT ON processing_queue
+BEGIN
+    INSERT OR IGNORE INTO queue_users (user_id) VALUES (new.user_id);
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive + (new.status = 'pending' AND new.job_class = 'interactive'),
+        pending_batch = pending_batch + (new.status = 'pending' AND new.job_class = 'batch'),
+        running = running + (new.status = 'running')
+    WHERE user_id = new.user_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_users_delete;
+CREATE TRIGGER trg_queue_users_delete
+AFTER DELETE ON processing_queue
+BEGIN
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive - (old.status = 'pending' AND old.job_class = 'interactive'),
+        pending_batch = pending_batch - (old.status = 'pending' AND old.job_class = 'batch'),
+        running = running - (old.status = 'running')
+    WHERE user_id = old.user_id;
+END;
+
+DROP TRIGGER IF EXISTS trg_queue_users_status;
+CREATE TRIGGER trg_queue_users_status
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+BEGIN
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive
+            - (old.status = 'pending' AND old.job_class = 'interactive')
+            + (new.status = 'pending' AND new.job_class = 'interactive'),
+        pending_batch = pending_batch
+            - (old.status = 'pending' AND old.job_class = 'batch')
+            + (new.status = 'pending' AND new.job_class = 'batch'),
+        running = running - (old.status = 'running') + (new.status = 'running')
+    WHERE user_id = new.user_id;
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.3', 'Job owner/class columns and fair-share scheduler state');
@@ -0,0 +1,27 @@
+-- Article Eater v18.5 - Shared LLM Rate Limiter State
+-- Token buckets per (user, provider) and per-provider concurrency slots,
+-- shared by every worker process on the host. See app/llm/rate_limit.py.
+-- Times are Unix epoch seconds (REAL).
+-- Date: 2026-10-19
+
+CREATE TABLE IF NOT EXISTS llm_rate_buckets (
+    user_id TEXT NOT NULL,
+    provider TEXT NOT NULL,  -- 'openai', 'anthropic', 'google'
+    request_tokens REAL NOT NULL,  -- Remaining requests in the RPM bucket
+    token_tokens REAL NOT NULL,  -- Remaining LLM tokens in the TPM bucket
+    rate_scale REAL NOT NULL DEFAULT 1.0,  -- AIMD multiplier, halved on each 429
+    cooldown_until REAL NOT NULL DEFAULT 0,  -- No requests before this (Retry-After)
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, provider)
+);
+
+CREATE TABLE IF NOT EXISTS llm_provider_slots (
+    provider TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    holder TEXT NOT NULL,  -- host:pid:token of the holder
+    expires_at REAL NOT NULL,  -- Slot is free again after this (crashed holder)
+    PRIMARY KEY (provider, slot)
+);
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.4', 'Shared LLM token buckets and provider concurrency slots');
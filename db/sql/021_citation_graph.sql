@@ -0,0 +1,27 @@
+-- Article Eater v18.5 - Local Citation Graph
+-- Citation adjacency keyed by Semantic Scholar corpus_id, filled lazily by
+-- L4 expansion so repeated expansions reuse neighbours instead of refetching.
+-- See app/citation_graph.py.
+-- Date: 2026-10-19
+
+-- One row per citation: citing paper -> cited paper
+CREATE TABLE IF NOT EXISTS citation_edges (
+    citing_corpus_id INTEGER NOT NULL,
+    cited_corpus_id INTEGER NOT NULL,
+    PRIMARY KEY (citing_corpus_id, cited_corpus_id)
+) WITHOUT ROWID;
+
+-- Reverse direction (who cites X) for co-citation and in-neighbour lookups
+CREATE INDEX IF NOT EXISTS idx_citation_edges_cited
+ON citation_edges(cited_corpus_id, citing_corpus_id);
+
+-- Papers whose full reference and citation lists are stored in citation_edges
+CREATE TABLE IF NOT EXISTS citation_fetch_log (
+    corpus_id INTEGER PRIMARY KEY,
+    n_references INTEGER NOT NULL DEFAULT 0,
+    n_citations INTEGER NOT NULL DEFAULT 0,
+    fetched_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.5', 'Local citation graph for L4 expansion');
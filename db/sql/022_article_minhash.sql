@@ -0,0 +1,38 @@
+-- Article Eater v18.5 - Near-Duplicate Article Detection
+-- MinHash signatures of ingested text, LSH band buckets for candidate lookup,
+-- and links from duplicate articles to their canonical copy.
+-- See app/dedup.py.
+-- Date: 2026-10-19
+
+-- 128 x uint32 MinHash signature packed little-endian (512 bytes per article)
+CREATE TABLE IF NOT EXISTS article_signatures (
+    article_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    num_perm INTEGER NOT NULL,
+    shingles INTEGER NOT NULL,  -- Distinct shingles hashed (0 = too little text)
+    computed_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (article_id) REFERENCES articles(article_id) ON DELETE CASCADE
+);
+
+-- One row per (band, bucket) an article falls in; equal buckets = LSH candidates
+CREATE TABLE IF NOT EXISTS article_lsh_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    article_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, article_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_lsh_bands_article ON article_lsh_bands(article_id);
+
+-- Duplicate -> canonical article (canonical_id never itself appears as article_id)
+CREATE TABLE IF NOT EXISTS article_duplicates (
+    article_id TEXT PRIMARY KEY,
+    canonical_id TEXT NOT NULL,
+    similarity REAL NOT NULL,  -- Estimated Jaccard similarity of shingle sets
+    detected_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_article_duplicates_canonical ON article_duplicates(canonical_id);
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.6', 'MinHash/LSH near-duplicate article detection');
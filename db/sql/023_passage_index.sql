@@ -0,0 +1,39 @@
+-- Article Eater v18.5 - Passage Index
+-- Sentence-level passages of ingested papers with character offsets into
+-- articles.full_text, plus an FTS5 index for quote verification and
+-- top-k passage retrieval. See app/passages.py.
+-- Date: 2026-10-19
+
+CREATE TABLE IF NOT EXISTS article_passages (
+    id INTEGER PRIMARY KEY,
+    article_id TEXT NOT NULL,
+    ordinal INTEGER NOT NULL,  -- Sentence number within the article
+    start_offset INTEGER NOT NULL,  -- articles.full_text[start_offset:end_offset]
+    end_offset INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (article_id, ordinal),
+    FOREIGN KEY (article_id) REFERENCES articles(article_id) ON DELETE CASCADE
+);
+
+-- External-content FTS over article_passages.text (article_id kept for filtering)
+CREATE VIRTUAL TABLE IF NOT EXISTS article_passages_fts USING fts5(
+    text,
+    article_id UNINDEXED,
+    content='article_passages',
+    content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_passages_fts_insert AFTER INSERT ON article_passages
+BEGIN
+    INSERT INTO article_passages_fts (rowid, text, article_id) VALUES (new.id, new.text, new.article_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_passages_fts_delete AFTER DELETE ON article_passages
+BEGIN
+    INSERT INTO article_passages_fts (article_passages_fts, rowid, text, article_id)
+    VALUES ('delete', old.id, old.text, old.article_id);
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.7', 'Sentence passage index with FTS5 for evidence verification');
@@ -0,0 +1,62 @@
+-- Article Eater v18.5 - Contradiction Candidate Index
+-- Findings bucketed by normalised (antecedents, consequent); pairs in the
+-- same bucket with opposite measure_direction become LLM check candidates.
+-- rules.contradiction_count follows confirmed pairs incrementally.
+-- See app/contradictions.py.
+-- Date: 2026-10-19
+
+CREATE TABLE IF NOT EXISTS finding_buckets (
+    finding_id INTEGER PRIMARY KEY,
+    bucket_key TEXT NOT NULL,  -- e.g. 'daylight+window_view->attention'
+    direction TEXT,  -- 'increase' / 'decrease' / other normalised direction
+    FOREIGN KEY (finding_id) REFERENCES findings(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_finding_buckets_key ON finding_buckets(bucket_key, direction);
+
+CREATE TABLE IF NOT EXISTS contradiction_candidates (
+    finding_a INTEGER NOT NULL,
+    finding_b INTEGER NOT NULL,
+    bucket_key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK(status IN ('pending', 'contradicting', 'consistent', 'neutral')),
+    rationale TEXT,  -- JSON: LLM stance output
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    checked_at TEXT,
+    PRIMARY KEY (finding_a, finding_b),
+    CHECK (finding_a < finding_b)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_contradiction_pending
+ON contradiction_candidates(created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_contradiction_b ON contradiction_candidates(finding_b);
+
+-- A pair entering/leaving 'contradicting' adjusts every rule backed by either finding
+CREATE TRIGGER IF NOT EXISTS trg_contradiction_confirmed
+AFTER UPDATE OF status ON contradiction_candidates
+WHEN new.status = 'contradicting' AND old.status != 'contradicting'
+BEGIN
+    UPDATE rules SET contradiction_count = COALESCE(contradiction_count, 0) + 1,
+                     updated_at = datetime('now')
+    WHERE rule_id IN (
+        SELECT rule_id FROM rule_evidence
+        WHERE finding_id IN (new.finding_a, new.finding_b)
+          AND COALESCE(stance, '') != 'contradicting'
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_contradiction_retracted
+AFTER UPDATE OF status ON contradiction_candidates
+WHEN old.status = 'contradicting' AND new.status != 'contradicting'
+BEGIN
+    UPDATE rules SET contradiction_count = MAX(COALESCE(contradiction_count, 0) - 1, 0),
+                     updated_at = datetime('now')
+    WHERE rule_id IN (
+        SELECT rule_id FROM rule_evidence
+        WHERE finding_id IN (old.finding_a, old.finding_b)
+          AND COALESCE(stance, '') != 'contradicting'
+    );
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.8', 'Contradiction candidate index over findings');
@@ -0,0 +1,25 @@
+-- Article Eater v18.5 - Synergy Candidates
+-- Frequent antecedent combinations per consequent, mined offline by
+-- app/synergy.py and queued for LLM review with prompts/synergy_rule_discovery.md.
+-- Date: 2026-10-19
+
+CREATE TABLE IF NOT EXISTS synergy_candidates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    consequent TEXT NOT NULL,  -- Normalised consequent construct
+    antecedents TEXT NOT NULL,  -- JSON array, sorted normalised antecedent names
+    n_findings INTEGER NOT NULL,  -- Findings with every antecedent and this consequent
+    support REAL NOT NULL,  -- n_findings / findings with this consequent
+    confidence REAL NOT NULL,  -- P(consequent | all antecedents present)
+    lift REAL NOT NULL,  -- confidence / P(consequent)
+    interaction_lift REAL NOT NULL,  -- P(set | consequent) / product of P(item | consequent)
+    example_finding_ids TEXT,  -- JSON array
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'accepted', 'rejected')),
+    mined_at TEXT NOT NULL DEFAULT (datetime('now')),
+    reviewed_at TEXT,
+    UNIQUE (consequent, antecedents)
+);
+
+CREATE INDEX IF NOT EXISTS idx_synergy_pending ON synergy_candidates(interaction_lift DESC) WHERE status = 'pending';
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.9', 'Synergy candidates from frequent antecedent-set mining');
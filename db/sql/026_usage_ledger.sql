@@ -0,0 +1,153 @@
+-- Article Eater v18.5 - API Usage Ledger
+-- Append-only LLM usage events (schemas/api_usage.schema.json) with
+-- trigger-maintained per-user, per-day and per-stage rollups, plus the
+-- running sums behind the per-stage token/cost predictor in app/usage.py.
+-- Read by GET /usage/me and /usage/admin without scanning raw events.
+-- Date: 2026-10-19
+
+-- ===== EVENTS =====
+
+CREATE TABLE IF NOT EXISTS api_usage_events (
+    event_id TEXT PRIMARY KEY,  -- UUID
+    user_id TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    operation TEXT,  -- Pipeline stage, e.g. 'L2_extraction'
+    job_id TEXT,
+    tokens_in INTEGER NOT NULL DEFAULT 0,
+    tokens_out INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    predicted_cost_usd REAL,  -- Predictor's estimate before the call
+    input_chars INTEGER,  -- Prompt length the prediction was based on
+    cached INTEGER NOT NULL DEFAULT 0,  -- 1 = served from LLMCache, not billed
+    ts TEXT NOT NULL  -- ISO 8601 UTC
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_events_user_ts ON api_usage_events(user_id, ts);
+
+DROP TRIGGER IF EXISTS trg_usage_events_no_update;
+CREATE TRIGGER trg_usage_events_no_update
+BEFORE UPDATE ON api_usage_events
+BEGIN
+    SELECT RAISE(ABORT, 'api_usage_events is append-only');
+END;
+
+DROP TRIGGER IF EXISTS trg_usage_events_no_delete;
+CREATE TRIGGER trg_usage_events_no_delete
+BEFORE DELETE ON api_usage_events
+BEGIN
+    SELECT RAISE(ABORT, 'api_usage_events is append-only');
+END;
+
+-- ===== ROLLUPS =====
+
+CREATE TABLE IF NOT EXISTS usage_user_totals (
+    user_id TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL DEFAULT 0,
+    cached_calls INTEGER NOT NULL DEFAULT 0,
+    tokens_in INTEGER NOT NULL DEFAULT 0,
+    tokens_out INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    first_ts TEXT,
+    last_ts TEXT
+);
+
+CREATE TABLE IF NOT EXISTS usage_user_daily (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,  -- 'YYYY-MM-DD' (UTC)
+    calls INTEGER NOT NULL DEFAULT 0,
+    cached_calls INTEGER NOT NULL DEFAULT 0,
+    tokens_in INTEGER NOT NULL DEFAULT 0,
+    tokens_out INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS usage_stage_daily (
+    operation TEXT NOT NULL,  -- '' when the event had none
+    day TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    cached_calls INTEGER NOT NULL DEFAULT 0,
+    tokens_in INTEGER NOT NULL DEFAULT 0,
+    tokens_out INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0,
+    predicted_cost_usd REAL NOT NULL DEFAULT 0,  -- Sum over events that had a prediction
+    predicted_actual_usd REAL NOT NULL DEFAULT 0,  -- Actual cost of those same events
+    PRIMARY KEY (operation, day)
+) WITHOUT ROWID;
+
+-- ===== PREDICTOR SUFFICIENT STATISTICS =====
+-- Billed calls only; x = input_chars. app/usage.py fits
+-- tokens_in = a + b*x by least squares and uses the mean tokens_out.
+
+CREATE TABLE IF NOT EXISTS usage_cost_model (
+    operation TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    sum_x REAL NOT NULL DEFAULT 0,
+    sum_xx REAL NOT NULL DEFAULT 0,
+    sum_in REAL NOT NULL DEFAULT 0,
+    sum_x_in REAL NOT NULL DEFAULT 0,
+    sum_out REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (operation, provider, model)
+) WITHOUT ROWID;
+
+DROP TRIGGER IF EXISTS trg_usage_rollup;
+CREATE TRIGGER trg_usage_rollup
+AFTER INSERT ON api_usage_events
+BEGIN
+    INSERT INTO usage_user_totals (user_id, calls, cached_calls, tokens_in, tokens_out, cost_usd, first_ts, last_ts)
+    VALUES (new.user_id, 1, new.cached, new.tokens_in, new.tokens_out, new.cost_usd, new.ts, new.ts)
+    ON CONFLICT(user_id) DO UPDATE SET
+        calls = calls + 1,
+        cached_calls = cached_calls + excluded.cached_calls,
+        tokens_in = tokens_in + excluded.tokens_in,
+        tokens_out = tokens_out + excluded.tokens_out,
+        cost_usd = cost_usd + excluded.cost_usd,
+        first_ts = MIN(first_ts, excluded.first_ts),
+        last_ts = MAX(last_ts, excluded.last_ts);
+
+    INSERT INTO usage_user_daily (user_id, day, calls, cached_calls, tokens_in, tokens_out, cost_usd)
+    VALUES (new.user_id, substr(new.ts, 1, 10), 1, new.cached, new.tokens_in, new.tokens_out, new.cost_usd)
+    ON CONFLICT(user_id, day) DO UPDATE SET
+        calls = calls + 1,
+        cached_calls = cached_calls + excluded.cached_calls,
+        tokens_in = tokens_in + excluded.tokens_in,
+        tokens_out = tokens_out + excluded.tokens_out,
+        cost_usd = cost_usd + excluded.cost_usd;
+
+    INSERT INTO usage_stage_daily (
+        operation, day, calls, cached_calls, tokens_in, tokens_out, cost_usd,
+        predicted_cost_usd, predicted_actual_usd
+    )
+    VALUES (
+        COALESCE(new.operation, ''), substr(new.ts, 1, 10), 1, new.cached, new.tokens_in, new.tokens_out,
+        new.cost_usd, COALESCE(new.predicted_cost_usd, 0),
+        CASE WHEN new.predicted_cost_usd IS NULL THEN 0 ELSE new.cost_usd END
+    )
+    ON CONFLICT(operation, day) DO UPDATE SET
+        calls = calls + 1,
+        cached_calls = cached_calls + excluded.cached_calls,
+        tokens_in = tokens_in + excluded.tokens_in,
+        tokens_out = tokens_out + excluded.tokens_out,
+        cost_usd = cost_usd + excluded.cost_usd,
+        predicted_cost_usd = predicted_cost_usd + excluded.predicted_cost_usd,
+        predicted_actual_usd = predicted_actual_usd + excluded.predicted_actual_usd;
+
+    INSERT INTO usage_cost_model (operation, provider, model, n, sum_x, sum_xx, sum_in, sum_x_in, sum_out)
+    SELECT COALESCE(new.operation, ''), new.provider, new.model, 1,
+           new.input_chars, new.input_chars * new.input_chars, new.tokens_in,
+           new.input_chars * new.tokens_in, new.tokens_out
+    WHERE new.cached = 0 AND new.input_chars IS NOT NULL
+    ON CONFLICT(operation, provider, model) DO UPDATE SET
+        n = n + 1,
+        sum_x = sum_x + excluded.sum_x,
+        sum_xx = sum_xx + excluded.sum_xx,
+        sum_in = sum_in + excluded.sum_in,
+        sum_x_in = sum_x_in + excluded.sum_x_in,
+        sum_out = sum_out + excluded.sum_out;
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.10', 'Append-only API usage ledger with rollups and cost predictor statistics');
@@ -0,0 +1,203 @@
+-- Article Eater v18.5 - L5 BN Package Export
+-- Adds the L5_export job type (app/bn_export.py) and a log of exported
+-- packages, so an incremental export only includes rules changed since the
+-- previous package for the same scope.
+-- Requires: 019_queue_fair_share.sql
+-- Date: 2026-10-19
+
+-- ===== EXPORT LOG =====
+
+CREATE TABLE IF NOT EXISTS bn_exports (
+    export_id TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,  -- 'all' or 'cluster:<id>'
+    package_id TEXT NOT NULL,
+    since TEXT,  -- Rules changed after this went in; NULL = full export
+    started_at TEXT NOT NULL,  -- datetime('now') when the export began
+    completed_at TEXT,
+    path TEXT,
+    rules INTEGER NOT NULL DEFAULT 0,
+    nodes INTEGER NOT NULL DEFAULT 0,
+    edges INTEGER NOT NULL DEFAULT 0,
+    invalid INTEGER NOT NULL DEFAULT 0,  -- Elements skipped by schema validation
+    sha256 TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_bn_exports_scope
+ON bn_exports(scope, started_at DESC)
+WHERE completed_at IS NOT NULL;
+
+-- Rules changed since a timestamp without a table scan
+CREATE INDEX IF NOT EXISTS idx_rules_updated ON rules(updated_at);
+CREATE INDEX IF NOT EXISTS idx_rule_evidence_created ON rule_evidence(created_at);
+
+-- ===== QUEUE REBUILD FOR 'L5_export' JOB TYPE =====
+-- SQLite cannot alter a CHECK constraint in place. Triggers and indexes are
+-- dropped with the old table and recreated below (016-019 definitions).
+
+PRAGMA foreign_keys = OFF;
+
+BEGIN;
+
+CREATE TABLE processing_queue_new (
+    job_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL CHECK(job_type IN ('L0_harvest','L1_cluster','L2_extract','L3_synthesize','L4_expand','L5_export')),
+    params TEXT,  -- JSON string
+    status TEXT NOT NULL CHECK(status IN ('blocked','pending','running','complete','failed','dead')),
+    priority INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (datetime('now')),
+    started_at TEXT,
+    completed_at TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,  -- Claims so far (incremented on each lease)
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    next_attempt_at TEXT,  -- Not claimable before this time (retry backoff)
+    lease_owner TEXT,  -- worker_id holding the lease
+    lease_expires_at TEXT,  -- Reaper returns the job to pending after this
+    heartbeat_at TEXT,
+    user_id TEXT NOT NULL DEFAULT 'system',
+    job_class TEXT NOT NULL DEFAULT 'batch' CHECK(job_class IN ('interactive','batch'))
+);
+
+INSERT INTO processing_queue_new
+SELECT job_id, job_type, params, status, priority, created_at, started_at, completed_at, error,
+       attempts, max_attempts, next_attempt_at, lease_owner, lease_expires_at, heartbeat_at,
+       user_id, job_class
+FROM processing_queue;
+
+DROP TABLE processing_queue;
+ALTER TABLE processing_queue_new RENAME TO processing_queue;
+
+CREATE INDEX idx_queue_status_priority
+ON processing_queue(status, job_class, user_id, priority DESC, created_at ASC, next_attempt_at, job_id)
+WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_queue_pending_age
+ON processing_queue(job_type, created_at)
+WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_queue_lease
+ON processing_queue(lease_expires_at)
+WHERE status = 'running';
+
+-- ===== TRIGGERS (from 018_job_dependencies.sql) =====
+
+CREATE TRIGGER trg_queue_counters_insert
+AFTER INSERT ON processing_queue
+BEGIN
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER trg_queue_counters_delete
+AFTER DELETE ON processing_queue
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+END;
+
+CREATE TRIGGER trg_queue_counters_status
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+BEGIN
+    UPDATE queue_counters SET n = n - 1
+    WHERE job_type = old.job_type AND status = old.status;
+    INSERT INTO queue_counters (job_type, status, n)
+    VALUES (new.job_type, new.status, 1)
+    ON CONFLICT(job_type, status) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER trg_queue_throughput
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status AND new.status IN ('complete', 'failed', 'dead')
+BEGIN
+    INSERT INTO queue_throughput (job_type, minute, completed, failed)
+    VALUES (
+        new.job_type,
+        strftime('%Y-%m-%d %H:%M', COALESCE(new.completed_at, datetime('now'))),
+        new.status = 'complete',
+        new.status <> 'complete'
+    )
+    ON CONFLICT(job_type, minute) DO UPDATE SET
+        completed = completed + excluded.completed,
+        failed = failed + excluded.failed;
+END;
+
+CREATE TRIGGER trg_queue_runtime
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+    AND new.status = 'complete'
+    AND new.started_at IS NOT NULL
+    AND new.completed_at IS NOT NULL
+BEGIN
+    INSERT INTO queue_runtime_hist (job_type, hour, bucket, n)
+    SELECT
+        new.job_type,
+        strftime('%Y-%m-%d %H:00', new.completed_at),
+        CASE
+            WHEN ms <= 250 THEN 0
+            WHEN ms <= 500 THEN 1
+            WHEN ms <= 1000 THEN 2
+            WHEN ms <= 2500 THEN 3
+            WHEN ms <= 5000 THEN 4
+            WHEN ms <= 10000 THEN 5
+            WHEN ms <= 30000 THEN 6
+            WHEN ms <= 60000 THEN 7
+            WHEN ms <= 120000 THEN 8
+            WHEN ms <= 300000 THEN 9
+            WHEN ms <= 600000 THEN 10
+            WHEN ms <= 1800000 THEN 11
+            ELSE 12
+        END,
+        1
+    FROM (
+        SELECT (julianday(new.completed_at) - julianday(new.started_at)) * 86400000.0 AS ms
+    )
+    WHERE true
+    ON CONFLICT(job_type, hour, bucket) DO UPDATE SET n = n + 1;
+END;
+
+-- ===== TRIGGERS (from 019_queue_fair_share.sql) =====
+
+CREATE TRIGGER trg_queue_users_insert
+AFTER INSERT ON processing_queue
+BEGIN
+    INSERT OR IGNORE INTO queue_users (user_id) VALUES (new.user_id);
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive + (new.status = 'pending' AND new.job_class = 'interactive'),
+        pending_batch = pending_batch + (new.status = 'pending' AND new.job_class = 'batch'),
+        running = running + (new.status = 'running')
+    WHERE user_id = new.user_id;
+END;
+
+CREATE TRIGGER trg_queue_users_delete
+AFTER DELETE ON processing_queue
+BEGIN
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive - (old.status = 'pending' AND old.job_class = 'interactive'),
+        pending_batch = pending_batch - (old.status = 'pending' AND old.job_class = 'batch'),
+        running = running - (old.status = 'running')
+    WHERE user_id = old.user_id;
+END;
+
+CREATE TRIGGER trg_queue_users_status
+AFTER UPDATE OF status ON processing_queue
+WHEN old.status IS NOT new.status
+BEGIN
+    UPDATE queue_users SET
+        pending_interactive = pending_interactive
+            - (old.status = 'pending' AND old.job_class = 'interactive')
+            + (new.status = 'pending' AND new.job_class = 'interactive'),
+        pending_batch = pending_batch
+            - (old.status = 'pending' AND old.job_class = 'batch')
+            + (new.status = 'pending' AND new.job_class = 'batch'),
+        running = running - (old.status = 'running') + (new.status = 'running')
+    WHERE user_id = new.user_id;
+END;
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.11', 'L5_export job type and BN package export log');
+
+COMMIT;
+
+PRAGMA foreign_keys = ON;
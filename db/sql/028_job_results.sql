@@ -0,0 +1,14 @@
+-- Article Eater v18.5 - Job Results
+-- SimpleWorker._store_job_results now writes each job's output (L2 panels,
+-- QC, validation errors, token counts; L0/L1/L3-L5 summaries) to the
+-- job_results table from 015_complete_schema.sql instead of only logging it.
+-- One row per job: a retried job replaces its earlier row.
+-- Requires: 015_complete_schema.sql
+-- Date: 2026-10-19
+
+DROP INDEX IF EXISTS idx_job_results_job;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_job_results_job ON job_results(job_id);
+CREATE INDEX IF NOT EXISTS idx_job_results_type ON job_results(job_type, created_at DESC);
+
+INSERT OR REPLACE INTO schema_version (version, description) VALUES
+    ('18.5.12', 'One job_results row per job, written by the worker');
@@ -1,20 +1,38 @@
 from __future__ import annotations
 
 import argparse
+import csv
 import datetime as _dt
+import hashlib
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from .utils import ensure_directory
+from .utils import ensure_directory, load_json_with_comments
 
 PLACEHOLDER_PATTERN = re.compile(r"\{\{([A-Z0-9_]+)\}\}")
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+
+# A compiled template alternates literal text and placeholder names:
+# [(False, "Project: "), (True, "PROJECT_NAME"), (False, "\n"), ...]
+Segments = List[Tuple[bool, str]]
+
+# Manifest columns that map onto the single-project CLI options
+MANIFEST_FIELDS = {
+    "project_name": None,
+    "project_code": None,
+    "project_owner": None,
+    "primary_ai": None,
+    "primary_domain": None,
+    "enable_drift_shield": False,
+}
 
 
 def build_placeholder_map(args: argparse.Namespace) -> Dict[str, str]:
     now = _dt.datetime.now(_dt.timezone.utc)
-    install_date = now.date().isoformat()
+    install_date = getattr(args, "install_date", None) or now.date().isoformat()
     return {
         "PROJECT_NAME": args.project_name,
         "PROJECT_CODE": args.project_code,
@@ -27,57 +45,203 @@ def build_placeholder_map(args: argparse.Namespace) -> Dict[str, str]:
     }
 
 
-def render_template(text: str, mapping: Dict[str, str]) -> str:
-    unknown = set()
+def compile_template(text: str) -> Segments:
+    segments: Segments = []
+    pos = 0
+    for m in PLACEHOLDER_PATTERN.finditer(text):
+        if m.start() > pos:
+            segments.append((False, text[pos:m.start()]))
+        segments.append((True, m.group(1)))
+        pos = m.end()
+    if pos < len(text):
+        segments.append((False, text[pos:]))
+    return segments
+
+
+def render_compiled(segments: Segments, mapping: Dict[str, str], unknown: Set[str]) -> str:
+    parts = []
+    for is_placeholder, value in segments:
+        if not is_placeholder:
+            parts.append(value)
+        elif value in mapping:
+            parts.append(mapping[value])
+        else:
+            unknown.add(value)
+            parts.append(f"{{{{{value}}}}}")
+    return "".join(parts)
 
-    def _rep(m):
-        key = m.group(1)
-        if key in mapping:
-            return mapping[key]
-        unknown.add(key)
-        return m.group(0)
 
-    rendered = PLACEHOLDER_PATTERN.sub(_rep, text)
+def render_template(text: str, mapping: Dict[str, str]) -> str:
+    unknown: Set[str] = set()
+    rendered = render_compiled(compile_template(text), mapping, unknown)
     if unknown:
         for key in sorted(unknown):
             print(f"[governance-kit] Warning: no value for {{{{{key}}}}}", file=sys.stderr)
     return rendered
 
 
-def render_templates_into(target_project: Path, mapping: Dict[str, str], force: bool = False) -> None:
-    pkg_root = Path(__file__).resolve().parent
-    tpl_dir = pkg_root / "templates"
+def load_templates(tpl_dir: Path = TEMPLATES_DIR) -> Dict[str, Segments]:
+    """Compile every *.tpl once; keys are the output file names."""
     if not tpl_dir.is_dir():
         raise SystemExit(f"Templates directory not found: {tpl_dir}")
+    return {
+        tpl_path.name[:-4]: compile_template(tpl_path.read_text(encoding="utf-8"))
+        for tpl_path in sorted(tpl_dir.glob("*.tpl"))
+    }
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_templates(
+    target_project: Path,
+    mapping: Dict[str, str],
+    templates: Dict[str, Segments],
+    force: bool = False,
+) -> Dict[str, object]:
+    """Render compiled templates into <target>/.governance and report what happened.
+
+    Existing files are skipped unless force; with force, a file is only rewritten
+    when the rendered content's hash differs from what is on disk.
+    """
     gov_dir = target_project / ".governance"
     ensure_directory(gov_dir)
-    for tpl_path in sorted(tpl_dir.glob("*.tpl")):
-        dest_name = tpl_path.name[:-4]
+    report: Dict[str, object] = {"target": str(target_project), "written": [], "unchanged": [], "skipped": []}
+    unknown: Set[str] = set()
+    for dest_name, segments in templates.items():
         dest_path = gov_dir / dest_name
-        if dest_path.exists() and not force:
-            print(f"[governance-kit] Skipping existing file: {dest_path}")
+        exists = dest_path.exists()
+        if exists and not force:
+            report["skipped"].append(dest_name)
+            continue
+        data = render_compiled(segments, mapping, unknown).encode("utf-8")
+        if exists and _sha256(dest_path.read_bytes()) == _sha256(data):
+            report["unchanged"].append(dest_name)
             continue
-        text = tpl_path.read_text(encoding="utf-8")
-        rendered = render_template(text, mapping)
-        dest_path.write_text(rendered, encoding="utf-8")
-        print(f"[governance-kit] Wrote {dest_path}")
+        dest_path.write_bytes(data)
+        report["written"].append(dest_name)
+    report["unknown"] = sorted(unknown)
+    return report
+
+
+def render_templates_into(target_project: Path, mapping: Dict[str, str], force: bool = False) -> None:
+    report = write_templates(target_project, mapping, load_templates(), force=force)
+    gov_dir = target_project / ".governance"
+    for name in report["skipped"]:
+        print(f"[governance-kit] Skipping existing file: {gov_dir / name}")
+    for name in report["unchanged"]:
+        print(f"[governance-kit] Unchanged: {gov_dir / name}")
+    for name in report["written"]:
+        print(f"[governance-kit] Wrote {gov_dir / name}")
+    for key in report["unknown"]:
+        print(f"[governance-kit] Warning: no value for {{{{{key}}}}}", file=sys.stderr)
+
+
+def _truthy(value: object) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def load_manifest(path: Path) -> List[Dict[str, str]]:
+    """Targets from a CSV (header row) or JSON (list of objects, # comments allowed) manifest."""
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            rows = [dict(row) for row in csv.DictReader(f)]
+    else:
+        rows = load_json_with_comments(path)
+        if not isinstance(rows, list):
+            raise SystemExit(f"Manifest {path} must be a list of objects.")
+    required = ["target"] + [k for k, default in MANIFEST_FIELDS.items() if default is None]
+    for i, row in enumerate(rows, 1):
+        missing = [k for k in required if not row.get(k)]
+        if missing:
+            raise SystemExit(f"Manifest {path} entry {i}: missing {', '.join(missing)}")
+    return rows
+
+
+def mapping_for(row: Dict[str, str]) -> Dict[str, str]:
+    """Placeholder values for one manifest row; extra UPPER_CASE columns become placeholders too."""
+    fields = {k: row.get(k, default) for k, default in MANIFEST_FIELDS.items()}
+    fields["enable_drift_shield"] = _truthy(fields["enable_drift_shield"])
+    fields["install_date"] = row.get("install_date")
+    mapping = build_placeholder_map(argparse.Namespace(**fields))
+    mapping.update({k: str(v) for k, v in row.items() if re.fullmatch(r"[A-Z0-9_]+", k)})
+    return mapping
+
+
+def render_batch(
+    rows: Iterable[Dict[str, str]],
+    base_dir: Path,
+    force: bool = False,
+    workers: int = 8,
+    templates: Optional[Dict[str, Segments]] = None,
+) -> Dict[str, object]:
+    """Render every manifest target in parallel from templates compiled once.
+
+    Returns per-target reports plus unknown placeholders aggregated as
+    {placeholder: [targets]}. Missing target directories are reported as errors.
+    """
+    templates = templates if templates is not None else load_templates()
+
+    def one(row: Dict[str, str]) -> Dict[str, object]:
+        target = (base_dir / Path(row["target"]).expanduser()).resolve()
+        if not target.is_dir():
+            return {"target": str(target), "error": "target directory does not exist"}
+        return write_templates(target, mapping_for(row), templates, force=force)
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        reports = list(pool.map(one, rows))
+
+    unknown: Dict[str, List[str]] = {}
+    for report in reports:
+        for key in report.get("unknown", []):
+            unknown.setdefault(key, []).append(report["target"])
+    return {"targets": reports, "unknown": unknown}
 
 
 def parse_args(argv=None):
     p = argparse.ArgumentParser(description="Render governance-kit-v3 templates into a project.")
-    p.add_argument("--target", required=True, help="Target project directory.")
-    p.add_argument("--project-name", required=True, help="Human-readable project name.")
-    p.add_argument("--project-code", required=True, help="Short project code or slug.")
-    p.add_argument("--project-owner", required=True, help="Project owner.")
-    p.add_argument("--primary-ai", required=True, help="Primary AI system used during development.")
-    p.add_argument("--primary-domain", required=True, help="Primary domain of the project.")
+    p.add_argument("--target", help="Target project directory.")
+    p.add_argument("--manifest", help="CSV or JSON manifest of targets to render in one batch.")
+    p.add_argument("--project-name", help="Human-readable project name.")
+    p.add_argument("--project-code", help="Short project code or slug.")
+    p.add_argument("--project-owner", help="Project owner.")
+    p.add_argument("--primary-ai", help="Primary AI system used during development.")
+    p.add_argument("--primary-domain", help="Primary domain of the project.")
     p.add_argument("--enable-drift-shield", action="store_true", help="Enable drift shield extras.")
-    p.add_argument("--force", action="store_true", help="Overwrite existing governance files.")
-    return p.parse_args(argv)
+    p.add_argument("--force", action="store_true", help="Overwrite existing governance files (unchanged ones are left alone).")
+    p.add_argument("--workers", type=int, default=8, help="Targets rendered in parallel with --manifest.")
+    args = p.parse_args(argv)
+    if args.manifest and args.target:
+        p.error("--target and --manifest are mutually exclusive")
+    if not args.manifest:
+        missing = [f"--{k.replace('_', '-')}" for k in ("target", *MANIFEST_FIELDS) if k != "enable_drift_shield"
+                   and not getattr(args, k)]
+        if missing:
+            p.error(f"the following arguments are required: {', '.join(missing)}")
+    return args
 
 
 def main(argv=None):
     args = parse_args(argv)
+    if args.manifest:
+        manifest = Path(args.manifest).expanduser().resolve()
+        result = render_batch(load_manifest(manifest), manifest.parent, force=args.force, workers=args.workers)
+        failed = 0
+        for report in result["targets"]:
+            if "error" in report:
+                failed += 1
+                print(f"[governance-kit] {report['target']}: {report['error']}", file=sys.stderr)
+                continue
+            print(
+                f"[governance-kit] {report['target']}: {len(report['written'])} written, "
+                f"{len(report['unchanged'])} unchanged, {len(report['skipped'])} skipped"
+            )
+        for key, targets in sorted(result["unknown"].items()):
+            print(f"[governance-kit] Warning: no value for {{{{{key}}}}} in {len(targets)} target(s)", file=sys.stderr)
+        if failed:
+            raise SystemExit(1)
+        return
     target = Path(args.target).expanduser().resolve()
     if not target.exists():
         raise SystemExit(f"Target directory does not exist: {target}")
@@ -1,30 +1,136 @@
 #!/usr/bin/env python3
-import sys, os, subprocess, pathlib, yaml
+"""Governance checks from one process.
+
+The tree listing, release.keep.yml, the ledger and the git name-status diff are
+loaded once into a Snapshot and shared; the selected checks then run in a thread
+pool. Default checks keep this script's original behaviour (required files,
+kept-file deletions; exit 2 / 3). --all adds the public surface ledger, the
+orphan sweep (fails on new orphans) and the MANIFEST.sha256 verify; --json prints
+per-check results and timings.
+"""
+import argparse
+import json
+import os
+import pathlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT/"scripts"))
+import manifest_sha256  # noqa: E402
+import orphan_sweep  # noqa: E402
+import public_surface_ledger  # noqa: E402
+
 REQUIRED = [
     "Project_Constitution.md","release.keep.yml","deprecations.yml",
     ".github/workflows/governance.yml",".github/pull_request_template.md","CODEOWNERS",
     "scripts/check_governance.py","scripts/orphan_sweep.py","scripts/public_surface_ledger.py",
     "scripts/manifest_sha256.py","reconstructor_min.py","deconcat.py","RUTHLESS_v5.1.md","public_surface_ledger.json",
 ]
-def git_deleted_files():
+DEFAULT_CHECKS = ["required", "kept"]
+class Snapshot:
+    """Everything the checks read, loaded once"""
+    def __init__(self, root=ROOT):
+        self.root = root
+        self.files = set()
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in orphan_sweep.SKIP_DIRS]
+            rel = pathlib.Path(dirpath).relative_to(root)
+            self.files.update((rel/f).as_posix() for f in filenames)
+        self.keep, self.keep_error = {}, None
+        keep_file = root/"release.keep.yml"
+        try:
+            self.keep = (yaml.safe_load(keep_file.read_text()) or {}) if keep_file.exists() else {}
+        except yaml.YAMLError as e:
+            mark = getattr(e, "problem_mark", None)
+            where = f" (line {mark.line + 1})" if mark else ""
+            self.keep_error = f"release.keep.yml: {getattr(e, 'problem', e)}{where}"
+        self.kept = set(self.keep.get("kept") or [])
+        self.diff = orphan_sweep.git_name_status(root)
+    def changed(self, status):
+        return {p for p, s in self.diff.items() if s == status}
+def check_required(snap):
+    missing = [p for p in REQUIRED if p not in snap.files]
+    return {"ok": not missing, "code": 2, "missing": missing}
+def check_kept(snap):
+    if snap.keep_error:
+        return {"ok": False, "code": 3, "error": snap.keep_error}
+    violations = sorted(snap.kept & snap.changed("D"))
+    return {"ok": not violations, "code": 3, "violations": violations}
+def check_ledger(snap):
+    if "public_surface_ledger.json" not in snap.files:
+        return {"ok": False, "code": 2, "problems": ["public_surface_ledger.json missing"]}
+    committed = json.loads((snap.root/"public_surface_ledger.json").read_text())
+    found = public_surface_ledger.problems(committed)
+    if found:
+        return {"ok": False, "code": 3, "problems": found}
+    fresh = public_surface_ledger.build(committed, root=snap.root)
+    drift = public_surface_ledger.diff(committed, fresh)
+    return {"ok": not drift, "code": 4, "problems": [], "drift": drift}
+def check_orphans(snap):
+    py = sorted(f for f in snap.files if f.endswith(".py"))
+    cache = snap.root/orphan_sweep.CACHE
+    report = orphan_sweep.sweep(snap.root, orphan_sweep.ENTRY_POINTS, cache, files=py)
+    orphans = [o for o in report["orphans"] if o not in snap.kept]
+    new = sorted(set(orphans) & snap.changed("A"))
+    return {"ok": not new, "code": 1, "orphans": orphans, "new_orphans": new,
+            "parsed": report["stats"]["parsed"]}
+def check_manifest(snap):
+    entries = manifest_sha256.load_manifest(snap.root/manifest_sha256.MANIFEST)
+    if not entries:
+        return {"ok": False, "code": 2, "mismatch": "no manifest entries"}
+    bad = manifest_sha256.verify(snap.root, entries)
+    return {"ok": bad is None, "code": 1, "files": len(entries),
+            "mismatch": bad and f"{bad[0]} ({bad[1]})"}
+CHECKS = {"required": check_required, "kept": check_kept, "ledger": check_ledger,
+          "orphans": check_orphans, "manifest": check_manifest}
+def _timed(fn, snap):
+    t0 = time.perf_counter()
     try:
-        base = os.environ.get("GITHUB_BASE_REF")
-        diff_range = f"origin/{base}...HEAD" if base else "HEAD~1..HEAD"
-        out = subprocess.check_output(["git","diff","--name-status",diff_range], text=True)
-        return {line.split("\t",1)[1].strip() for line in out.splitlines() if line.startswith("D\t")}
-    except Exception:
-        return set()
-def main():
-    missing = [p for p in REQUIRED if not (ROOT/p).exists()]
-    if missing:
-        print("Missing governance files:", missing, file=sys.stderr); sys.exit(2)
-    keep = yaml.safe_load(open(ROOT/"release.keep.yml")) or {}
-    kept = set(keep.get("kept") or [])
-    deleted = git_deleted_files()
-    violations = list(kept.intersection(deleted))
-    if violations:
-        print("Deletion violations for kept files:", violations, file=sys.stderr); sys.exit(3)
-    print("Governance check passed."); sys.exit(0)
+        result = fn(snap)
+    except Exception as e:
+        result = {"ok": False, "code": 1, "error": f"{type(e).__name__}: {e}"}
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+def run(names, root=ROOT):
+    """Run the named checks in parallel over one Snapshot; returns the JSON report"""
+    t0 = time.perf_counter()
+    snap = Snapshot(root)
+    load_ms = round((time.perf_counter() - t0) * 1000, 1)
+    with ThreadPoolExecutor(len(names)) as pool:
+        results = dict(zip(names, pool.map(lambda n: _timed(CHECKS[n], snap), names)))
+    return {"ok": all(r["ok"] for r in results.values()), "snapshot_ms": load_ms,
+            "ms": round((time.perf_counter() - t0) * 1000, 1), "checks": results}
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run governance checks in one process")
+    ap.add_argument("--all", action="store_true", help="Run every check: " + ", ".join(CHECKS))
+    ap.add_argument("--check", action="append", choices=list(CHECKS),
+                    help="Run only these checks (repeatable)")
+    ap.add_argument("--json", action="store_true",
+                    help="Print results and per-check timings as JSON")
+    args = ap.parse_args(argv)
+    names = list(CHECKS) if args.all else (args.check or DEFAULT_CHECKS)
+    report = run(names)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    for name, r in report["checks"].items():
+        if r["ok"]:
+            continue
+        if name == "required":
+            print("Missing governance files:", r["missing"], file=sys.stderr)
+        elif name == "kept" and "violations" in r:
+            print("Deletion violations for kept files:", r["violations"], file=sys.stderr)
+        else:
+            details = {k: v for k, v in r.items() if k not in ("ok", "code", "ms")}
+            print(f"Governance check '{name}' failed:", details, file=sys.stderr)
+    failed = [r["code"] for r in report["checks"].values() if not r["ok"]]
+    if failed:
+        sys.exit(failed[0])
+    if not args.json:
+        print(f"Governance check passed ({', '.join(names)}; {report['ms']} ms).")
+    sys.exit(0)
 if __name__=="__main__":
     main()
\ No newline at end of file
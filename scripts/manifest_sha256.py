@@ -1,18 +1,184 @@
 #!/usr/bin/env python3
-import os, hashlib, pathlib, json
+"""Write or verify MANIFEST.sha256.
+
+The manifest lists path, size and sha256 only. Incremental by default: a file
+whose (size, mtime_ns, inode) matches its entry in the local, gitignored
+.manifest_cache.json keeps that hash; everything else is hashed in a thread pool
+(1 MiB reads, mmap for large files; hashlib releases the GIL while digesting).
+Inside a git work tree only tracked files are listed. Paths matching
+DEFAULT_IGNORE, .manifestignore (one glob per line) or --ignore are skipped; a
+pattern ending in "/" prunes that directory.
+--verify re-hashes every listed file and stops at the first mismatch (exit 1).
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
+MANIFEST = "MANIFEST.sha256"
+CACHE = ".manifest_cache.json"
+CACHE_VERSION = 1
+DEFAULT_IGNORE = [".git/", "__pycache__/", ".pytest_cache/", "*.pyc", ".DS_Store", MANIFEST, CACHE,
+                  "*.db", "*.db-journal", "*.db-wal", "*.db-shm", "exports/", "s2_cache/"]
+CHUNK = 1 << 20
+MMAP_MIN = 8 << 20
+def _default_workers():
+    return min(32, (os.cpu_count() or 1) * 2)
 def sha256(path):
-    h=hashlib.sha256()
-    with open(path,"rb") as f:
-        for c in iter(lambda:f.read(65536), b""): h.update(c)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_MIN:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        else:
+            for chunk in iter(lambda: f.read(CHUNK), b""):
+                h.update(chunk)
     return h.hexdigest()
-def main():
-    files=[]; total=0
-    for p in ROOT.rglob("*"):
-        if p.is_file() and p.name!="MANIFEST.sha256":
-            size=p.stat().st_size; total+=size
-            files.append({"path":str(p.relative_to(ROOT)),"size":size,"sha256":sha256(p)})
-    (ROOT/"MANIFEST.sha256").write_text(json.dumps({"total_bytes":total,"file_count":len(files),"files":files}, indent=2))
-    print("Wrote MANIFEST.sha256")
+def load_ignore(root, extra=()):
+    patterns = list(DEFAULT_IGNORE) + list(extra)
+    f = root/".manifestignore"
+    if f.exists():
+        lines = (line.strip() for line in f.read_text().splitlines())
+        patterns += [line for line in lines if line and not line.startswith("#")]
+    dirs = [p.rstrip("/") for p in patterns if p.endswith("/")]
+    files = [p for p in patterns if not p.endswith("/")]
+    return dirs, files
+def _ignored(rel, name, patterns):
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in patterns)
+def walk(root, ignore):
+    """Yield (relative posix path, os.stat_result) for every non-ignored file"""
+    dirs, files = ignore
+    stack = [(root, "")]
+    while stack:
+        path, prefix = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for e in entries:
+            rel = prefix + e.name
+            if e.is_dir(follow_symlinks=False):
+                if not _ignored(rel, e.name, dirs):
+                    stack.append((e.path, rel + "/"))
+            elif e.is_file(follow_symlinks=False) and not _ignored(rel, e.name, files):
+                yield rel, e.stat(follow_symlinks=False)
+def tracked(root):
+    """Paths git tracks under root, or None outside a work tree"""
+    try:
+        out = subprocess.check_output(["git", "ls-files", "-z"], cwd=root,
+                                      stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return set(out.decode("utf-8", "surrogateescape").split("\0")) - {""}
+def load_cache(path):
+    """{path: {size, mtime_ns, inode, sha256}} from the sidecar cache; {} if absent or stale"""
+    try:
+        data = json.loads(pathlib.Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("files", {})
+def write_cache(path, cache):
+    data = {"version": CACHE_VERSION, "files": cache}
+    pathlib.Path(path).write_text(json.dumps(data, separators=(",", ":")))
+def load_manifest(path):
+    """Entries keyed by path; accepts this script's format and the older flat {path: sha256} map"""
+    try:
+        data = json.loads(pathlib.Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+    if isinstance(data, dict) and isinstance(data.get("files"), list):
+        return {f["path"]: f for f in data["files"] if "path" in f and "sha256" in f}
+    if isinstance(data, dict):
+        return {p: {"path": p, "sha256": h} for p, h in data.items() if isinstance(h, str)}
+    return {}
+def build(root, cache=None, ignore=None, workers=None, only=None):
+    """Return (manifest dict, stats).
+
+    cache ({path: {size, mtime_ns, inode, sha256}}) supplies hashes for files whose
+    stat is unchanged and is updated in place; only restricts the listing to a set
+    of paths (e.g. tracked()).
+    """
+    cache = {} if cache is None else cache
+    seen, todo, reused = {}, [], 0
+    for rel, st in walk(root, ignore or load_ignore(root)):
+        if only is not None and rel not in only:
+            continue
+        stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+        old = cache.get(rel)
+        if old and all(old.get(k) == v for k, v in stamp.items()):
+            reused += 1
+        else:
+            cache[rel] = stamp
+            todo.append(rel)
+        seen[rel] = cache[rel]
+    with ThreadPoolExecutor(workers or _default_workers()) as pool:
+        for rel, digest in zip(todo, pool.map(lambda r: sha256(root/r), todo)):
+            cache[rel]["sha256"] = digest
+    for rel in set(cache) - set(seen):
+        del cache[rel]
+    files = [{"path": rel, "size": seen[rel]["size"], "sha256": seen[rel]["sha256"]}
+             for rel in sorted(seen)]
+    manifest = {"total_bytes": sum(f["size"] for f in files), "file_count": len(files),
+                "files": files}
+    return manifest, {"files": len(files), "hashed": len(todo), "reused": reused}
+def dumps(manifest):
+    """Compact JSON with one file entry per line (diffable, no indentation overhead)"""
+    head = (f'{{"total_bytes":{manifest["total_bytes"]},'
+            f'"file_count":{manifest["file_count"]},"files":[')
+    body = ",\n".join(json.dumps(f, separators=(",", ":")) for f in manifest["files"])
+    return f"{head}\n{body}\n]}}\n"
+def verify(root, entries, workers=None):
+    """Re-hash listed files in order; return the first mismatch as (path, reason) or None.
+    The manifest's own entry (present in older manifests) is skipped."""
+    items = sorted((f for f in entries.values() if f["path"] != MANIFEST), key=lambda f: f["path"])
+    def check(f):
+        p = root/f["path"]
+        if not p.is_file():
+            return "missing"
+        if "size" in f and p.stat().st_size != f["size"]:
+            return "size changed"
+        return None if sha256(p) == f["sha256"] else "sha256 mismatch"
+    with ThreadPoolExecutor(workers or _default_workers()) as pool:
+        results = pool.map(check, items)
+        for f, reason in zip(items, results):
+            if reason:
+                pool.shutdown(wait=False, cancel_futures=True)
+                return f["path"], reason
+    return None
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write or verify MANIFEST.sha256")
+    ap.add_argument("--write", default=str(ROOT/MANIFEST), help="Manifest path")
+    ap.add_argument("--verify", action="store_true",
+                    help="Re-hash listed files; exit 1 at the first mismatch")
+    ap.add_argument("--full", action="store_true", help=f"Ignore {CACHE} and hash everything")
+    ap.add_argument("--ignore", action="append", default=[], metavar="GLOB",
+                    help="Extra ignore pattern (repeatable)")
+    ap.add_argument("--workers", type=int, help="Hashing threads")
+    args = ap.parse_args(argv)
+    if args.verify:
+        entries = load_manifest(args.write)
+        if not entries:
+            print(f"No manifest entries in {args.write}", file=sys.stderr)
+            sys.exit(2)
+        bad = verify(ROOT, entries, args.workers)
+        if bad:
+            print(f"Manifest mismatch: {bad[0]} ({bad[1]})", file=sys.stderr)
+            sys.exit(1)
+        print(f"Manifest OK: {len(entries)} files")
+        sys.exit(0)
+    cache = {} if args.full else load_cache(ROOT/CACHE)
+    ignore = load_ignore(ROOT, args.ignore)
+    manifest, stats = build(ROOT, cache, ignore, args.workers, tracked(ROOT))
+    pathlib.Path(args.write).write_text(dumps(manifest))
+    write_cache(ROOT/CACHE, cache)
+    print(f"Wrote {pathlib.Path(args.write).name}: {stats['files']} files "
+          f"({stats['hashed']} hashed, {stats['reused']} reused)")
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,33 @@
 #!/usr/bin/env python3
-import os, sys, yaml, pathlib, re
+"""Report .py files that no entry point can reach through imports.
+
+Imports are read with ast (relative imports, `from pkg import module`, nested
+packages, literal importlib.import_module calls) and resolved to files in the
+tree; importing a.b.c also runs a/__init__.py and a/b/__init__.py. Per-file
+parse results are cached in .orphan_sweep_cache.json keyed by (mtime_ns, size),
+falling back to the content sha256, so unchanged trees are not re-parsed.
+Roots are ENTRY_POINTS (or --entry), plus any module with an
+`if __name__ == "__main__"` block. tests/ is never reported.
+"""
+import argparse
+import ast
+import fnmatch
+import hashlib
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import yaml
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
+CACHE = ".orphan_sweep_cache.json"
+CACHE_VERSION = 1
+ENTRY_POINTS = ["app.main:app", "app/worker.py", "scripts/*"]
+SKIP_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules", ".pytest_cache", "quarantine"}
+NEVER_ORPHAN = ("tests/",)
 def load_kept(path):
     try:
         with open(path, "r") as f:
@@ -8,27 +35,192 @@ def load_kept(path):
         return set(y.get("kept", []))
     except Exception:
         return set()
-def main():
-    allow = set()
-    if "--allow-list" in sys.argv:
-        allow |= load_kept(sys.argv[sys.argv.index("--allow-list")+1])
-    py_files = [str(p.relative_to(ROOT)) for p in ROOT.rglob("*.py")]
-    imports = set()
-    for pf in py_files:
+def py_files(root):
+    out = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        rel = pathlib.Path(dirpath).relative_to(root)
+        out += [(rel/f).as_posix() for f in sorted(filenames) if f.endswith(".py")]
+    return sorted(out)
+def module_name(rel):
+    parts = rel[:-3].split("/")
+    return ".".join(parts[:-1] if parts[-1] == "__init__" else parts)
+def _is_main_guard(node):
+    """`if __name__ == "__main__":`"""
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
+    test = node.test
+    if not isinstance(test.left, ast.Name) or test.left.id != "__name__":
+        return False
+    return any(isinstance(c, ast.Constant) and c.value == "__main__" for c in test.comparators)
+def _import_call_target(node):
+    """The literal module name of importlib.import_module("x") / __import__("x"), else None"""
+    if not isinstance(node, ast.Call) or not node.args:
+        return None
+    arg = node.args[0]
+    if not isinstance(arg, ast.Constant) or not isinstance(arg.value, str):
+        return None
+    func = node.func
+    if isinstance(func, ast.Attribute) and func.attr == "import_module":
+        return arg.value
+    if isinstance(func, ast.Name) and func.id in ("__import__", "import_module"):
+        return arg.value
+    return None
+def parse_imports(source, rel):
+    """Absolute dotted names a file may import, and whether it has a __main__ block"""
+    tree = ast.parse(source, filename=rel)
+    package = module_name(rel)
+    if not rel.endswith("__init__.py"):
+        package = package.rpartition(".")[0]
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package.split(".") if package else []
+                base = base[:len(base) - node.level + 1] if node.level > 1 else base
+                prefix = ".".join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ""
+            if prefix:
+                names.add(prefix)
+            members = [a.name for a in node.names if a.name != "*"]
+            names.update(f"{prefix}.{name}" if prefix else name for name in members)
+        elif _import_call_target(node):
+            names.add(_import_call_target(node))
+    has_main = any(_is_main_guard(n) for n in tree.body)
+    return sorted(names), has_main
+def scan(root, files, cache):
+    """Parse results per file, reusing cache entries; returns (entries, stats)"""
+    entries, stats = {}, {"files": len(files), "parsed": 0, "rehashed": 0, "errors": []}
+    for rel in files:
+        st = (root/rel).stat()
+        old = cache.get(rel)
+        if old and old["mtime_ns"] == st.st_mtime_ns and old["size"] == st.st_size:
+            entries[rel] = old
+            continue
+        data = (root/rel).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        stats["rehashed"] += 1
+        if old and old["sha256"] == digest:
+            entries[rel] = {**old, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+            continue
+        error = None
         try:
-            for line in open(ROOT/pf, "r", errors="ignore"):
-                m = re.match(r'^\s*(?:from\s+([\w\.]+)|import\s+([\w\.]+))', line)
-                if m:
-                    imports.add((m.group(1) or m.group(2)).split('.')[0])
-        except: pass
-    orphans = []
-    for pf in py_files:
-        base = pathlib.Path(pf).stem
-        if base not in imports and pf not in allow and not pf.startswith("scripts/"):
-            orphans.append(pf)
-    if orphans:
-        print("Potential orphan .py files (allow via release.keep.yml):")
-        for o in orphans: print(" -", o)
+            imports, has_main = parse_imports(data, rel)
+        except (SyntaxError, ValueError) as e:
+            imports, has_main, error = [], False, f"{type(e).__name__}: {e}"
+        stats["parsed"] += 1
+        entries[rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest,
+                        "imports": imports, "main": has_main, "error": error}
+    stats["errors"] = [f"{rel}: {e['error']}" for rel, e in entries.items() if e.get("error")]
+    return entries, stats
+def resolve(name, rel, modules):
+    """Files executed by `import name` from rel: the module and its parent packages"""
+    candidates = [name]
+    directory = module_name(rel).rpartition(".")[0]
+    if directory and directory not in modules:   # plain script dir: it is sys.path[0] when run
+        candidates.append(f"{directory}.{name}")
+    for cand in candidates:
+        if cand in modules:
+            parts = cand.split(".")
+            packages = (".".join(parts[:i]) for i in range(1, len(parts) + 1))
+            return [modules[p] for p in packages if p in modules]
+    return []
+def entry_files(specs, files, modules):
+    roots = set()
+    for spec in specs:
+        target = spec.split(":", 1)[0]
+        if target in modules:
+            roots.add(modules[target])
+        else:
+            patterns = (target, target.rstrip("/") + "/*.py")
+            roots.update(f for f in files if any(fnmatch.fnmatch(f, p) for p in patterns))
+    return roots
+def sweep(root, entry_points=ENTRY_POINTS, cache_path=None, files=None):
+    """Return {orphans, reachable, roots, stats}.
+
+    cache_path=None disables the cache; files (relative paths) skips the walk.
+    """
+    t0 = time.perf_counter()
+    cache = {}
+    if cache_path and pathlib.Path(cache_path).exists():
+        try:
+            loaded = json.loads(pathlib.Path(cache_path).read_text())
+            cache = loaded.get("files", {}) if loaded.get("version") == CACHE_VERSION else {}
+        except ValueError:
+            pass
+    files = py_files(root) if files is None else files
+    entries, stats = scan(root, files, cache)
+    if cache_path and (stats["rehashed"] or set(cache) != set(entries)):
+        data = {"version": CACHE_VERSION, "files": entries}
+        pathlib.Path(cache_path).write_text(json.dumps(data, separators=(",", ":")))
+    modules = {module_name(f): f for f in files}
+    roots = entry_files(entry_points, files, modules) | {f for f, e in entries.items() if e["main"]}
+    reachable, stack = set(), list(roots)
+    while stack:
+        f = stack.pop()
+        if f in reachable:
+            continue
+        reachable.add(f)
+        for name in entries[f]["imports"]:
+            stack += [g for g in resolve(name, f, modules) if g not in reachable]
+    orphans = [f for f in files if f not in reachable and not f.startswith(NEVER_ORPHAN)]
+    stats["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return {"orphans": orphans, "reachable": len(reachable), "roots": sorted(roots), "stats": stats}
+def git_name_status(root=ROOT):
+    """{path: status letter} for what is being checked; {} outside git.
+
+    PRs diff against the base branch, CI pushes against the previous commit,
+    anything else (local runs, pre-commit) against the index, so staged
+    additions and deletions are seen before they are committed. Renames are
+    reported as a deletion plus an addition, so moving a kept file away counts.
+    """
+    base = os.environ.get("GITHUB_BASE_REF")
+    if base:
+        cmd = ["git", "diff", "--no-renames", "--name-status", f"origin/{base}...HEAD"]
+    elif os.environ.get("GITHUB_ACTIONS"):
+        cmd = ["git", "diff", "--no-renames", "--name-status", "HEAD~1..HEAD"]
+    else:
+        cmd = ["git", "diff", "--cached", "--no-renames", "--name-status"]
+    try:
+        out = subprocess.check_output(cmd, text=True, cwd=root, stderr=subprocess.DEVNULL)
+    except Exception:
+        return {}
+    return {line.split("\t")[-1].strip(): line[0] for line in out.splitlines() if "\t" in line}
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Report .py files unreachable from entry points")
+    ap.add_argument("--allow-list",
+                    help="YAML with a 'kept' list of files never reported (e.g. release.keep.yml)")
+    ap.add_argument("--entry", action="append", metavar="SPEC",
+                    help="Entry point: module[:attr], file or glob (repeatable; default: %s)"
+                    % ", ".join(ENTRY_POINTS))
+    ap.add_argument("--fail-on-new", action="store_true",
+                    help="Exit 1 if a file added in this diff is an orphan")
+    ap.add_argument("--no-cache", action="store_true", help=f"Do not read or write {CACHE}")
+    ap.add_argument("--json", action="store_true", help="Machine-readable report")
+    args = ap.parse_args(argv)
+    allow = load_kept(args.allow_list) if args.allow_list else set()
+    report = sweep(ROOT, args.entry or ENTRY_POINTS, None if args.no_cache else ROOT/CACHE)
+    orphans = [o for o in report["orphans"] if o not in allow]
+    added = {p for p, s in git_name_status().items() if s == "A"} if args.fail_on_new else set()
+    new = sorted(set(orphans) & added)
+    if args.json:
+        print(json.dumps({**report, "orphans": orphans, "new_orphans": new}, indent=2))
+    else:
+        if orphans:
+            print("Potential orphan .py files (allow via release.keep.yml):")
+            for o in orphans:
+                print(" -", o)
+        for e in report["stats"]["errors"]:
+            print("Unparsable:", e, file=sys.stderr)
+        s = report["stats"]
+        print(f"{s['files']} files, {s['parsed']} parsed, "
+              f"{report['reachable']} reachable in {s['ms']} ms")
+    if new:
+        print("New orphan files:", new, file=sys.stderr)
+        sys.exit(1)
     sys.exit(0)
 if __name__=="__main__":
     main()
\ No newline at end of file
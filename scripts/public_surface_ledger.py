@@ -1,28 +1,215 @@
 #!/usr/bin/env python3
-import sys, json, pathlib
+"""Generate, diff and benchmark public_surface_ledger.json.
+
+endpoints come from the live app.main:app route table, each with a p95 latency
+budget (p95_ms): the committed value if there is one, else BUDGETS_P95_MS, else
+DEFAULT_P95_MS. cli comes from the argparse parsers of runnable modules, read
+with ast (no imports). contracts and other hand-written sections are kept.
+--verify fails on structural problems (exit 3) or drift from the committed
+ledger (exit 4); --diff only prints the drift; --bench times each parameterless
+GET in-process and fails (exit 5) when a p95 exceeds its budget or an answer is
+not 2xx; endpoints needing auth or a database (401/403/503) are skipped.
+"""
+import argparse
+import ast
+import json
+import pathlib
+import re
+import sys
+import time
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 LEDGER = ROOT / "public_surface_ledger.json"
 REQ = ["endpoints","cli","contracts"]
+APP = "app.main:app"
+CLI_DIRS = ["app", "governance_kit", "scripts"]
+DEFAULT_P95_MS = 250
+BUDGETS_P95_MS = {"/healthz": 20, "/metrics": 50}
+FRONTEND_API = ROOT / "frontend" / "js" / "api.js"
+FRONTEND_CALL = re.compile(
+    r"request\(\s*([`'\"])(.*?)\1(\s*,\s*\{\s*method:\s*['\"](\w+)['\"])?", re.S)
+SKIP_STATUS = {401, 403, 503}
+def load_app(app_spec=APP):
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    from importlib import import_module
+    module, _, attr = app_spec.partition(":")
+    return getattr(import_module(module), attr or "app")
+def endpoints(app_spec=APP, budgets=None):
+    """[{method, path, name, p95_ms}] for every schema route of the app"""
+    from fastapi.routing import APIRoute
+    app = load_app(app_spec)
+    budgets = budgets or {}
+    out = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.include_in_schema:
+            continue
+        for method in sorted(route.methods - {"HEAD"}):
+            default = BUDGETS_P95_MS.get(route.path, DEFAULT_P95_MS)
+            budget = budgets.get(f"{method} {route.path}", default)
+            out.append({"method": method, "path": route.path, "name": route.name, "p95_ms": budget})
+    return sorted(out, key=lambda e: (e["path"], e["method"]))
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+def _command(rel):
+    if rel.startswith("scripts/"):
+        return f"python {rel}"
+    return "python -m " + rel[:-3].replace("/", ".").removesuffix(".__init__")
+def _is_main_guard(node):
+    return isinstance(node, ast.If) and "__main__" in ast.dump(node.test)
+def cli_commands(root=ROOT):
+    """[{command, description, options}] for __main__ modules that build an ArgumentParser"""
+    out = []
+    for d in CLI_DIRS:
+        for path in sorted((root/d).rglob("*.py")):
+            rel = path.relative_to(root).as_posix()
+            try:
+                tree = ast.parse(path.read_bytes(), filename=rel)
+            except (SyntaxError, ValueError):
+                continue
+            if not any(_is_main_guard(n) for n in tree.body):
+                continue
+            description, options = None, []
+            for node in ast.walk(tree):
+                if not isinstance(node, ast.Call):
+                    continue
+                name = getattr(node.func, "attr", getattr(node.func, "id", None))
+                if name == "ArgumentParser":
+                    kw = {k.arg: _literal(k.value) for k in node.keywords}
+                    description = description or kw.get("description")
+                elif name == "add_argument":
+                    flags = [_literal(a) for a in node.args]
+                    options.append("/".join(f for f in flags if isinstance(f, str)))
+            if description is None and not options:
+                continue
+            out.append({"command": _command(rel), "description": description,
+                        "options": [o for o in options if o]})
+    return out
+def frontend_paths(path=FRONTEND_API):
+    """(method, path) pairs the frontend calls via this.request(...)"""
+    if not path.exists():
+        return []
+    found = set()
+    for m in FRONTEND_CALL.finditer(path.read_text()):
+        p = re.sub(r"\$\{(\w+)\}", r"{\1}", m.group(2)).split("?")[0]
+        p = re.sub(r"\$\{[^}]*\}$", "", p)
+        found.add(((m.group(4) or "GET").upper(), p))
+    return sorted(found)
+def _shape(path):
+    return re.sub(r"\{[^}]*\}", "{}", path).rstrip("/") or "/"
+def build(committed=None, app_spec=APP, root=ROOT):
+    """Fresh ledger; hand-written sections and endpoint budgets carried over from committed"""
+    committed = committed or {}
+    budgets = {f"{e['method']} {e['path']}": e["p95_ms"]
+               for e in committed.get("endpoints", []) if "p95_ms" in e}
+    ledger = {k: v for k, v in committed.items() if k not in ("endpoints", "cli")}
+    ledger["endpoints"] = endpoints(app_spec, budgets)
+    ledger["cli"] = cli_commands(root)
+    ledger.setdefault("contracts", [])
+    return {k: ledger[k] for k in REQ + sorted(set(ledger) - set(REQ))}
+def diff(old, new):
+    """{section: {added, removed, changed}} keyed by method+path / command; {} when equal"""
+    keys = {"endpoints": lambda e: f"{e.get('method')} {e.get('path')}",
+            "cli": lambda e: e.get("command")}
+    out = {}
+    for section, key in keys.items():
+        a = {key(e): e for e in old.get(section, [])}
+        b = {key(e): e for e in new.get(section, [])}
+        d = {"added": sorted(set(b) - set(a)), "removed": sorted(set(a) - set(b)),
+             "changed": sorted(k for k in set(a) & set(b) if a[k] != b[k])}
+        if any(d.values()):
+            out[section] = d
+    return out
+def unserved(ledger):
+    """Frontend calls with no matching endpoint"""
+    served = {(e["method"], _shape(e["path"])) for e in ledger.get("endpoints", [])}
+    return [f"{m} {p}" for m, p in frontend_paths() if (m, _shape(p)) not in served]
+def problems(data):
+    return [f"Ledger section '{s}' missing/empty" for s in REQ
+            if s not in data or not isinstance(data[s], list) or not data[s]]
+def bench(ledger, requests=50, app_spec=APP):
+    """Measured p95 per parameterless GET endpoint against its budget; only 2xx answers pass.
+
+    Endpoints whose warm-up answers 401/403/503 (auth or database needed) are skipped.
+    """
+    from fastapi.testclient import TestClient
+    results = []
+    with TestClient(load_app(app_spec)) as client:
+        for e in ledger["endpoints"]:
+            if e["method"] != "GET" or "{" in e["path"]:
+                continue
+            status = client.get(e["path"]).status_code   # warm-up
+            if status in SKIP_STATUS:
+                # Auth-gated or DB-backed without a database: timing the error page proves nothing
+                results.append({"method": "GET", "path": e["path"], "status": status,
+                                "skipped": f"warm-up returned {status}"})
+                continue
+            times, statuses = [], set()
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                statuses.add(client.get(e["path"]).status_code)
+                times.append((time.perf_counter() - t0) * 1000)
+            p95 = sorted(times)[max(0, int(round(0.95 * len(times))) - 1)]
+            ok_status = all(200 <= s < 300 for s in statuses)
+            results.append({"method": "GET", "path": e["path"], "status": sorted(statuses),
+                            "p95_ms": round(p95, 2), "budget_ms": e["p95_ms"],
+                            "ok": ok_status and p95 <= e["p95_ms"]})
+    return results
+def _committed():
+    return json.loads(LEDGER.read_text()) if LEDGER.exists() else {}
 def write_ledger():
-    ledger = {
-        "endpoints":[
-            {"method":"GET","path":"/api/rules"},
-            {"method":"GET","path":"/api/rules/{rule_id}"},
-            {"method":"POST","path":"/api/rules"},
-            {"method":"GET","path":"/api/papers/{paper_id}"},
-        ],
-        "cli":[{"command":"aectl ingest --paper <path>"},{"command":"aectl build-ledger"}],
-        "contracts":[{"module":"rules","version":"v1.0","file":"contracts/rules_v1.md"}]
-    }
-    LEDGER.write_text(json.dumps(ledger, indent=2))
-def verify():
-    if not LEDGER.exists(): print("public_surface_ledger.json missing", file=sys.stderr); sys.exit(2)
-    data = json.loads(LEDGER.read_text())
-    for s in REQ:
-        if s not in data or not isinstance(data[s], list) or not data[s]:
-            print(f"Ledger section '{s}' missing/empty", file=sys.stderr); sys.exit(3)
-    print("Public surface ledger OK."); sys.exit(0)
+    committed = _committed()
+    ledger = build(committed)
+    changes = diff(committed, ledger)
+    if changes or ledger != committed:
+        LEDGER.write_text(json.dumps(ledger, indent=2) + "\n")
+    print(json.dumps(changes, indent=2) if changes else "Ledger unchanged.")
+def verify(drift=True):
+    if not LEDGER.exists():
+        print("public_surface_ledger.json missing", file=sys.stderr)
+        sys.exit(2)
+    committed = json.loads(LEDGER.read_text())
+    found = problems(committed)
+    if found:
+        print(found[0], file=sys.stderr)
+        sys.exit(3)
+    if drift:
+        changes = diff(committed, build(committed))
+        if changes:
+            print("Public surface drift (run --write):", json.dumps(changes, indent=2),
+                  file=sys.stderr)
+            sys.exit(4)
+    print("Public surface ledger OK.")
+    sys.exit(0)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Public surface ledger")
+    ap.add_argument("--write", action="store_true",
+                    help="Regenerate the ledger from the app and CLI parsers")
+    ap.add_argument("--verify", action="store_true", help="Fail on missing sections or drift")
+    ap.add_argument("--diff", action="store_true", help="Print drift against the committed ledger")
+    ap.add_argument("--bench", action="store_true",
+                    help="Enforce each GET endpoint's p95 budget in-process")
+    ap.add_argument("--requests", type=int, default=50, help="Requests per endpoint for --bench")
+    args = ap.parse_args(argv)
+    if args.write:
+        write_ledger()
+        sys.exit(0)
+    if args.verify:
+        verify()
+    if args.diff:
+        committed = _committed()
+        ledger = build(committed)
+        report = {"drift": diff(committed, ledger), "unserved_frontend_calls": unserved(ledger)}
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+    if args.bench:
+        results = bench(json.loads(LEDGER.read_text()), args.requests)
+        print(json.dumps(results, indent=2))
+        sys.exit(0 if all(r["ok"] for r in results if "skipped" not in r) else 5)
+    ap.print_usage()
+    sys.exit(1)
 if __name__=="__main__":
-    if "--write" in sys.argv: write_ledger(); sys.exit(0)
-    if "--verify" in sys.argv: verify()
-    print("Usage: --write | --verify"); sys.exit(1)
\ No newline at end of file
+    main()
\ No newline at end of file
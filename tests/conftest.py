@@ -0,0 +1,27 @@
+import pathlib
+import sqlite3
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+SQL = ROOT / "db" / "sql"
+def apply_schema(db_path):
+    """Build a SQLite ae.db from the complete schema plus numbered migrations >= 016."""
+    files = [SQL/"010_rules_core.sql", SQL/"015_complete_schema.sql", SQL/"014_security.sql"]
+    files += sorted(p for p in SQL.glob("*.sql") if int(p.name[:3]) >= 16)
+    conn = sqlite3.connect(db_path)
+    for f in files:
+        # COMMENT ON is Postgres-only; strip it for SQLite
+        text = "\n".join(line for line in f.read_text().splitlines()
+                         if not line.startswith("COMMENT ON"))
+        conn.executescript(text)
+    conn.close()
+@pytest.fixture
+def ae_db(tmp_path):
+    path = tmp_path / "ae.db"
+    apply_schema(str(path))
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM processing_queue")
+    conn.commit()
+    conn.close()
+    return str(path)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.audit import AuditSink, audit_event, prune, rollover
+
+
+def test_events_are_group_committed(ae_db):
+    async def run():
+        sink = AuditSink(ae_db, batch_size=50, flush_ms=50)
+        for i in range(120):
+            event = audit_event("GET", f"/p/{i}", 200, 1.0,
+                                client_ip="10.1.2.3", user_agent="x" * 300)
+            sink.record(event)
+        await sink.close()
+        return sink.stats()
+    stats = asyncio.run(run())
+    assert stats["written"] == 120 and stats["batches"] == 3 and stats["queued"] == 0
+    conn = sqlite3.connect(ae_db)
+    row = conn.execute(
+        "SELECT COUNT(*), MIN(client_ip), MAX(LENGTH(user_agent)) FROM audit_log").fetchone()
+    assert row == (120, "10.1.2.0", 100)
+def test_backpressure_samples_successes_then_drops(ae_db):
+    async def run():
+        sink = AuditSink(ae_db, max_queue=10, sample_above=0.5, sample_every=2)
+        kept = [sink.record(audit_event("GET", "/", 200 if i % 4 else 500, 1.0)) for i in range(30)]
+        await sink.close()
+        return kept, sink.stats()
+    kept, stats = asyncio.run(run())
+    assert all(kept[:5]) and stats["enqueued"] == 10 and stats["written"] == 10
+    assert stats["sampled_out"] > 0 and stats["dropped"] > 0
+    assert stats["enqueued"] + stats["sampled_out"] + stats["dropped"] == 30
+def test_rollover_moves_old_rows_and_prune_drops_old_months(ae_db):
+    conn = sqlite3.connect(ae_db)
+    stamps = ["2026-08-03T10:00:00", "2026-09-20T10:00:00", "2026-09-30T23:59:59",
+              "2026-10-18T09:00:00"]
+    rows = [(f"e{i}", ts, "GET", "/", 200) for i, ts in enumerate(stamps)]
+    conn.executemany(
+        "INSERT INTO audit_log (event_id, timestamp, method, path, status_code)"
+        " VALUES (?, ?, ?, ?, ?)", rows)
+    now = datetime(2026, 10, 19)
+    assert rollover(conn, hot_days=7, now=now) == 3
+    assert conn.execute("SELECT event_id FROM audit_log").fetchall() == [("e3",)]
+    assert conn.execute("SELECT COUNT(*) FROM audit_log_202609").fetchone()[0] == 2
+    assert prune(conn, retention_days=40, now=now) == ["audit_log_202608"]
+    assert conn.execute("SELECT COUNT(*) FROM audit_log_202609").fetchone()[0] == 2
+def test_requests_are_audited_through_the_middleware(ae_db, monkeypatch):
+    from app import main
+    monkeypatch.setattr(main.AUDIT, "db_path", ae_db)
+    monkeypatch.setattr(main.AUDIT, "_conn", None)
+    with TestClient(main.app) as c:
+        assert c.get("/healthz").status_code == 200
+    conn = sqlite3.connect(ae_db)
+    rows = conn.execute("SELECT method, path, status_code FROM audit_log").fetchall()
+    assert rows == [("GET", "/healthz", 200)]
+    assert "app_audit_events" in TestClient(main.app).get("/metrics").text
\ No newline at end of file
@@ -0,0 +1,96 @@
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app.bn_export import export_package
+from app.job_graph import enqueue_job
+from app.schemas import get_registry
+from app.worker import SimpleWorker
+
+
+def _seed(db):
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO articles (article_id, title) VALUES ('a1', 't')")
+    conn.executemany(
+        "INSERT INTO findings (id, finding_level, antecedents, consequent, measure_direction,"
+        " effect_size, paper_id) VALUES (?, 'micro', ?, ?, ?, ?, 'a1')",
+        [(1, '["Daylight"]', "stress", "decrease", 0.4),
+         (2, '["daylight"]', "Stress", "decrease", 0.2),
+         (3, '["noise"]', "sleep", "increase", None)])
+    conn.executemany(
+        "INSERT INTO rules (rule_id, rule, confidence, triangulation_score, contradiction_count,"
+        " cluster_id, updated_at) VALUES (?, ?, ?, ?, 0, ?, '2026-01-01 00:00:00')",
+        [("r1", "Daylight lowers stress", 0.8, 0.6, "c1"),
+         ("r2", "Noise raises sleep", 0.3, 0.0, "c2")])
+    conn.executemany(
+        "INSERT INTO rule_evidence (rule_id, article_id, finding_id, passage, stance, created_at)"
+        " VALUES (?, 'a1', ?, 'p', 'supporting', '2026-01-01 00:00:00')",
+        [("r1", 1), ("r1", 2), ("r2", 3)])
+    conn.execute("INSERT INTO mechanisms (id, name) VALUES (1, 'circadian entrainment')")
+    conn.execute("INSERT INTO finding_mechanism_links (finding_id, mechanism_id, paper_id)"
+                 " VALUES (1, 1, 'a1')")
+    conn.commit()
+    conn.close()
+def test_json_package_is_valid_and_deduplicated(ae_db, tmp_path):
+    _seed(ae_db)
+    out = export_package(ae_db, str(tmp_path))
+    assert (out["rules"], out["invalid"]) == (2, 0)
+    pkg = json.loads(open(out["path"]).read())
+    assert get_registry().validator("bn_package.schema.json")(pkg) == []
+    r1 = pkg["rules"][0]
+    assert r1["status"] == "explanatory" and r1["factors"] == ["daylight"]
+    assert r1["effect_direction"] == "-" and r1["effect_size"] == 0.3
+    assert pkg["rules"][1]["status"] == "prima_facie"
+    assert {n["node_id"] for n in pkg["nodes"]} == {
+        "construct:daylight", "construct:stress", "construct:noise", "construct:sleep",
+        "mechanism:circadian_entrainment"}
+    assert len(pkg["edges"]) == 4 and all(e["rule_ids"] in (["r1"], ["r2"]) for e in pkg["edges"])
+def test_incremental_gzip_jsonl_holds_only_changed_rules(ae_db, tmp_path):
+    _seed(ae_db)
+    assert export_package(ae_db, str(tmp_path), cluster_id="c1")["rules"] == 1
+    again = export_package(ae_db, str(tmp_path), cluster_id="c1", since_last=True)
+    assert again["since"] is not None and again["rules"] == 0
+    conn = sqlite3.connect(ae_db)
+    conn.execute("UPDATE rules SET updated_at = datetime('now', '+1 minute')")
+    conn.commit()
+    conn.close()
+    out = export_package(ae_db, str(tmp_path), since_last=True, fmt="jsonl", compress=True)
+    assert out["since"] is None and out["rules"] == 2
+    out = export_package(ae_db, str(tmp_path), cluster_id="c1", since_last=True,
+                         fmt="jsonl", compress=True)
+    lines = [json.loads(line) for line in gzip.open(out["path"], "rt")]
+    assert [line["rule_id"] for line in lines if line["kind"] == "rule"] == ["r1"]
+    assert lines[0]["kind"] == "package" and lines[-1]["provenance"]["incremental"] is True
+def test_l5_export_job(ae_db, tmp_path):
+    _seed(ae_db)
+    conn = sqlite3.connect(ae_db)
+    enqueue_job(conn, "L5_export", {"out_dir": str(tmp_path), "cluster_id": "c2"}, job_id="x")
+    conn.commit()
+    conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w.process_job(w.fetch_next_job())
+    w.close()
+    conn = sqlite3.connect(ae_db)
+    status = conn.execute("SELECT status FROM processing_queue WHERE job_id='x'").fetchone()[0]
+    assert status == "complete"
+    assert conn.execute("SELECT scope, rules FROM bn_exports").fetchone() == ("cluster:c2", 1)
+def test_failed_export_leaves_no_file_and_same_second_change_is_kept(ae_db, tmp_path, monkeypatch):
+    _seed(ae_db)
+    out = tmp_path / "out"
+    first = export_package(ae_db, str(out), cluster_id="c1")
+    conn = sqlite3.connect(ae_db)
+    conn.execute(
+        "UPDATE rules SET updated_at = (SELECT started_at FROM bn_exports) WHERE rule_id = 'r1'")
+    conn.commit()
+    conn.close()
+    def broken(conn):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr("app.bn_export._stream_edges", broken)
+    with pytest.raises(RuntimeError):
+        export_package(ae_db, str(out), cluster_id="c1", since_last=True)
+    assert [p.name for p in out.iterdir()] == [Path(first["path"]).name]
+    monkeypatch.undo()
+    assert export_package(ae_db, str(out), cluster_id="c1", since_last=True)["rules"] == 1
\ No newline at end of file
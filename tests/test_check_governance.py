@@ -0,0 +1,53 @@
+import importlib.util
+import json
+import pathlib
+import subprocess
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location(
+    "check_governance", ROOT/"scripts"/"check_governance.py")
+m = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(m)
+def test_checks_share_one_snapshot_and_report_timings(tmp_path):
+    for rel in m.REQUIRED[1:]:
+        (tmp_path/rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path/rel).write_text("")
+    (tmp_path/"release.keep.yml").write_text("kept:\n  - deconcat.py\n")
+    ledger = {"endpoints": [{}], "cli": [], "contracts": [{}]}
+    (tmp_path/"public_surface_ledger.json").write_text(json.dumps(ledger))
+    report = m.run(["required", "kept", "ledger", "orphans"], root=tmp_path)
+    checks = report["checks"]
+    assert checks["required"]["missing"] == ["Project_Constitution.md"] and checks["kept"]["ok"]
+    assert checks["ledger"]["problems"] == ["Ledger section 'cli' missing/empty"]
+    assert checks["orphans"]["ok"] and "deconcat.py" not in checks["orphans"]["orphans"]
+    assert not report["ok"] and all(c["ms"] >= 0 for c in checks.values())
+def test_unreadable_keep_file_fails_kept_check(tmp_path):
+    (tmp_path/"release.keep.yml").write_text('kept: []\n"a: b"\n"c"\n')
+    kept = m.run(["kept"], root=tmp_path)["checks"]["kept"]
+    assert not kept["ok"] and kept["error"].startswith("release.keep.yml:")
+def test_staged_changes_are_checked_before_commit(tmp_path, monkeypatch):
+    monkeypatch.delenv("GITHUB_BASE_REF", raising=False)
+    monkeypatch.delenv("GITHUB_ACTIONS", raising=False)
+    def git(*args):
+        identity = ["-c", "user.name=t", "-c", "user.email=t@t"]
+        subprocess.run(["git", *identity, *args], cwd=tmp_path, check=True)
+    (tmp_path/"release.keep.yml").write_text("kept:\n  - deconcat.py\n")
+    (tmp_path/"deconcat.py").write_text("")
+    git("init", "-q")
+    git("add", ".")
+    git("commit", "-qm", "base")
+    (tmp_path/"app").mkdir()
+    (tmp_path/"app"/"zz_orphan.py").write_text("")
+    git("add", "app/zz_orphan.py")
+    git("rm", "-q", "deconcat.py")
+    checks = m.run(["orphans", "kept"], root=tmp_path)["checks"]
+    assert checks["orphans"]["new_orphans"] == ["app/zz_orphan.py"] and not checks["orphans"]["ok"]
+    assert checks["kept"]["violations"] == ["deconcat.py"]
+def test_ledger_check_reports_drift_from_app(tmp_path):
+    ledger = {"endpoints": [{"method": "GET", "path": "/gone", "name": "gone", "p95_ms": 250}],
+              "cli": [{"command": "python scripts/x.py"}], "contracts": [{}]}
+    (tmp_path/"public_surface_ledger.json").write_text(json.dumps(ledger))
+    result = m.run(["ledger"], root=tmp_path)["checks"]["ledger"]
+    assert not result["ok"] and result["code"] == 4
+    assert result["drift"]["endpoints"]["removed"] == ["GET /gone"]
+    assert "GET /healthz" in result["drift"]["endpoints"]["added"]
\ No newline at end of file
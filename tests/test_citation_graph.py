@@ -0,0 +1,46 @@
+import asyncio, json, sqlite3
+import httpx
+from app.citation_graph import expand_articles
+from app.job_graph import enqueue_job
+from app.semantic_scholar import S2Client
+from app.worker import SimpleWorker
+REFS = {1: [10, 11], 20: [1, 30], 40: [10, 11], 10: [], 11: [], 30: []}
+def _server(calls):
+    def handler(request):
+        ids = [int(i.split(":")[1]) for i in json.loads(request.content)["ids"]]
+        fields = request.url.params["fields"]
+        calls.append((fields, ids))
+        if "references" in fields:
+            return httpx.Response(200, json=[{"corpusId": i, "references": [{"corpusId": r} for r in REFS[i]],
+                                              "citations": [{"corpusId": c} for c, rs in REFS.items() if i in rs]} for i in ids])
+        return httpx.Response(200, json=[{"corpusId": i, "title": f"paper {i}"} for i in ids])
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+def _seed(db):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO articles (article_id, corpus_id, title) VALUES (?, ?, 't')", [("seed", "1"), ("known", "10")])
+    conn.commit(); conn.close()
+def test_bfs_scores_dedupes_and_reuses_graph(ae_db):
+    _seed(ae_db)
+    calls = []
+    async def run():
+        async with S2Client(http=_server(calls), cache_dir=None) as s2:
+            return await expand_articles(s2, ae_db, ["seed"], hops=2)
+    out = asyncio.run(run())
+    assert out["article_ids"] == ["s2:11", "s2:20", "s2:40", "s2:30"]
+    assert out["reached"] == 5 and out["novel"] == 4 and out["neighbour_fetches"] == 4
+    assert [f for f, _ in calls].count("corpusId,references.corpusId,citations.corpusId") == 2
+    calls.clear()
+    again = asyncio.run(run())
+    assert again["article_ids"] == [] and again["neighbour_fetches"] == 0 and again["novel"] == 0 and calls == []
+def test_l4_job_enqueues_only_novel_candidates(ae_db):
+    _seed(ae_db)
+    conn = sqlite3.connect(ae_db)
+    enqueue_job(conn, "L4_expand", {"seed_articles": ["seed"], "hops": 1}, job_id="x")
+    conn.commit(); conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w._s2 = S2Client(http=_server([]), cache_dir=None)
+    w.process_job(w.fetch_next_job())
+    w.close()
+    conn = sqlite3.connect(ae_db)
+    params = json.loads(conn.execute("SELECT params FROM processing_queue WHERE job_id='x/L1_cluster'").fetchone()[0])
+    assert params["article_ids"] == ["s2:11", "s2:20"]
\ No newline at end of file
@@ -0,0 +1,37 @@
+import sqlite3
+import pytest
+from app.confidence import compute_scores_python, load_rule_findings, recompute_confidence
+FINDINGS = [  # id, measure, effect, n, direction
+    (1, "cortisol", 0.4, 50, "decrease"), (2, "heart_rate", 0.8, 80, "decrease"), (3, "cortisol", 0, 30, "decrease"),
+    (4, "accuracy", None, None, "increase"), (5, "reaction_time", 1.2, 400, "decrease")]
+def _db(ae_db):
+    conn = sqlite3.connect(ae_db)
+    conn.executemany("INSERT INTO findings (id, finding_level, consequent, operational_measure, effect_size, sample_size, measure_direction) "
+                     "VALUES (?, 'micro', 'stress', ?, ?, ?, ?)", FINDINGS)
+    conn.executemany("INSERT INTO rules (rule_id, rule) VALUES (?, 'r')", [("r1",), ("r2",), ("r3",)])
+    conn.executemany("INSERT INTO rule_evidence (rule_id, article_id, finding_id, passage, stance) VALUES (?, 'art-001', ?, 'q', ?)",
+                     [("r1", 1, "supporting"), ("r1", 2, "supporting"), ("r1", 3, "supporting"), ("r1", 3, "supporting"),
+                      ("r2", 4, "supporting"), ("r2", 5, "contradicting")])
+    conn.commit(); return conn
+def test_formula_matches_meta_review(ae_db):
+    conn = _db(ae_db)
+    scores = compute_scores_python(load_rule_findings(conn))
+    # r1: 2 measures, mean effect (0.4+0.8)/2, N=160, consistent
+    assert scores["r1"] == pytest.approx((0.5 * 0.4 + 0.75 * 0.3 + 0.8 * 0.2 + 0.1, 0.5))
+    # r2: 2 measures, effect 1.2 capped, N=400 capped, mixed directions
+    assert scores["r2"] == pytest.approx((0.2 + 0.3 + 0.2, 0.5))
+def test_recompute_writes_only_changed_rules(ae_db):
+    _db(ae_db).close()
+    assert recompute_confidence(ae_db) == {"scored": 2, "updated": 2}
+    conn = sqlite3.connect(ae_db)
+    assert conn.execute("SELECT contradiction_count FROM rules WHERE rule_id='r2'").fetchone()[0] == 1
+    assert conn.execute("SELECT confidence FROM rules WHERE rule_id='r3'").fetchone()[0] is None
+    assert recompute_confidence(ae_db) == {"scored": 2, "updated": 0}
+    conn.execute("UPDATE findings SET sample_size = 500 WHERE id = 1"); conn.commit()
+    assert recompute_confidence(ae_db, ["r1"]) == {"scored": 1, "updated": 1}
+def test_numpy_engine_agrees(ae_db):
+    pytest.importorskip("numpy")
+    from app.confidence import compute_scores_numpy
+    rows = load_rule_findings(_db(ae_db))
+    fast, slow = compute_scores_numpy(rows), compute_scores_python(rows)
+    assert fast.keys() == slow.keys() and all(fast[k] == pytest.approx(slow[k]) for k in slow)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import asyncio, json, sqlite3
+import httpx
+from app.confidence import recompute_confidence
+from app.contradictions import bucket_key, check_candidates, index_findings, record_stance
+from app.llm import LLMClient
+ROWS = [  # id, antecedents, consequent, direction
+    (1, '["Daylight", "window view"]', "Attention", "increase"),
+    (2, '["window_view", "daylight"]', "attention", "decreased"),
+    (3, '["daylight"]', "attention", "decrease"),
+    (4, '["Daylight", "Window View"]', "attention", "increase"),
+    (5, '["noise"]', "memory", "decrease")]
+def _db(ae_db, rows=ROWS):
+    conn = sqlite3.connect(ae_db)
+    conn.executemany("INSERT INTO findings (id, finding_level, antecedents, consequent, measure_direction) VALUES (?, 'micro', ?, ?, ?)", rows)
+    return conn
+def test_bucket_key_is_order_and_case_insensitive():
+    assert bucket_key('["Window View", "daylight"]', "Attention ") == "daylight+window_view->attention"
+def test_only_opposite_directions_in_same_bucket_become_candidates(ae_db):
+    conn = _db(ae_db)
+    assert index_findings(conn) == {"indexed": 5, "candidates": 2}
+    assert conn.execute("SELECT finding_a, finding_b FROM contradiction_candidates ORDER BY 1, 2").fetchall() == [(1, 2), (2, 4)]
+    assert index_findings(conn) == {"indexed": 0, "candidates": 0}
+    conn.execute("INSERT INTO findings (id, finding_level, antecedents, consequent, measure_direction) VALUES (6, 'micro', '[\"noise\"]', 'Memory', 'increase')")
+    assert index_findings(conn) == {"indexed": 1, "candidates": 1}
+def test_contradiction_count_is_incremental_and_matches_recompute(ae_db):
+    conn = _db(ae_db)
+    conn.execute("INSERT INTO rules (rule_id, rule, contradiction_count) VALUES ('r1', 'daylight helps attention', 0)")
+    conn.execute("INSERT INTO rule_evidence (rule_id, article_id, finding_id, passage, stance) VALUES ('r1', 'art-001', 1, 'q', 'supporting')")
+    index_findings(conn)
+    record_stance(conn, 2, 1, "contradicting"); record_stance(conn, 2, 4, "supporting")
+    assert conn.execute("SELECT contradiction_count FROM rules").fetchone()[0] == 1
+    conn.commit()
+    assert recompute_confidence(ae_db)["updated"] == 1  # confidence filled in, count unchanged
+    assert sqlite3.connect(ae_db).execute("SELECT contradiction_count FROM rules").fetchone()[0] == 1
+    record_stance(conn, 1, 2, "neutral")
+    assert conn.execute("SELECT contradiction_count FROM rules").fetchone()[0] == 0
+def test_llm_check_resolves_pending_pairs(ae_db):
+    conn = _db(ae_db); index_findings(conn); conn.commit(); conn.close()
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        stance = "contradicting" if '"id": 1' in prompt else "neutral"
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps({"stance": stance, "quotes": []})}}],
+                                         "usage": {"prompt_tokens": 1, "completion_tokens": 1}})
+    async def run():
+        async with LLMClient(lambda u, p: "k", http=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as llm:
+            return await check_candidates(llm, ae_db, "u", "openai", "m")
+    assert asyncio.run(run()) == {"contradicting": 1, "neutral": 1}
+def test_failed_pair_stays_pending_and_others_are_recorded(ae_db):
+    conn = _db(ae_db); index_findings(conn); conn.commit(); conn.close()
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        if '"id": 1' in prompt:
+            return httpx.Response(400, text="bad request")
+        return httpx.Response(200, json={"choices": [{"message": {"content": '{"stance": "neutral", "quotes": []}'}}],
+                                         "usage": {"prompt_tokens": 1, "completion_tokens": 1}})
+    async def run():
+        async with LLMClient(lambda u, p: "k", http=httpx.AsyncClient(transport=httpx.MockTransport(handler))) as llm:
+            return await check_candidates(llm, ae_db, "u", "openai", "m")
+    assert asyncio.run(run()) == {"failed": 1, "neutral": 1}
+    statuses = sqlite3.connect(ae_db).execute("SELECT status FROM contradiction_candidates ORDER BY status").fetchall()
+    assert statuses == [("neutral",), ("pending",)]
\ No newline at end of file
@@ -0,0 +1,35 @@
+import random, sqlite3
+from app.dedup import canonical_ids, index_article, minhash_signature, similarity
+from app.job_graph import enqueue_job
+from app.worker import SimpleWorker
+rng = random.Random(7)
+WORDS = [f"w{i}" for i in range(400)]
+PAPER = " ".join(rng.choice(WORDS) for _ in range(3000))
+def _edited(text, n):
+    words = text.split()
+    for i in rng.sample(range(len(words)), n):
+        words[i] = "edit"
+    return " ".join(words)
+def test_signature_tracks_jaccard():
+    a, _ = minhash_signature(PAPER)
+    assert similarity(a, minhash_signature(_edited(PAPER, 20))[0]) > 0.8
+    assert similarity(a, minhash_signature(" ".join(rng.choice(WORDS) for _ in range(3000)))[0]) < 0.1
+def test_near_duplicates_link_to_canonical(ae_db):
+    conn = sqlite3.connect(ae_db)
+    assert index_article(conn, "pub", PAPER) is None
+    assert index_article(conn, "preprint", _edited(PAPER, 20)) == "pub"
+    assert index_article(conn, "upload", _edited(PAPER, 10)) == "pub"
+    assert index_article(conn, "other", " ".join(rng.choice(WORDS) for _ in range(3000))) is None
+    assert index_article(conn, "tiny", "short abstract only") is None
+    assert canonical_ids(conn, ["preprint", "upload", "other"]) == {"preprint": "pub", "upload": "pub", "other": "other"}
+    conn.commit(); conn.close()
+def test_l1_fan_out_collapses_duplicates(ae_db):
+    conn = sqlite3.connect(ae_db)
+    index_article(conn, "a1", PAPER); index_article(conn, "a2", _edited(PAPER, 5))
+    enqueue_job(conn, "L1_cluster", {"article_ids": ["a1", "a2", "a3", "a4"], "pipeline": True}, job_id="root")
+    conn.commit(); conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w.process_job(w.fetch_next_job())
+    conn = sqlite3.connect(ae_db)
+    jobs = {r[0] for r in conn.execute("SELECT job_id FROM processing_queue WHERE job_type='L2_extract'")}
+    assert jobs == {"root/L2_extract/a1"}
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import sqlite3
+
+import httpx
+import pytest
+
+from app.extraction import SevenPanelExtractor, parse_json_output
+from app.job_graph import enqueue_job
+from app.llm import LLMCache, LLMClient
+from app.worker import SimpleWorker
+
+SECTIONS = {"abstract": "Daylight helps.", "methods": "RCT, n=40.",
+            "results": "Focus rose (d=0.4).", "discussion": "Circadian entrainment.",
+            "conclusion": "Use windows.", "introduction": "Light matters."}
+def _mock(state, delay=0.05):
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        state["inflight"] += 1
+        state["peak"] = max(state["peak"], state["inflight"])
+        await asyncio.sleep(delay)
+        state["inflight"] -= 1
+        if "QC" in prompt[:400] or "### PANELS" in prompt:
+            text = '{"ok": true, "reasks": []}'
+        elif "RESULTS" in prompt:
+            text = '```json\n{"findings_effect": "focus up", "stats_effect_sizes": "d=0.4"}\n```'
+        else:
+            text = '{"limitations_confounds": "small n", "findings_effect": "via circadian"}'
+        state["prompts"].append(prompt)
+        return httpx.Response(200, json={"choices": [{"message": {"content": text}}],
+                                         "usage": {"prompt_tokens": 10, "completion_tokens": 5}})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+def _reply(text):
+    usage = {"prompt_tokens": 1, "completion_tokens": 1}
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}], "usage": usage})
+def _extract(handler):
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with LLMClient(lambda u, p: "k", http=http) as llm:
+            extractor = SevenPanelExtractor(llm, "u", "openai", "gpt-4o-mini")
+            return await extractor.extract("a1", SECTIONS)
+    return asyncio.run(run())
+def _seed_job(db, params, article_ids=("a1",)):
+    conn = sqlite3.connect(db)
+    for article_id in article_ids:
+        conn.execute("INSERT INTO articles (article_id, title, sections) VALUES (?, 't', ?)",
+                     (article_id, json.dumps(SECTIONS)))
+    enqueue_job(conn, "L2_extract", params, job_id="j1", user_id="u1")
+    conn.commit()
+    conn.close()
+def _job_result(db):
+    conn = sqlite3.connect(db)
+    row = conn.execute("SELECT result_data FROM job_results WHERE job_id='j1'").fetchone()
+    conn.close()
+    return json.loads(row[0])
+def test_passes_run_concurrently_and_merge(tmp_path):
+    state = {"inflight": 0, "peak": 0, "prompts": []}
+    async def run():
+        async with LLMClient(lambda u, p: "k", http=_mock(state)) as llm:
+            extractor = SevenPanelExtractor(llm, "u", "openai", "gpt-4o-mini")
+            return await extractor.extract("a1", SECTIONS)
+    out = asyncio.run(run())
+    assert state["peak"] == 2 and len(out["calls"]) == 4
+    assert out["panels"]["stats_effect_sizes"] == "d=0.4"
+    assert out["panels"]["findings_effect"] == "focus up\nvia circadian"
+    assert out["panels"]["limitations_confounds"] == "small n"
+    assert all(q == {"ok": True, "reasks": []} for q in out["qc"].values())
+def test_pass_timeout_cancels_siblings():
+    state = {"inflight": 0, "peak": 0, "prompts": []}
+    async def run():
+        async with LLMClient(lambda u, p: "k", http=_mock(state, delay=1.0)) as llm:
+            extractor = SevenPanelExtractor(llm, "u", "openai", "m", pass_timeout=0.05)
+            return await extractor.extract("a1", SECTIONS)
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
+    assert state["prompts"] == []
+def test_parse_json_output_tolerates_prose():
+    assert parse_json_output('Here you go: {"a": 1} thanks') == {"a": 1}
+    assert parse_json_output("not json") == {}
+def test_worker_l2_job_uses_shared_client(ae_db, tmp_path):
+    _seed_job(ae_db, {"article_id": "a1"})
+    state = {"inflight": 0, "peak": 0, "prompts": []}
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w._llm = LLMClient(lambda u, p: "k" if u == "u1" else None, http=_mock(state, delay=0),
+                       cache=LLMCache(str(tmp_path / "c.db")))
+    w.process_job(w.fetch_next_job())
+    w.close()
+    conn = sqlite3.connect(ae_db)
+    status = conn.execute("SELECT status FROM processing_queue WHERE job_id='j1'").fetchone()[0]
+    assert status == "complete"
+    assert len(state["prompts"]) == 4
+def test_invalid_panel_is_reasked_alone():
+    state = {"inflight": 0, "peak": 0, "prompts": []}
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        state["prompts"].append(prompt)
+        if "### PANELS" in prompt and "stats_effect_sizes" in prompt:
+            text = '{"ok": false, "reasks": []}'
+        elif "### PANELS" in prompt:
+            text = '{"ok": false, "reasks": [{"panel": "limitations_confounds"}]}'
+        elif "### RE-ASK" in prompt and "stats_effect_sizes" in prompt.split("### RE-ASK")[1][:60]:
+            text = '{"stats_effect_sizes": "d=0.4"}'
+        elif "### RE-ASK" in prompt:
+            text = '{"limitations_confounds": "small n"}'
+        elif "RESULTS" in prompt:
+            text = '{"findings_effect": "focus up", "stats_effect_sizes": {"d": 0.4}}'
+        else:
+            text = '{"limitations_confounds": "", "findings_effect": "via circadian"}'
+        return _reply(text)
+    out = _extract(handler)
+    reasks = [p for p in state["prompts"] if "### RE-ASK" in p]
+    assert len(out["calls"]) == 6 and len(reasks) == 2
+    validation = out["validation"]
+    assert validation["7panel_pass2_findings"] == {"errors": {}, "reasked": ["stats_effect_sizes"]}
+    assert validation["7panel_pass3_mechanisms_limits"] == {
+        "errors": {}, "reasked": ["limitations_confounds"]}
+    assert out["panels"]["stats_effect_sizes"] == "d=0.4"
+    assert out["panels"]["limitations_confounds"] == "small n"
+    qc_prompt = next(p for p in state["prompts"] if "### PANELS (7panel_pass2" in p)
+    assert "chunk 0/panels/stats_effect_sizes: expected string, got dict" in qc_prompt
+def test_failed_panels_share_one_reask_and_empty_is_valid():
+    prompts = []
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        prompts.append(prompt)
+        if "### PANELS" in prompt:
+            text = '{"ok": true, "reasks": []}'
+        elif "### RE-ASK" in prompt:
+            text = '{"findings_effect": "focus up", "stats_effect_sizes": "d=0.4"}'
+        elif "RESULTS" in prompt:
+            text = '{"findings_effect": 1, "stats_effect_sizes": {"d": 0.4}}'
+        else:
+            text = '{"limitations_confounds": "", "findings_effect": "via circadian"}'
+        return _reply(text)
+    out = _extract(handler)
+    reasks = [p for p in prompts if "### RE-ASK" in p]
+    assert len(reasks) == 1 and '"findings_effect", "stats_effect_sizes"' in reasks[0]
+    assert out["validation"]["7panel_pass2_findings"] == {
+        "errors": {}, "reasked": ["findings_effect", "stats_effect_sizes"]}
+    assert out["validation"]["7panel_pass3_mechanisms_limits"] == {"errors": {}, "reasked": []}
+def test_worker_escalates_to_next_cheapest_model_only_on_schema_failure(ae_db, tmp_path):
+    from app.usage import UsageLedger
+    _seed_job(ae_db, {"article_id": "a1", "models": "openai:gpt-4o,openai:gpt-4o-mini"})
+    models = []
+    async def handler(request):
+        body = json.loads(request.content)
+        prompt = body["messages"][0]["content"]
+        models.append(body["model"])
+        if "### PANELS" in prompt:
+            text = '{"ok": true, "reasks": []}'
+        elif body["model"] == "gpt-4o-mini" and ("RESULTS" in prompt or "### RE-ASK" in prompt):
+            text = '{"findings_effect": 1, "stats_effect_sizes": 2}'
+        elif "RESULTS" in prompt:
+            text = '{"findings_effect": "focus up", "stats_effect_sizes": "d=0.4"}'
+        else:
+            text = '{"limitations_confounds": "small n", "findings_effect": "via circadian"}'
+        return _reply(text)
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    w._llm = LLMClient(lambda u, p: "k", http=http, ledger=UsageLedger(ae_db))
+    w.process_job(w.fetch_next_job())
+    w.close()
+    result = _job_result(ae_db)
+    assert [a["model"] for a in result["attempts"]] == ["gpt-4o-mini", "gpt-4o"]
+    assert result["attempts"][0]["invalid_panels"] and not result["attempts"][1]["invalid_panels"]
+    assert result["model"] == "gpt-4o" and models[0] == "gpt-4o-mini"
+def test_worker_batch_job_packs_short_papers_into_shared_requests(ae_db):
+    _seed_job(ae_db, {"article_ids": ["a1", "a2"]}, article_ids=("a1", "a2"))
+    prompts = []
+    async def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        prompts.append(prompt)
+        if "### PANELS" in prompt:
+            text = '{"ok": true, "reasks": []}'
+        elif "### RE-ASK" in prompt:
+            text = '{"findings_effect": "focus up", "stats_effect_sizes": "d=0.5"}'
+        elif "RESULTS" in prompt:
+            text = '{"a1": {"findings_effect": "focus up", "stats_effect_sizes": "d=0.4"}}'
+        else:
+            answer = {"limitations_confounds": "small n", "findings_effect": "via circadian"}
+            text = json.dumps({"a1": answer, "a2": answer})
+        return _reply(text)
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    w._llm = LLMClient(lambda u, p: "k", http=http)
+    w.process_job(w.fetch_next_job())
+    w.close()
+    result = _job_result(ae_db)
+    batched = [p for p in prompts if "### BATCH" in p]
+    assert len(batched) == 2
+    assert all("=== ARTICLE a1 ===" in p and "=== ARTICLE a2 ===" in p for p in batched)
+    assert result["articles"]["a1"]["panels"]["stats_effect_sizes"] == "d=0.4"
+    assert result["articles"]["a2"]["panels"]["limitations_confounds"] == "small n"
+    assert result["articles"]["a2"]["validation"]["7panel_pass2_findings"]["reasked"] == [
+        "findings_effect", "stats_effect_sizes"]
+    assert result["articles"]["a2"]["panels"]["stats_effect_sizes"] == "d=0.5"
+    assert result["attempts"][0]["invalid_article_ids"] == []
\ No newline at end of file
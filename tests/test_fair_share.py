@@ -0,0 +1,40 @@
+import sqlite3
+from app.job_graph import enqueue_job
+from app.worker import SimpleWorker
+def _enqueue(db, n, user, job_class="batch", prefix=None, priority=0):
+    conn = sqlite3.connect(db)
+    for i in range(n):
+        enqueue_job(conn, "L2_extract", {"article_id": f"{user}-{i}"}, priority=priority,
+                    job_id=f"{prefix or user}-{i}", user_id=user, job_class=job_class)
+    conn.commit(); conn.close()
+def test_heavy_user_does_not_starve_others(ae_db):
+    _enqueue(ae_db, 50, "alice")
+    _enqueue(ae_db, 3, "bob")
+    w = SimpleWorker(db_path=ae_db, worker_id="w1", user_concurrency=100)
+    owners = [w.fetch_next_job()["user_id"] for _ in range(6)]
+    assert owners.count("bob") == 3
+def test_interactive_served_first_and_reserved_worker(ae_db):
+    _enqueue(ae_db, 5, "alice", priority=100)
+    _enqueue(ae_db, 1, "bob", job_class="interactive")
+    reserved = SimpleWorker(db_path=ae_db, worker_id="r1", job_classes=("interactive",))
+    assert reserved.fetch_next_job()["job_id"] == "bob-0"
+    assert reserved.fetch_next_job() is None
+def test_per_user_concurrency_cap(ae_db):
+    _enqueue(ae_db, 5, "alice")
+    w = SimpleWorker(db_path=ae_db, worker_id="w1", user_concurrency=2)
+    assert w.fetch_next_job() and w.fetch_next_job()
+    assert w.fetch_next_job() is None
+    conn = sqlite3.connect(ae_db)
+    conn.execute("UPDATE queue_users SET max_running = 3 WHERE user_id = 'alice'")
+    conn.commit(); conn.close()
+    assert w.fetch_next_job()["user_id"] == "alice"
+def test_backed_off_users_do_not_hide_later_pages(ae_db):
+    for i in range(5):
+        _enqueue(ae_db, 1, f"u{i}")
+    _enqueue(ae_db, 1, "zed")
+    conn = sqlite3.connect(ae_db)
+    conn.execute("UPDATE processing_queue SET next_attempt_at = '9999-01-01' WHERE user_id != 'zed'")
+    conn.commit(); conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1", fair_share_scan=2)
+    assert w.fetch_next_job()["user_id"] == "zed"
+    assert w.fetch_next_job() is None
\ No newline at end of file
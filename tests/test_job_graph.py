@@ -0,0 +1,43 @@
+import json, sqlite3
+import pytest
+from app.job_graph import enqueue_job, fail_dependents
+from app.worker import SimpleWorker
+def _statuses(db):
+    conn = sqlite3.connect(db)
+    rows = dict(conn.execute("SELECT job_id, status FROM processing_queue").fetchall())
+    conn.close(); return rows
+def _drain(worker):
+    while (job := worker.fetch_next_job()):
+        worker.process_job(job)
+def test_l1_fans_out_l2_and_fans_in_l3(ae_db):
+    conn = sqlite3.connect(ae_db)
+    enqueue_job(conn, "L1_cluster", {"article_ids": ["a1", "a2", "a3", "a4"], "pipeline": True}, job_id="root")
+    conn.commit(); conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w.run_l2_extraction = lambda job_id, params: None  # no ingested text; extraction has its own tests
+    w.process_job(w.fetch_next_job())
+    st = _statuses(ae_db)
+    assert st["root/L2_extract/a1"] == st["root/L2_extract/a2"] == "pending"
+    assert st["root/L3_synthesize"] == "blocked"
+    w.process_job(w.fetch_next_job())
+    assert _statuses(ae_db)["root/L3_synthesize"] == "blocked"
+    _drain(w)
+    st = _statuses(ae_db)
+    assert set(st.values()) == {"complete"} and len(st) == 4
+    conn = sqlite3.connect(ae_db)
+    params = json.loads(conn.execute("SELECT params FROM processing_queue WHERE job_id='root/L3_synthesize'").fetchone()[0])
+    assert params["cluster_id"] == "root" and params["article_ids"] == ["a1", "a2"]
+def test_failure_cascades_to_blocked_descendants(ae_db):
+    conn = sqlite3.connect(ae_db)
+    a = enqueue_job(conn, "L0_harvest", {"query": "x"}, job_id="a")
+    b = enqueue_job(conn, "L1_cluster", {"article_ids": ["1"]}, depends_on=[a], job_id="b")
+    enqueue_job(conn, "L3_synthesize", {"cluster_id": "k"}, depends_on=[b], job_id="c")
+    conn.execute("UPDATE processing_queue SET status='failed' WHERE job_id='a'")
+    assert sorted(fail_dependents(conn, a)) == ["b", "c"]
+    assert enqueue_job(conn, "L2_extract", {"article_id": "1"}, depends_on=[a], job_id="d") == "d"
+    conn.commit(); conn.close()
+    assert _statuses(ae_db)["d"] == "failed"
+def test_unknown_parent_rejected(ae_db):
+    conn = sqlite3.connect(ae_db)
+    with pytest.raises(ValueError):
+        enqueue_job(conn, "L2_extract", {"article_id": "1"}, depends_on=["nope"])
\ No newline at end of file
@@ -0,0 +1,44 @@
+import sqlite3
+
+import pytest
+
+fernet = pytest.importorskip("cryptography.fernet")
+from app.security import KeyManager  # noqa: E402
+
+
+@pytest.fixture
+def km(ae_db, monkeypatch):
+    monkeypatch.setenv("MASTER_KEY", fernet.Fernet.generate_key().decode())
+    km = KeyManager(ae_db, flush_interval=3600)
+    assert km.store_key("u1", "openai", "sk-proj-abcdef123456")
+    return km
+def _usage(km):
+    conn = sqlite3.connect(km.db_path)
+    sql = "SELECT usage_count, last_used_at IS NOT NULL FROM user_api_keys"
+    return conn.execute(sql).fetchone()
+def test_hits_skip_db_and_usage_is_flushed_in_batch(km, monkeypatch):
+    assert km.retrieve_key("u1", "OpenAI") == "sk-proj-abcdef123456"
+    monkeypatch.setattr(km, "decrypt_key", lambda _: pytest.fail("cache miss"))
+    for _ in range(4):
+        assert km.retrieve_key("u1", "openai") == "sk-proj-abcdef123456"
+    assert _usage(km) == (0, 0)
+    assert km.flush_usage() == 1 and _usage(km) == (5, 1)
+    assert km.flush_usage() == 0
+def test_store_and_delete_invalidate_and_zero_the_cache(km):
+    km.retrieve_key("u1", "openai")
+    buf = km._cache[("u1", "openai")][0]
+    assert km.store_key("u1", "openai", "sk-proj-rotated98765")
+    assert buf == bytearray(len(buf)) and km.retrieve_key("u1", "openai") == "sk-proj-rotated98765"
+    km.close()
+    assert _usage(km) == (1, 1)  # count from before the rotation was dropped with the reset
+    assert km.delete_key("u1", "openai") and km.retrieve_key("u1", "openai") is None
+def test_ttl_and_size_bound_evict(km, monkeypatch):
+    km.cache_size = 1
+    km.store_key("u2", "openai", "sk-proj-second000000")
+    km.retrieve_key("u1", "openai")
+    km.retrieve_key("u2", "openai")
+    assert list(km._cache) == [("u2", "openai")]
+    km.cache_ttl = 0.0
+    km.clear_cache()
+    km.retrieve_key("u1", "openai")
+    assert not km._cache
\ No newline at end of file
@@ -0,0 +1,45 @@
+import asyncio, os
+import httpx
+from app.llm import LLMCache, LLMClient, prompt_cache_key
+def test_hit_miss_and_parsed(tmp_path):
+    tpl = tmp_path / "pass2.md"; tpl.write_text("Extract findings.")
+    cache = LLMCache(str(tmp_path / "c.db"))
+    key = prompt_cache_key(tpl, "openai", "m", {"results": "text"}, {"temperature": 0})
+    assert cache.get(key) is None
+    cache.put(key, {"text": "raw"}, template_path=str(tpl), provider="openai", model="m")
+    assert cache.set_parsed(key, {"findings_effect": "x"})
+    assert cache.get(key) == {"response": {"text": "raw"}, "parsed": {"findings_effect": "x"}}
+    assert key != prompt_cache_key(tpl, "openai", "m2", {"results": "text"}, {"temperature": 0})
+def test_prompt_edit_changes_key_and_invalidates(tmp_path):
+    tpl = tmp_path / "pass2.md"; tpl.write_text("v1")
+    cache = LLMCache(str(tmp_path / "c.db"))
+    old = prompt_cache_key(tpl, "openai", "m", "in")
+    cache.put(old, {"text": "a"}, template_path=str(tpl))
+    tpl.write_text("v2 longer"); os.utime(tpl, ns=(1, 1))
+    assert prompt_cache_key(tpl, "openai", "m", "in") != old
+    assert cache.invalidate_stale() == 1 and cache.get(old) is None
+def test_lru_eviction_keeps_within_budget(tmp_path):
+    cache = LLMCache(str(tmp_path / "c.db"), max_bytes=200)
+    for i in range(10):
+        cache.put(f"k{i}", {"text": "x" * 40})
+    stats = cache.stats()
+    assert stats["bytes"] <= 200 and cache.get("k9") and cache.get("k0") is None
+def test_client_serves_replay_from_cache(tmp_path):
+    tpl = tmp_path / "pass.md"; tpl.write_text("p")
+    calls = []
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"content": [{"type": "text", "text": "done"}],
+                                         "usage": {"input_tokens": 3, "output_tokens": 1}})
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with LLMClient(lambda u, p: "k", cache=LLMCache(str(tmp_path / "c.db")), http=http) as llm:
+            first = await llm.complete("u", "anthropic", "m", "prompt", template=str(tpl))
+            second = await llm.complete("other-user", "anthropic", "m", "prompt", template=str(tpl))
+            llm.cache.set_parsed(second["cache_key"], {"panel": "done"})
+            third = await llm.complete("u", "anthropic", "m", "prompt", template=str(tpl))
+        return first, second, third
+    first, second, third = asyncio.run(run())
+    assert len(calls) == 1 and not first["cached"] and second["cached"]
+    assert second["text"] == "done" and first["parsed"] is second["parsed"] is None
+    assert third["parsed"] == {"panel": "done"}
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timezone
+import httpx, pytest
+from app.llm import LLMClient, RateLimitedError, RateLimiter, TransientProviderError, retry_after_seconds
+from app.llm import client as llm_client
+class FakeClock:
+    def __init__(self): self.t = 1000.0
+    def __call__(self): return self.t
+def test_token_bucket_rpm_and_tpm(ae_db):
+    clock = FakeClock()
+    lim = RateLimiter(ae_db, limits={"openai": {"rpm": 2, "tpm": 1000, "concurrency": 1}}, clock=clock)
+    assert lim.try_acquire("u", "openai", 400) == 0
+    assert lim.try_acquire("u", "openai", 400) == 0
+    assert lim.try_acquire("u", "openai", 10) == 30.0  # out of requests: 1 req per 30s
+    assert lim.try_acquire("other", "openai", 10) == 0  # buckets are per user
+    clock.t += 30
+    assert lim.try_acquire("u", "openai", 900) > 0  # requests back, tokens not yet
+def test_throttle_halves_rate_and_success_restores(ae_db):
+    clock = FakeClock()
+    lim = RateLimiter(ae_db, clock=clock)
+    assert lim.record_throttle("u", "anthropic", retry_after=3) == 3
+    assert lim.try_acquire("u", "anthropic", 10) == 3.0
+    clock.t += 3
+    lim.record_success("u", "anthropic")
+    import sqlite3
+    scale = sqlite3.connect(ae_db).execute("SELECT rate_scale FROM llm_rate_buckets").fetchone()[0]
+    assert scale == 0.55
+def test_concurrency_slots_are_shared(ae_db):
+    lim = RateLimiter(ae_db, limits={"google": {"rpm": 60, "tpm": 1000, "concurrency": 1}})
+    other = RateLimiter(ae_db, limits={"google": {"rpm": 60, "tpm": 1000, "concurrency": 1}})
+    with lim.slot("google"):
+        assert other.try_take_slot("google") is None
+    assert other.try_take_slot("google") is not None
+def test_client_retries_429_against_mock_provider(ae_db):
+    calls = []
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}],
+                                         "usage": {"prompt_tokens": 7, "completion_tokens": 2}})
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with LLMClient(lambda u, p: "sk-test", RateLimiter(ae_db), http=http) as llm:
+            return await llm.complete("u", "openai", "gpt-test", "hello")
+    result = asyncio.run(run())
+    assert result["text"] == "ok" and result["tokens_in"] == 7
+    assert len(calls) == 2 and calls[0].headers["authorization"] == "Bearer sk-test"
+def test_retry_after_accepts_http_dates():
+    now = datetime(2026, 10, 19, 12, 0, 0, tzinfo=timezone.utc)
+    assert retry_after_seconds("7", now) == 7.0
+    assert retry_after_seconds("Mon, 19 Oct 2026 12:00:30 GMT", now) == 30.0
+    assert retry_after_seconds("Mon, 19 Oct 2026 11:00:00 GMT", now) == 0.0
+    assert retry_after_seconds("soon", now) is None and retry_after_seconds(None) is None
+def test_exhausted_retries_raise_retryable_errors(monkeypatch):
+    monkeypatch.setattr(llm_client, "RETRY_BASE_SECONDS", 0)
+    async def run(status, headers=None):
+        http = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(status, headers=headers)))
+        async with LLMClient(lambda u, p: "k", http=http, max_retries=1) as llm:
+            return await llm.complete("u", "openai", "m", "hi")
+    with pytest.raises(TransientProviderError, match="HTTP 503") as e:
+        asyncio.run(run(503))
+    assert not isinstance(e.value, RateLimitedError)
+    with pytest.raises(RateLimitedError):
+        asyncio.run(run(429, {"retry-after": "Mon, 19 Oct 2020 12:00:00 GMT"}))
+def test_async_limiter_keeps_event_loop_running_while_db_is_locked(ae_db):
+    import sqlite3, threading, time
+    lim = RateLimiter(ae_db, limits={"openai": {"rpm": 60, "tpm": 1000, "concurrency": 1}})
+    locked = sqlite3.connect(ae_db, isolation_level=None, check_same_thread=False)
+    locked.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.3, lambda: locked.execute("COMMIT")).start()
+    async def main():
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01); ticks += 1
+        ticker = asyncio.create_task(tick())
+        await lim.acquire_async("u", "openai", 10)
+        async with lim.slot_async("openai"):
+            pass
+        ticker.cancel()
+        return ticks
+    t0 = time.monotonic()
+    assert asyncio.run(main()) >= 10 and time.monotonic() - t0 >= 0.3
+    locked.close()
\ No newline at end of file
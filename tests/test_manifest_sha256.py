@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location(
+    "manifest_sha256", ROOT/"scripts"/"manifest_sha256.py")
+m = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(m)
+def _tree(root):
+    for d in ("sub", ".git", "big"):
+        (root/d).mkdir()
+    (root/"a.txt").write_text("a")
+    (root/"ae.db").write_bytes(b"db")
+    (root/"sub"/"b.txt").write_text("b")
+    (root/".git"/"HEAD").write_text("ref")
+    (root/"big"/"x.pdf").write_bytes(b"%PDF")
+def test_incremental_reuses_unchanged_and_honors_ignores(tmp_path):
+    _tree(tmp_path)
+    (tmp_path/".manifestignore").write_text("# corpora\nbig/\n")
+    first, stats = m.build(tmp_path)
+    assert [f["path"] for f in first["files"]] == [".manifestignore", "a.txt", "sub/b.txt"]
+    assert stats["hashed"] == 3
+    assert set(first["files"][0]) == {"path", "size", "sha256"}
+    cache = {}
+    m.build(tmp_path, cache)
+    m.write_cache(tmp_path/m.CACHE, cache)
+    (tmp_path/"sub"/"b.txt").write_text("changed")
+    second, stats = m.build(tmp_path, m.load_cache(tmp_path/m.CACHE))
+    assert (stats["hashed"], stats["reused"]) == (1, 2)
+    assert m.build(tmp_path, only={"a.txt"})[0]["file_count"] == 1
+    assert second["files"][2]["sha256"] == m.sha256(tmp_path/"sub"/"b.txt")
+    assert second["files"][2]["sha256"] != first["files"][2]["sha256"]
+def test_verify_stops_at_first_mismatch(tmp_path):
+    _tree(tmp_path)
+    manifest, _ = m.build(tmp_path)
+    entries = {f["path"]: f for f in manifest["files"]}
+    assert m.verify(tmp_path, entries) is None
+    (tmp_path/"a.txt").write_text("A")
+    os.remove(tmp_path/"sub"/"b.txt")
+    assert m.verify(tmp_path, entries) == ("a.txt", "sha256 mismatch")
+    missing = {"x": {"path": "sub/b.txt", "sha256": "0"}}
+    assert m.verify(tmp_path, missing) == ("sub/b.txt", "missing")
+    assert m.verify(tmp_path, {m.MANIFEST: {"path": m.MANIFEST, "sha256": "0"}}) is None
\ No newline at end of file
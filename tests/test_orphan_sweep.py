@@ -0,0 +1,35 @@
+import importlib.util
+import pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location("orphan_sweep", ROOT/"scripts"/"orphan_sweep.py")
+m = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(m)
+FILES = {
+    "app/__init__.py": "", "app/main.py": "from app.security import keys\nfrom .util import x\n",
+    "app/util.py": "import importlib\ndef f():\n    return importlib.import_module('app.lazy')\n",
+    "app/lazy.py": "", "app/dead.py": "import app.util\n",
+    "app/security/__init__.py": "",
+    "app/security/keys.py": "from ..util import f\nfrom . import vault\n",
+    "app/security/vault.py": "", "app/security/keys_old.py": "",
+    "scripts/tool.py": "import helper\n", "scripts/helper.py": "",
+    "cli.py": "if __name__ == '__main__':\n    pass\n",
+    "tests/test_x.py": "import app.main\n", "broken.py": "def (:\n",
+}
+def _tree(root):
+    for rel, text in FILES.items():
+        (root/rel).parent.mkdir(parents=True, exist_ok=True)
+        (root/rel).write_text(text)
+def test_reachability_resolves_nested_relative_and_script_imports(tmp_path):
+    _tree(tmp_path)
+    out = m.sweep(tmp_path, m.ENTRY_POINTS)
+    assert out["orphans"] == ["app/dead.py", "app/security/keys_old.py", "broken.py"]
+    assert out["stats"]["errors"][0].startswith("broken.py: SyntaxError")
+def test_cache_skips_unchanged_files(tmp_path):
+    _tree(tmp_path)
+    cache = tmp_path/"cache.json"
+    assert m.sweep(tmp_path, m.ENTRY_POINTS, cache)["stats"]["parsed"] == len(FILES)
+    assert m.sweep(tmp_path, m.ENTRY_POINTS, cache)["stats"]["parsed"] == 0
+    (tmp_path/"app/main.py").write_text(FILES["app/main.py"] + "import app.dead\n")
+    again = m.sweep(tmp_path, m.ENTRY_POINTS, cache)
+    assert again["stats"]["parsed"] == 1 and "app/dead.py" not in again["orphans"]
\ No newline at end of file
@@ -0,0 +1,35 @@
+import sqlite3
+from app.passages import index_passages, split_sentences, top_passages, verify_evidence, verify_quote
+TEXT = ("Participants in daylit rooms showed faster reaction times. The effect was robust (d = 0.42, p < .01).\n\n"
+        "Ceiling height did not affect recall. However, higher ceilings increased abstract thinking "
+        "scores among students. Noise above 60 dB reduced working memory accuracy in all groups.")
+def _db(ae_db):
+    conn = sqlite3.connect(ae_db)
+    conn.execute("INSERT INTO articles (article_id, title, full_text) VALUES ('p1', 't', ?)", (TEXT,))
+    conn.execute("INSERT INTO articles (article_id, title, full_text) VALUES ('p2', 't', 'Unrelated text about soil.')")
+    index_passages(conn, "p1", TEXT); index_passages(conn, "p2", "Unrelated text about soil.")
+    return conn
+def test_sentence_offsets_point_into_full_text():
+    spans = split_sentences(TEXT)
+    assert len(spans) == 5 and TEXT[spans[1][0]:spans[1][1]] == "The effect was robust (d = 0.42, p < .01)."
+def test_exact_fuzzy_and_missing_quotes(ae_db):
+    conn = _db(ae_db)
+    exact = verify_quote(conn, "p1", "higher ceilings increased abstract   thinking scores")
+    assert exact["status"] == "exact" and TEXT[exact["start_offset"]:exact["end_offset"]].startswith("However")
+    spans = verify_quote(conn, "p1", "did not affect recall. However, higher ceilings")
+    assert spans["status"] == "exact"
+    assert verify_quote(conn, "p1", "Noise above 60 dB reduced working-memory accuracy in all group")["status"] == "fuzzy"
+    assert verify_quote(conn, "p1", "Noise improved sleep quality dramatically")["status"] == "missing"
+    assert verify_quote(conn, "zz", "anything")["status"] == "unindexed"
+def test_top_passages_and_evidence_check(ae_db):
+    conn = _db(ae_db)
+    top = top_passages(conn, "Daylight improves reaction times", k=1, context=0)
+    assert top[0]["article_id"] == "p1" and top[0]["ordinal"] == 0
+    assert top_passages(conn, "reaction times", article_ids=["p2"]) == []
+    both = top_passages(conn, "reaction times in soil", k=2, article_ids=["p2", "p1", "zz"], context=0)
+    assert sorted(p["article_id"] for p in both) == ["p1", "p2"]
+    conn.execute("INSERT INTO rules (rule_id, rule) VALUES ('r1', 'x')")
+    conn.executemany("INSERT INTO rule_evidence (rule_id, article_id, passage) VALUES ('r1', 'p1', ?)",
+                     [("faster reaction times",), ("made up quote about windows",)])
+    conn.commit(); conn.close()
+    assert [r["status"] for r in verify_evidence(ae_db, "r1")] == ["exact", "missing"]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from app.llm import estimate_tokens, model_budget, pack_papers, pack_sections
+def _sections(results_paras=2, words=50):
+    para = " ".join(["Participants rated the room."] * words)
+    return {"abstract": "Short abstract.", "methods": "We measured cortisol.",
+            "results": "\n\n".join([para] * results_paras), "discussion": "",
+            "references": "Smith 2020. " * 5000, "full_text": "..."}
+def test_budget_uses_model_context():
+    assert model_budget("gpt-4o-mini-2024", max_output_tokens=1000, prompt_overhead=0) == 127000
+    assert model_budget("unknown", cap=4000) == 4000
+def test_only_needed_sections_and_never_references():
+    chunks = pack_sections(_sections(), "7panel_pass2_findings", budget=10000)
+    assert len(chunks) == 1 and set(chunks[0]) == {"results", "methods", "abstract"}
+    assert pack_sections(_sections(), "7panel_pass3_mechanisms_limits", 10000) == []
+def test_oversized_primary_is_chunked_within_budget():
+    chunks = pack_sections(_sections(results_paras=8), "7panel_pass2_findings", budget=800)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert sum(estimate_tokens(t) for t in chunk.values()) <= 800
+        assert "methods" in chunk
+def test_batch_mode_packs_short_papers_together():
+    papers = [(f"a{i}", {"results": "Effect was large.", "abstract": "x"}) for i in range(5)]
+    batches = pack_papers(papers, "7panel_pass2_findings", budget=1000)
+    assert len(batches) == 1 and len(batches[0]) == 5
\ No newline at end of file
@@ -0,0 +1,48 @@
+import importlib.util
+import json
+import pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location(
+    "public_surface_ledger", ROOT/"scripts"/"public_surface_ledger.py")
+m = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(m)
+def test_build_introspects_routes_and_keeps_budgets_and_contracts():
+    committed = {"endpoints": [{"method": "GET", "path": "/usage/me", "p95_ms": 75},
+                               {"method": "GET", "path": "/gone"}],
+                 "cli": [], "contracts": [{"file": "contracts/rules_v1.md"}], "db": {"x": 1}}
+    ledger = m.build(committed)
+    by_key = {(e["method"], e["path"]): e for e in ledger["endpoints"]}
+    assert by_key[("GET", "/usage/me")]["p95_ms"] == 75
+    assert by_key[("GET", "/healthz")]["p95_ms"] == 20
+    assert ledger["contracts"] == committed["contracts"] and ledger["db"] == {"x": 1}
+    usage_cli = {"command": "python -m app.usage", "description": "Article Eater API usage ledger",
+                 "options": ["--db", "--user", "--days", "--predict", "--chars", "--model"]}
+    assert usage_cli in ledger["cli"]
+    d = m.diff(committed, ledger)["endpoints"]
+    assert d["removed"] == ["GET /gone"] and "GET /healthz" in d["added"]
+    assert d["changed"] == ["GET /usage/me"]
+    assert m.diff(ledger, m.build(ledger)) == {}
+def test_committed_ledger_matches_app():
+    committed = json.loads((ROOT/"public_surface_ledger.json").read_text())
+    assert m.problems(committed) == [] and m.diff(committed, m.build(committed)) == {}
+def test_bench_skips_auth_gated_endpoints_and_fails_non_2xx(monkeypatch):
+    from fastapi import FastAPI, HTTPException
+    app = FastAPI()
+    @app.get("/ok")
+    def ok():
+        return {}
+    @app.get("/private")
+    def private():
+        raise HTTPException(401)
+    @app.get("/broken")
+    def broken():
+        raise HTTPException(404)
+    monkeypatch.setattr(m, "load_app", lambda spec: app)
+    paths = ("/ok", "/private", "/broken")
+    ledger = {"endpoints": [{"method": "GET", "path": p, "p95_ms": 1000} for p in paths]}
+    results = {r["path"]: r for r in m.bench(ledger, requests=3)}
+    assert results["/ok"]["ok"] and results["/ok"]["status"] == [200]
+    assert results["/private"]["skipped"] == "warm-up returned 401"
+    assert "ok" not in results["/private"]
+    assert not results["/broken"]["ok"]
\ No newline at end of file
@@ -0,0 +1,37 @@
+import sqlite3
+from fastapi.testclient import TestClient
+import app.main
+from app.queue_stats import QueueStats, histogram_percentile, RUNTIME_BUCKETS_MS
+def _enqueue(db, job_id, job_type="L2_extract", status="pending"):
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO processing_queue (job_id, job_type, params, status) VALUES (?,?,?,?)",
+                 (job_id, job_type, "{}", status))
+    conn.commit(); conn.close()
+def test_counters_follow_status_changes(ae_db):
+    for i in range(3): _enqueue(ae_db, f"j{i}")
+    _enqueue(ae_db, "c1", job_type="L1_cluster")
+    conn = sqlite3.connect(ae_db)
+    conn.execute("UPDATE processing_queue SET status='running', started_at='2026-01-01T00:00:00' WHERE job_id='j0'")
+    conn.execute("UPDATE processing_queue SET status='complete', completed_at=datetime('now'), "
+                 "started_at=datetime('now','-3 seconds') WHERE job_id='j1'")
+    conn.execute("DELETE FROM processing_queue WHERE job_id='j2'")
+    conn.commit(); conn.close()
+    snap = QueueStats(ae_db).snapshot()
+    l2 = snap["job_types"]["L2_extract"]
+    assert (l2["pending"], l2["running"], l2["complete"]) == (0, 1, 1)
+    assert snap["job_types"]["L1_cluster"]["pending"] == 1
+    assert snap["totals"]["oldest_pending_age_s"] is not None
+    assert l2["jobs_per_min"]["1m"] == 1.0
+    assert l2["runtime_ms"] == {"p50": 5000.0, "p95": 5000.0, "samples": 1}
+def test_histogram_percentile():
+    counts = [0] * len(RUNTIME_BUCKETS_MS)
+    assert histogram_percentile(counts, 0.5) is None
+    counts[2], counts[12] = 9, 1
+    assert histogram_percentile(counts, 0.5) == 1000.0
+    assert histogram_percentile(counts, 0.99) == 1800000.0
+def test_queue_stats_endpoint(ae_db, monkeypatch):
+    _enqueue(ae_db, "j0")
+    monkeypatch.setattr(app.main, "DB_PATH", ae_db)
+    r = TestClient(app.main.app).get("/queue/stats")
+    assert r.status_code == 200
+    assert r.json()["totals"]["pending"] == 1
\ No newline at end of file
@@ -0,0 +1,18 @@
+import pytest
+
+from app.schemas import SchemaError, SchemaRegistry
+
+
+def test_compiled_validator_reports_every_error(tmp_path):
+    (tmp_path / "node.schema.json").write_text(
+        '{"type": "object", "required": ["id"], "additionalProperties": false,'
+        ' "properties": {"id": {"type": "integer"}, "kind": {"enum": ["a", 1]},'
+        ' "children": {"type": "array", "items": {"$ref": "#"}}}}')
+    check = SchemaRegistry(tmp_path).validator("node.schema.json")
+    assert check({"id": 1, "children": [{"id": 2, "children": []}]}) == []
+    errors = check({"id": True, "kind": 2, "x": 0, "children": [{"kind": "a"}]})
+    assert [e["path"] for e in errors] == ["/id", "/kind", "", "/children/0"]
+def test_unsupported_keyword_fails_at_compile_time(tmp_path):
+    (tmp_path / "bad.schema.json").write_text('{"type": "string", "format": "uri", "if": {}}')
+    with pytest.raises(SchemaError, match="unsupported keyword"):
+        SchemaRegistry(tmp_path).compile_all()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import asyncio, json, sqlite3
+from pathlib import Path
+import httpx
+import pytest
+from app.job_graph import enqueue_job
+from app import semantic_scholar
+from app.semantic_scholar import S2Client, S2Error, harvest
+from app.worker import SimpleWorker
+PAGES = json.loads((Path(__file__).parent / "fixtures" / "s2_bulk_search.json").read_text())["pages"]
+def _server(calls, throttle_first=False):
+    def handler(request):
+        calls.append(request)
+        if throttle_first and len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        if request.url.path.endswith("/search/bulk"):
+            return httpx.Response(200, json=PAGES[1 if request.url.params.get("token") == "p2" else 0])
+        ids = json.loads(request.content)["ids"]
+        return httpx.Response(200, json=[{"paperId": i, "corpusId": 200 + n, "title": i} if i != "missing" else None
+                                         for n, i in enumerate(ids)])
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+def test_paginated_harvest_upserts_and_caches(ae_db, tmp_path):
+    conn = sqlite3.connect(ae_db)
+    conn.execute("INSERT INTO articles (article_id, doi, title) VALUES ('manual-1', '10.1000/light', 'x')")
+    conn.commit(); conn.close()
+    calls = []
+    async def run(offline=False):
+        async with S2Client(http=_server(calls, throttle_first=not offline), cache_dir=str(tmp_path / "s2"), offline=offline) as s2:
+            return await harvest(s2, ae_db, "daylight")
+    out = asyncio.run(run())
+    assert out == {"article_ids": ["manual-1", "s2:102", "s2:103"], "pages": 2, "papers_found": 3}
+    assert len(calls) == 3
+    conn = sqlite3.connect(ae_db)
+    assert conn.execute("SELECT corpus_id, abstract FROM articles WHERE article_id='manual-1'").fetchone() == ("101", "Daylight improved attention.")
+    assert conn.execute("SELECT COUNT(*) FROM articles WHERE corpus_id IS NOT NULL").fetchone()[0] == 3
+    assert asyncio.run(run(offline=True))["article_ids"] == out["article_ids"] and len(calls) == 3
+def test_offline_miss_and_batch_lookup(tmp_path):
+    calls = []
+    async def run():
+        async with S2Client(http=_server(calls), cache_dir=str(tmp_path / "s2")) as s2:
+            papers = await s2.batch_lookup(["a", "missing", "b"])
+        async with S2Client(cache_dir=str(tmp_path / "s2"), offline=True) as s2:
+            with pytest.raises(S2Error):
+                await s2.batch_lookup(["c"])
+        return papers
+    papers = asyncio.run(run())
+    assert [p and p["paperId"] for p in papers] == ["a", None, "b"]
+def test_l0_job_returns_article_ids_for_pipeline(ae_db, tmp_path):
+    conn = sqlite3.connect(ae_db)
+    enqueue_job(conn, "L0_harvest", {"query": "daylight", "pipeline": True}, job_id="root")
+    conn.commit(); conn.close()
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w._s2 = S2Client(http=_server([]), cache_dir=str(tmp_path / "s2"))
+    w.process_job(w.fetch_next_job())
+    w.close()
+    conn = sqlite3.connect(ae_db)
+    params = json.loads(conn.execute("SELECT params FROM processing_queue WHERE job_id='root/L1_cluster'").fetchone()[0])
+    assert params["article_ids"] == ["s2:101", "s2:102", "s2:103"]
+def test_s2_outage_leaves_l0_job_retryable(ae_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_scholar, "RETRY_BASE_SECONDS", 0)
+    conn = sqlite3.connect(ae_db)
+    enqueue_job(conn, "L0_harvest", {"query": "daylight"}, job_id="j1")
+    conn.commit(); conn.close()
+    outage = lambda r: httpx.Response(503, headers={"retry-after": "Mon, 19 Oct 2020 12:00:00 GMT"})
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w._s2 = S2Client(http=httpx.AsyncClient(transport=httpx.MockTransport(outage)), cache_dir=None, max_retries=1)
+    w.process_job(w.fetch_next_job())
+    w.close()
+    status, error = sqlite3.connect(ae_db).execute("SELECT status, error FROM processing_queue WHERE job_id='j1'").fetchone()
+    assert status == "pending" and "HTTP 503" in error
\ No newline at end of file
@@ -0,0 +1,39 @@
+import sqlite3
+from app.synergy import eclat, encode_transactions, mine_synergies, review_batch, run_mining
+ROWS = [  # daylight + window view reported together for attention; noise independent
+    (1, '["Daylight", "window view"]', "Attention"),
+    (2, '["daylight", "Window_View", "noise"]', "attention"),
+    (3, '["daylight", "window view"]', "attention"),
+    (4, '["noise"]', "attention"),
+    (5, '["plants"]', "attention"),
+    (6, '["daylight"]', "mood"),
+    (7, '["window view"]', "mood"),
+    (8, None, "mood")]
+def test_encoding_is_vertical_and_skips_findings_without_antecedents():
+    ids, items, bits, cons, cons_bits = encode_transactions(ROWS)
+    assert ids == [1, 2, 3, 4, 5, 6, 7] and cons == ["attention", "mood"]
+    assert bits[items.index("daylight")] == 0b0100111 and cons_bits == [0b0011111, 0b1100000]
+def test_eclat_respects_min_count_and_max_size():
+    items = [(0, 0b1111), (1, 0b0111), (2, 0b0011)]
+    assert [s for s, _ in eclat(items, 2, 3)] == [(0, 1), (0, 1, 2), (0, 2), (1, 2)]
+    assert [s for s, _ in eclat(items, 3, 3)] == [(0, 1)]
+    assert [s for s, _ in eclat(items, 2, 2)] == [(0, 1), (0, 2), (1, 2)]
+def test_candidates_scored_and_stored_for_review(ae_db):
+    [top] = mine_synergies(ROWS, min_count=2, min_lift=1.1)
+    assert top["antecedents"] == ["daylight", "window_view"] and top["consequent"] == "attention"
+    assert top["n_findings"] == 3 and top["support"] == 0.6 and top["confidence"] == 1.0
+    assert top["interaction_lift"] == round(0.6 / (0.6 * 0.6), 6) and top["example_finding_ids"] == [1, 2, 3]
+    conn = sqlite3.connect(ae_db)
+    conn.executemany("INSERT INTO findings (id, finding_level, antecedents, consequent, paper_id) VALUES (?, 'micro', ?, ?, 'art-001')", ROWS)
+    conn.commit()
+    assert run_mining(ae_db, min_count=2, min_lift=1.1)["stored"] == 1
+    conn.execute("UPDATE synergy_candidates SET status = 'accepted'"); conn.commit()
+    assert run_mining(ae_db, min_count=2, min_lift=1.1)["stored"] == 0  # reviewed pair kept, not re-queued
+    conn.execute("UPDATE synergy_candidates SET status = 'pending'")
+    prompt = review_batch(conn)
+    assert "daylight + window_view" in prompt and "10.1234/test.2024" in prompt
+def test_confidence_counts_the_set_across_all_consequents():
+    rows = ROWS + [(9, '["daylight", "window view"]', "mood"), (10, '["noise"]', "stress")]
+    [top] = mine_synergies(rows, min_count=2, min_lift=1.1)
+    assert top["n_findings"] == 3 and top["confidence"] == 0.75
+    assert top["lift"] == round(0.75 / (5 / 9), 6) and top["example_finding_ids"] == [1, 2, 3]
\ No newline at end of file
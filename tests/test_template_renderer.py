@@ -0,0 +1,29 @@
+import json
+from governance_kit.template_renderer import compile_template, load_manifest, main, render_batch, render_template
+ROW = {"project_name": "P", "project_code": "p", "project_owner": "o", "primary_ai": "ai", "primary_domain": "d", "install_date": "2026-01-01"}
+def test_compiled_segments_render_like_regex():
+    text = "{{PROJECT_NAME}} by {{PROJECT_OWNER}}: {{NOPE}}{{x}}"
+    assert compile_template(text) == [(True, "PROJECT_NAME"), (False, " by "), (True, "PROJECT_OWNER"), (False, ": "), (True, "NOPE"), (False, "{{x}}")]
+    assert render_template(text, {"PROJECT_NAME": "P", "PROJECT_OWNER": "o"}) == "P by o: {{NOPE}}{{x}}"
+def test_batch_skips_unchanged_and_aggregates_unknowns(tmp_path):
+    tpl = tmp_path / "tpl"; tpl.mkdir()
+    (tpl / "A.md.tpl").write_text("{{PROJECT_NAME}} {{INSTALL_DATE}} {{TEAM}}")
+    (tpl / "B.md.tpl").write_text("{{PROJECT_CODE}} {{MISSING}}")
+    for t in ("one", "two"): (tmp_path / t).mkdir()
+    (tmp_path / "fleet.json").write_text(json.dumps([{**ROW, "target": "one", "TEAM": "red"}, {**ROW, "target": "two"}, {**ROW, "target": "gone"}]))
+    rows = load_manifest(tmp_path / "fleet.json")
+    templates = {"A.md": compile_template((tpl / "A.md.tpl").read_text()), "B.md": compile_template((tpl / "B.md.tpl").read_text())}
+    out = render_batch(rows, tmp_path, templates=templates)
+    one, two, gone = out["targets"]
+    assert one["written"] == ["A.md", "B.md"] and (tmp_path / "one/.governance/A.md").read_text() == "P 2026-01-01 red"
+    assert "error" in gone and out["unknown"] == {"MISSING": [one["target"], two["target"]], "TEAM": [two["target"]]}
+    again = render_batch(rows[:2], tmp_path, force=True, templates=templates)["targets"]
+    assert again[0]["unchanged"] == ["A.md", "B.md"] and again[0]["written"] == []
+    rows[0]["TEAM"] = "blue"
+    assert render_batch(rows[:1], tmp_path, force=True, templates=templates)["targets"][0]["written"] == ["A.md"]
+def test_cli_manifest_csv(tmp_path, capsys):
+    (tmp_path / "proj").mkdir()
+    (tmp_path / "fleet.csv").write_text("target," + ",".join(ROW) + "\nproj," + ",".join(ROW.values()) + "\n")
+    main(["--manifest", str(tmp_path / "fleet.csv")])
+    assert "written, 0 unchanged" in capsys.readouterr().out
+    assert (tmp_path / "proj/.governance/PROJECT_CONSTITUTION.md").exists()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.llm import LLMCache, LLMClient
+from app.usage import UsageLedger
+
+
+def test_rollups_follow_appends_and_events_are_immutable(ae_db):
+    ledger = UsageLedger(ae_db)
+    ledger.record("u1", "openai", "gpt-4o-mini", 1_000_000, 0,
+                  operation="L2_extraction", predicted_cost_usd=0.2)
+    ledger.record("u1", "openai", "gpt-4o-mini", 0, 1_000_000, operation="L3_synthesis")
+    ledger.record("u1", "openai", "gpt-4o-mini", 500, 50, operation="L2_extraction", cached=True)
+    ledger.record("u2", "google", "unpriced", 10, 10)
+    me = ledger.user_usage("u1")
+    assert me["totals"]["calls"] == 3
+    assert me["totals"]["cached_calls"] == 1
+    assert me["totals"]["cost_usd"] == pytest.approx(0.75)
+    assert me["daily"][0]["tokens_in"] == 1_000_000
+    stages = {s["operation"]: s for s in ledger.admin_usage()["stages"]}
+    assert stages["L2_extraction"]["predicted_cost_usd"] == pytest.approx(0.2)
+    assert stages["L2_extraction"]["predicted_actual_usd"] == pytest.approx(0.15)
+    assert stages[""]["cost_usd"] == 0
+    conn = sqlite3.connect(ae_db)
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute("UPDATE api_usage_events SET cost_usd = 0")
+def test_predictor_learns_tokens_per_char_and_ranks_models(ae_db):
+    ledger = UsageLedger(ae_db)
+    assert ledger.predict("L2_extraction", "openai", "gpt-4o-mini", 4000)["basis"] == "estimate"
+    for chars in (1000, 2000, 4000, 8000, 16000):
+        ledger.record("u", "openai", "gpt-4o-mini", 200 + chars // 3, 700,
+                      operation="L2_extraction", input_chars=chars)
+    guess = ledger.predict("L2_extraction", "openai", "gpt-4o-mini", 30000, max_tokens=600)
+    assert guess["basis"] == "history"
+    assert guess["samples"] == 5
+    assert abs(guess["tokens_in"] - 10200) <= 2
+    assert guess["tokens_out"] == 600
+    candidates = [("openai", "gpt-4o"), ("openai", "gpt-4o-mini")]
+    ranked = ledger.cheapest("L2_extraction", 30000, candidates)
+    assert [r["model"] for r in ranked] == ["gpt-4o-mini", "gpt-4o"]
+def test_client_records_predicted_and_actual_usage(ae_db, tmp_path):
+    tpl = tmp_path / "7panel_pass2_findings.md"
+    tpl.write_text("p")
+    def handler(request):
+        body = {"choices": [{"message": {"content": "{}"}}],
+                "usage": {"prompt_tokens": 1000, "completion_tokens": 100}}
+        return httpx.Response(200, json=body)
+    count = "SELECT COUNT(*) FROM api_usage_events"
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        cache = LLMCache(str(tmp_path / "c.db"))
+        ledger = UsageLedger(ae_db)
+        async with LLMClient(lambda u, p: "k", http=http, cache=cache, ledger=ledger) as llm:
+            await llm.complete("u1", "openai", "gpt-4o-mini", "x" * 400, template=str(tpl))
+            await llm.complete("u1", "openai", "gpt-4o-mini", "x" * 400, template=str(tpl))
+            # Queued, not written per call
+            assert sqlite3.connect(ae_db).execute(count).fetchone()[0] == 0
+            await llm.flush_usage()
+            assert sqlite3.connect(ae_db).execute(count).fetchone()[0] == 2
+    asyncio.run(run())
+    conn = sqlite3.connect(ae_db)
+    rows = conn.execute(
+        "SELECT operation, tokens_in, cached, predicted_cost_usd IS NOT NULL, input_chars"
+        " FROM api_usage_events ORDER BY cached"
+    ).fetchall()
+    assert rows[0] == ("7panel_pass2_findings", 1000, 0, 1, 400)
+    assert rows[1] == ("7panel_pass2_findings", 0, 1, 0, 400)
+def test_usage_endpoints_require_signed_tokens(ae_db, monkeypatch):
+    from app import main
+    from app.auth import user_token
+    UsageLedger(ae_db).record("u1", "openai", "gpt-4o-mini", 1000, 100)
+    monkeypatch.setattr(main, "DB_PATH", ae_db)
+    monkeypatch.setenv("AE_AUTH_SECRET", "s3cret")
+    monkeypatch.setenv("AE_ADMIN_TOKEN", "adm")
+    c = TestClient(main.app)
+    user = {"Authorization": f"Bearer {user_token('u1')}"}
+    admin = {"Authorization": "Bearer adm"}
+    assert c.get("/usage/me").status_code == 401
+    assert c.get("/usage/me", headers={"X-User-ID": "u1"}).status_code == 401
+    assert c.get("/usage/me", headers={"Authorization": "Bearer u1.forged"}).status_code == 401
+    r = c.get("/usage/me", headers=user)
+    assert r.status_code == 200
+    assert r.json()["totals"]["calls"] == 1
+    assert r.json()["totals"]["cost_usd"] == pytest.approx(0.00021)
+    assert c.get("/usage/admin").status_code == 401
+    assert c.get("/usage/admin", headers=user).status_code == 403
+    r = c.get("/usage/admin", headers=admin)
+    assert r.status_code == 200
+    assert r.json()["users"][0]["user_id"] == "u1"
\ No newline at end of file
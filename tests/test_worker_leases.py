@@ -0,0 +1,64 @@
+import sqlite3
+from app.worker import SimpleWorker, retry_delay_seconds
+def _enqueue(db, job_id, job_type="L1_cluster", params='{"article_ids": ["a"]}', max_attempts=3):
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO processing_queue (job_id, job_type, params, status, max_attempts) "
+                 "VALUES (?,?,?,'pending',?)", (job_id, job_type, params, max_attempts))
+    conn.commit(); conn.close()
+def _row(db, job_id):
+    conn = sqlite3.connect(db); conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM processing_queue WHERE job_id=?", (job_id,)).fetchone()
+    conn.close(); return dict(row)
+def test_claim_sets_lease_and_complete_clears_it(ae_db):
+    _enqueue(ae_db, "j1")
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    job = w.fetch_next_job()
+    assert job["job_id"] == "j1" and job["attempts"] == 1
+    row = _row(ae_db, "j1")
+    assert row["status"] == "running" and row["lease_owner"] == "w1" and row["lease_expires_at"]
+    assert w.fetch_next_job() is None
+    w.process_job(job)
+    row = _row(ae_db, "j1")
+    assert row["status"] == "complete" and row["lease_owner"] is None
+    conn = sqlite3.connect(ae_db)
+    job_type, results = conn.execute("SELECT job_type, result_data FROM job_results WHERE job_id='j1'").fetchone()
+    conn.close()
+    assert job_type == "L1_cluster" and '"job_id": "j1"' in results
+def test_retry_backoff_then_dead_letter(ae_db):
+    _enqueue(ae_db, "j1", max_attempts=2)
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w.fetch_next_job(); w.mark_job_failed("j1", "429 from provider")
+    row = _row(ae_db, "j1")
+    assert row["status"] == "pending" and row["next_attempt_at"] > row["started_at"]
+    assert w.fetch_next_job() is None  # still backing off
+    conn = sqlite3.connect(ae_db); conn.execute("UPDATE processing_queue SET next_attempt_at=NULL"); conn.commit(); conn.close()
+    w.fetch_next_job(); w.mark_job_failed("j1", "429 again")
+    assert _row(ae_db, "j1")["status"] == "dead"
+def test_bad_params_fail_without_retry(ae_db):
+    _enqueue(ae_db, "j1", params="{}")
+    w = SimpleWorker(db_path=ae_db, worker_id="w1")
+    w.process_job(w.fetch_next_job())
+    assert _row(ae_db, "j1")["status"] == "failed"
+def test_reaper_returns_expired_lease(ae_db):
+    _enqueue(ae_db, "j1")
+    dead = SimpleWorker(db_path=ae_db, worker_id="dead", lease_seconds=-1)
+    dead.fetch_next_job()
+    w = SimpleWorker(db_path=ae_db, worker_id="w2")
+    assert w.reap_expired_leases() == 1
+    assert _row(ae_db, "j1")["status"] == "pending"
+    assert w.fetch_next_job()["attempts"] == 2
+    assert not dead.heartbeat("j1")
+def test_retry_delay_grows_and_caps():
+    assert retry_delay_seconds(1, jitter=0) == 30
+    assert retry_delay_seconds(3, jitter=0) == 120
+    assert retry_delay_seconds(20, jitter=0) == 3600
+def test_failure_after_lease_lost_is_ignored(ae_db):
+    _enqueue(ae_db, "j1")
+    dead = SimpleWorker(db_path=ae_db, worker_id="dead", lease_seconds=-1)
+    dead.fetch_next_job()
+    w = SimpleWorker(db_path=ae_db, worker_id="w2")
+    w.reap_expired_leases()
+    dead.mark_job_failed("j1", "late failure", retryable=False)
+    assert _row(ae_db, "j1")["status"] == "pending"
+    w.fetch_next_job(); dead.mark_job_failed("j1", "late failure", retryable=False)
+    assert _row(ae_db, "j1")["lease_owner"] == "w2"
\ No newline at end of file